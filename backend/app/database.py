@@ -1,3 +1,5 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from app.config import get_settings
@@ -7,15 +9,50 @@ settings = get_settings()
 # Ensure the data directory exists (handled by mkdir script, but good for safety)
 # SQLite url in config is relative, but usually needs absolute for safety or correct relative path handling.
 # For simplicity with aiosqlite in this structure:
-database_url = settings.DATABASE_URL
+database_url = make_url(settings.DATABASE_URL)
+if database_url.drivername in ("postgresql", "postgres"):
+    # Plain postgresql:// would pick the sync psycopg2 driver
+    database_url = database_url.set(drivername="postgresql+asyncpg")
+
+IS_SQLITE = database_url.get_backend_name() == "sqlite"
+
+if IS_SQLITE:
+    engine_options = {
+        "connect_args": {"check_same_thread": False}, # Needed for SQLite
+    }
+else:
+    engine_options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": True,
+    }
 
 engine = create_async_engine(
     database_url,
-    echo=settings.DEBUG,
+    echo=settings.SQL_ECHO,
     future=True,
-    connect_args={"check_same_thread": False}, # Needed for SQLite
+    **engine_options,
 )
 
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply the performance profile to every new SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        # Negative value = size in KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+if IS_SQLITE:
+    event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+
 AsyncSessionLocal = async_sessionmaker(
     engine, 
     class_=AsyncSession, 
@@ -34,5 +71,6 @@ async def get_db():
             await session.close()
 
 async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    """Apply pending blocking migrations. Online ones are started by the app lifespan."""
+    from app.migrations import run_migrations
+    await run_migrations(engine, online=False)
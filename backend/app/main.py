@@ -1,13 +1,24 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import get_settings
-from app.database import init_db
+from app.database import init_db, engine, IS_SQLITE
+from app.migrations import run_migrations
+from app.pagination import NEXT_CURSOR_HEADER
+from app.services.metrics_service import metrics_service
+from app.services.llm_service import llm_service
+from app.services.rag_service import rag_service
+from app.services.whisper_service import whisper_service
+from app.services.vector_gc_service import vector_gc_service
+from app.services.summary_service import summary_service
+from app.services.archive_service import message_archive_service
 from contextlib import asynccontextmanager
+import asyncio
 
 # Import models to ensure they are registered with Base
 import app.models 
 
-from app.routers import chat, tasks, projects, memory
+from app.routers import chat, tasks, projects, memory, dashboard
 
 settings = get_settings()
 
@@ -15,8 +26,39 @@ settings = get_settings()
 async def lifespan(app: FastAPI):
     # Startup
     await init_db()
+    # Index builds / backfills run in the background so big databases boot fast
+    online_migrations = asyncio.create_task(_run_online_migrations())
+    warmup = asyncio.create_task(_warmup()) if settings.WARMUP_ON_STARTUP else None
+    vector_gc = asyncio.create_task(vector_gc_service.run_forever()) if settings.VECTOR_GC_INTERVAL_MINUTES > 0 else None
+    summaries = asyncio.create_task(summary_service.run_forever()) if settings.FILE_SUMMARIES else None
+    archive = asyncio.create_task(message_archive_service.run_forever()) if IS_SQLITE and settings.MESSAGE_ARCHIVE_INTERVAL_HOURS > 0 else None
     yield
     # Shutdown
+    online_migrations.cancel()
+    for task in (warmup, vector_gc, summaries, archive):
+        if task:
+            task.cancel()
+
+async def _warmup():
+    """Pay the heavy client/model loading cost before the first request does."""
+    try:
+        with metrics_service.span("warmup"):
+            # Sync initializers (network calls, model loads) stay off the event loop
+            await asyncio.to_thread(rag_service.initialize)
+            await asyncio.to_thread(whisper_service.initialize)
+            await llm_service.warmup()
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"Warmup error: {e}")
+
+async def _run_online_migrations():
+    try:
+        await run_migrations(engine, online=True)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"Online migration error: {e}")
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -37,6 +79,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Include Routers
@@ -44,11 +87,17 @@ app.include_router(chat.router, prefix="/api/chat", tags=["chat"])
 app.include_router(tasks.router, prefix="/api", tags=["tasks"]) # /api/tasks, /api/events
 app.include_router(projects.router, prefix="/api", tags=["projects"]) # /api/projects
 app.include_router(memory.router, prefix="/api", tags=["memory"]) # /api/memory
+app.include_router(dashboard.router, prefix="/api", tags=["dashboard"]) # /api/dashboard
 
 @app.get("/health")
 async def health_check():
     return {"status": "online", "model": settings.LLM_MODEL}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of stage latencies and LLM stats"""
+    return PlainTextResponse(metrics_service.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/config")
 async def get_config():
     """Get current configuration and environment details"""
@@ -57,6 +106,7 @@ async def get_config():
         "debug": settings.DEBUG,
         "llm": {
             "model": settings.LLM_MODEL,
+            "fast_model": settings.LLM_FAST_MODEL or settings.LLM_MODEL,
             "base_url": settings.OLLAMA_BASE_URL,
             "embedding_model": settings.EMBEDDING_MODEL
         },
@@ -67,8 +117,8 @@ async def get_config():
             "enabled": bool(settings.PINECONE_API_KEY)
         },
         "database": {
-            "type": "SQLite",
-            "url": settings.DATABASE_URL.split("///")[-1] if "///" in settings.DATABASE_URL else "In-memory"
+            "type": "SQLite" if IS_SQLITE else engine.dialect.name,
+            "url": (engine.url.database or "In-memory") if IS_SQLITE else engine.url.render_as_string(hide_password=True)
         },
         "storage": {
             "upload_dir": settings.UPLOAD_DIR
@@ -0,0 +1,145 @@
+"""
+Versioned schema migrations.
+
+Each module in `app/migrations/versions/` named `vNNNN_description.py` is one
+migration. It must define `async def upgrade(engine)` and may set
+`ONLINE = True`.
+
+- Blocking migrations (the default) run in order during startup before the app
+  serves requests. Keep them cheap: table creation, nullable column additions.
+- Online migrations (index builds, chunked backfills) run in a background task
+  after startup so large databases don't hold up boot. They must not be relied
+  upon by blocking migrations, and the app must work (just slower) without them.
+
+Applied versions are recorded in the `schema_version` table. Migrations should
+be idempotent (use the helpers in `app.migrations.ops`) so a crash mid-way can
+simply be re-run. Write them dialect-neutral (inspector-based checks, portable
+DDL types like VARCHAR/INTEGER/TIMESTAMP): they run on SQLite and PostgreSQL.
+"""
+import importlib
+import pkgutil
+import re
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.migrations import versions as versions_pkg
+
+_MODULE_RE = re.compile(r"^v(\d{4})_(\w+)$")
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    online: bool
+    upgrade: Callable
+
+def discover_migrations() -> List[Migration]:
+    """Load all migration modules, ordered by version."""
+    migrations = []
+    for info in pkgutil.iter_modules(versions_pkg.__path__):
+        match = _MODULE_RE.match(info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f"{versions_pkg.__name__}.{info.name}")
+        migrations.append(Migration(
+            version=int(match.group(1)),
+            name=match.group(2),
+            online=getattr(module, "ONLINE", False),
+            upgrade=module.upgrade,
+        ))
+
+    migrations.sort(key=lambda m: m.version)
+    seen = set()
+    for m in migrations:
+        if m.version in seen:
+            raise RuntimeError(f"Duplicate migration version {m.version:04d}")
+        seen.add(m.version)
+    return migrations
+
+async def _ensure_version_table(engine: AsyncEngine):
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INTEGER PRIMARY KEY, "
+            "name VARCHAR NOT NULL, "
+            "applied_at TIMESTAMP NOT NULL)"
+        ))
+
+async def applied_versions(engine: AsyncEngine) -> Set[int]:
+    await _ensure_version_table(engine)
+    async with engine.connect() as conn:
+        result = await conn.execute(text("SELECT version FROM schema_version"))
+        return {row[0] for row in result.fetchall()}
+
+async def _record(engine: AsyncEngine, migration: Migration):
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("INSERT INTO schema_version (version, name, applied_at) VALUES (:v, :n, :t)"),
+            {"v": migration.version, "n": migration.name, "t": datetime.utcnow()}
+        )
+
+# Arbitrary constant identifying the migration advisory lock on PostgreSQL
+_PG_LOCK_KEY = 0x4A415256
+
+@asynccontextmanager
+async def _migration_lock(engine: AsyncEngine, online: Optional[bool]):
+    """
+    Serialize runners across worker processes. Only PostgreSQL needs this:
+    SQLite deployments run a single writer process.
+    """
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+
+    # Blocking and online runners use separate keys so startup never waits
+    # behind a long background index build
+    key = _PG_LOCK_KEY + (1 if online else 0)
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": key})
+        try:
+            yield
+        finally:
+            await conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": key})
+
+async def run_migrations(engine: AsyncEngine, online: Optional[bool] = None) -> List[Migration]:
+    """
+    Apply pending migrations in version order.
+    online=False -> blocking migrations only (startup), online=True -> online
+    migrations only (background), None -> everything (CLI).
+    Returns the migrations that were applied.
+    """
+    applied = []
+    async with _migration_lock(engine, online):
+        # Re-read under the lock: another worker may have just applied them
+        done = await applied_versions(engine)
+        for migration in discover_migrations():
+            if migration.version in done:
+                continue
+            if online is not None and migration.online != online:
+                continue
+
+            kind = "online" if migration.online else "blocking"
+            print(f"Applying migration {migration.version:04d}_{migration.name} ({kind})...")
+            await migration.upgrade(engine)
+            await _record(engine, migration)
+            applied.append(migration)
+
+    return applied
+
+async def migration_status(engine: AsyncEngine) -> List[dict]:
+    done = await applied_versions(engine)
+    return [
+        {
+            "version": m.version,
+            "name": m.name,
+            "online": m.online,
+            "applied": m.version in done,
+        }
+        for m in discover_migrations()
+    ]
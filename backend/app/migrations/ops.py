@@ -0,0 +1,109 @@
+"""
+Idempotent building blocks for migrations.
+
+Every helper opens its own short transaction so long-running work (index
+builds, backfills) never holds the write lock for longer than one step.
+"""
+import asyncio
+from typing import Dict, Any, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+async def has_table(engine: AsyncEngine, table: str) -> bool:
+    async with engine.connect() as conn:
+        return await conn.run_sync(lambda c: inspect(c).has_table(table))
+
+async def has_column(engine: AsyncEngine, table: str, column: str) -> bool:
+    async with engine.connect() as conn:
+        columns = await conn.run_sync(lambda c: inspect(c).get_columns(table))
+    return any(col["name"] == column for col in columns)
+
+async def create_table(engine: AsyncEngine, table):
+    """Create a SQLAlchemy Table (with its indexes) if it doesn't exist yet."""
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: table.create(c, checkfirst=True))
+
+async def add_column(engine: AsyncEngine, table: str, column: str, ddl: str):
+    """Add `column` (e.g. ddl="INTEGER REFERENCES tasks(id)") if missing."""
+    if not await has_table(engine, table) or await has_column(engine, table, column):
+        return
+    async with engine.begin() as conn:
+        await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+async def create_index(engine: AsyncEngine, name: str, table: str, columns: str, unique: bool = False):
+    """
+    Create an index if it doesn't exist yet. `columns` is the raw column list.
+    On PostgreSQL the build is CONCURRENTLY so writes continue meanwhile.
+    """
+    unique_sql = "UNIQUE " if unique else ""
+    if engine.dialect.name == "postgresql":
+        # CONCURRENTLY can't run inside a transaction block
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text(
+                f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})"
+            ))
+        return
+
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({columns})"
+        ))
+
+async def analyze(engine: AsyncEngine):
+    """Refresh planner statistics so new indexes get picked up."""
+    async with engine.begin() as conn:
+        await conn.execute(text("ANALYZE"))
+
+async def backfill(
+    engine: AsyncEngine,
+    table: str,
+    set_clause: str,
+    where_clause: str,
+    params: Optional[Dict[str, Any]] = None,
+    chunk_size: int = 1000,
+) -> int:
+    """
+    UPDATE `table` SET `set_clause` for rows matching `where_clause`, one chunk
+    per transaction. The SET must make the WHERE false for updated rows (e.g.
+    where_clause="col IS NULL") or the loop will never finish.
+    Returns the number of rows updated.
+    """
+    total = 0
+    while True:
+        async with engine.begin() as conn:
+            result = await conn.execute(
+                text(
+                    f"UPDATE {table} SET {set_clause} WHERE id IN "
+                    f"(SELECT id FROM {table} WHERE {where_clause} LIMIT :_chunk)"
+                ),
+                {**(params or {}), "_chunk": chunk_size}
+            )
+        if result.rowcount <= 0:
+            break
+        total += result.rowcount
+        # Give request handlers a chance to grab the write lock between chunks
+        await asyncio.sleep(0)
+    return total
+
+async def backfill_ranges(engine: AsyncEngine, table: str, statement: str, chunk_size: int = 1000) -> int:
+    """
+    Run `statement` once per id range [:lo, :hi] of `table` that existed when
+    the call started, one chunk per transaction. For INSERT ... SELECT style
+    backfills that can't use `backfill`; the statement must skip rows already
+    done so a re-run after a crash is safe. Returns the rows affected.
+    """
+    async with engine.connect() as conn:
+        low, high = (await conn.execute(text(f"SELECT min(id), max(id) FROM {table}"))).one()
+    if low is None:
+        return 0
+
+    total = 0
+    for lo in range(low, high + 1, chunk_size):
+        async with engine.begin() as conn:
+            result = await conn.execute(text(statement), {"lo": lo, "hi": min(lo + chunk_size - 1, high)})
+        total += max(result.rowcount, 0)
+        # Give request handlers a chance to grab the write lock between chunks
+        await asyncio.sleep(0)
+    return total
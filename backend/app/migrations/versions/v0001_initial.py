@@ -0,0 +1,11 @@
+"""Base schema. Also covers databases created before task chats existed."""
+from app.database import Base
+from app.migrations import ops
+
+async def upgrade(engine):
+    # Import models so every table is registered on Base.metadata
+    import app.models  # noqa: F401
+
+    await ops.add_column(engine, "chat_sessions", "task_id", "INTEGER REFERENCES tasks(id)")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
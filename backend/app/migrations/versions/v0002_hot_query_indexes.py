@@ -0,0 +1,18 @@
+"""Indexes for message history, task board, calendar and file listings."""
+from app.migrations import ops
+
+ONLINE = True
+
+INDEXES = [
+    ("ix_messages_session_timestamp", "messages", "session_id, timestamp"),
+    ("ix_chat_sessions_task_id", "chat_sessions", "task_id"),
+    ("ix_tasks_status_deadline", "tasks", "status, deadline"),
+    ("ix_calendar_events_start_time", "calendar_events", "start_time"),
+    ("ix_project_files_project_id", "project_files", "project_id"),
+    ("ix_task_files_task_id", "task_files", "task_id"),
+]
+
+async def upgrade(engine):
+    for name, table, columns in INDEXES:
+        await ops.create_index(engine, name, table, columns)
+    await ops.analyze(engine)
@@ -0,0 +1,17 @@
+"""Indexes backing keyset pagination and server-side list filters."""
+from app.migrations import ops
+
+ONLINE = True
+
+INDEXES = [
+    ("ix_tasks_priority", "tasks", "priority"),
+    ("ix_tasks_tag", "tasks", "tag"),
+    ("ix_chat_sessions_updated_at", "chat_sessions", "updated_at"),
+    ("ix_memory_entries_created_at", "memory_entries", "created_at"),
+    ("ix_memory_entries_category", "memory_entries", "category"),
+]
+
+async def upgrade(engine):
+    for name, table, columns in INDEXES:
+        await ops.create_index(engine, name, table, columns)
+    await ops.analyze(engine)
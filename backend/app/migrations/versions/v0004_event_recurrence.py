@@ -0,0 +1,6 @@
+"""Recurring calendar events."""
+from app.migrations import ops
+
+async def upgrade(engine):
+    await ops.add_column(engine, "calendar_events", "rrule", "VARCHAR")
+    await ops.add_column(engine, "calendar_events", "recurrence_end", "TIMESTAMP")
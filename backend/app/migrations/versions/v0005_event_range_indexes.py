@@ -0,0 +1,9 @@
+"""Indexes for calendar time-window queries."""
+from app.migrations import ops
+
+ONLINE = True
+
+async def upgrade(engine):
+    await ops.create_index(engine, "ix_calendar_events_start_end", "calendar_events", "start_time, end_time")
+    await ops.create_index(engine, "ix_calendar_events_recurrence_end", "calendar_events", "recurrence_end")
+    await ops.analyze(engine)
@@ -0,0 +1,5 @@
+"""Content hash on project files (bulk import dedupe)."""
+from app.migrations import ops
+
+async def upgrade(engine):
+    await ops.add_column(engine, "project_files", "content_hash", "VARCHAR")
@@ -0,0 +1,8 @@
+"""Index for per-project hash lookups."""
+from app.migrations import ops
+
+ONLINE = True
+
+async def upgrade(engine):
+    await ops.create_index(engine, "ix_project_files_content_hash", "project_files", "content_hash")
+    await ops.analyze(engine)
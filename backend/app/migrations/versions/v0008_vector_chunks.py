@@ -0,0 +1,6 @@
+"""Track which vectors belong to which row, for deleting them with it."""
+from app.migrations import ops
+
+async def upgrade(engine):
+    from app.models.vector import VectorChunk
+    await ops.create_table(engine, VectorChunk.__table__)
@@ -0,0 +1,5 @@
+"""Background file summaries: NULL summarized_at marks files still to summarize."""
+from app.migrations import ops
+
+async def upgrade(engine):
+    await ops.add_column(engine, "project_files", "summarized_at", "TIMESTAMP")
@@ -0,0 +1,8 @@
+"""Index for the summary worker's pending-files scan."""
+from app.migrations import ops
+
+ONLINE = True
+
+async def upgrade(engine):
+    await ops.create_index(engine, "ix_project_files_summarized_at", "project_files", "summarized_at")
+    await ops.analyze(engine)
@@ -0,0 +1,55 @@
+"""
+Full-text index over chat messages.
+
+SQLite: an external-content FTS5 table (the text stays in `messages`, FTS5 keeps
+only the index) kept in sync by triggers. The table and triggers are created in
+one short transaction, then existing messages are indexed in committed chunks
+so chat writes never wait on the whole build. Until a row has been indexed
+(it has a `messages_fts_docsize` entry) its delete/update triggers leave the
+index alone; the backfill picks up its current text instead.
+
+PostgreSQL: a GIN index on to_tsvector(content), maintained by Postgres itself.
+"""
+from sqlalchemy import text
+
+from app.migrations import ops
+
+ONLINE = True
+
+INDEXED = "EXISTS (SELECT 1 FROM messages_fts_docsize WHERE id = old.id)"
+
+SQLITE_STATEMENTS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+    "content, content='messages', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN "
+    "INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END",
+    f"CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages WHEN {INDEXED} BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+    f"CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages WHEN {INDEXED} BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END",
+]
+
+# Skips rows the triggers (or an earlier, interrupted run) already indexed
+BACKFILL = (
+    "INSERT INTO messages_fts(rowid, content) "
+    "SELECT m.id, m.content FROM messages m "
+    "WHERE m.id BETWEEN :lo AND :hi "
+    "AND NOT EXISTS (SELECT 1 FROM messages_fts_docsize d WHERE d.id = m.id)"
+)
+
+async def upgrade(engine):
+    if engine.dialect.name == "postgresql":
+        # CONCURRENTLY can't run inside a transaction block
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_messages_content_fts "
+                "ON messages USING gin (to_tsvector('english', coalesce(content, '')))"
+            ))
+    else:
+        async with engine.begin() as conn:
+            for statement in SQLITE_STATEMENTS:
+                await conn.execute(text(statement))
+        await ops.backfill_ranges(engine, "messages", BACKFILL, chunk_size=2000)
+    await ops.analyze(engine)
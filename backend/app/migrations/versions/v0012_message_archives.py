@@ -0,0 +1,6 @@
+"""Cold storage for old chat messages: compressed per-session content blobs."""
+from app.migrations import ops
+
+async def upgrade(engine):
+    from app.models.chat import MessageArchive
+    await ops.create_table(engine, MessageArchive.__table__)
@@ -0,0 +1,30 @@
+"""
+Keep archived messages searchable.
+
+Archiving sets messages.content to NULL (the text moves into a compressed
+blob). These triggers leave the FTS entries alone for such rows instead of
+dropping them, and skip rows whose content is NULL. An archived session is
+restored before it's deleted, so its index entries are still removed then.
+"""
+from sqlalchemy import text
+
+ONLINE = True
+
+SQLITE_STATEMENTS = [
+    "DROP TRIGGER IF EXISTS messages_fts_delete",
+    "DROP TRIGGER IF EXISTS messages_fts_update",
+    "CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages WHEN old.content IS NOT NULL BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+    # Archive (text -> NULL) and restore (NULL -> the same text) leave the index as is
+    "CREATE TRIGGER messages_fts_update AFTER UPDATE OF content ON messages "
+    "WHEN old.content IS NOT NULL AND new.content IS NOT NULL BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END",
+]
+
+async def upgrade(engine):
+    if engine.dialect.name == "postgresql":
+        return # Archiving is SQLite-only (PostgreSQL already compresses large values)
+    async with engine.begin() as conn:
+        for statement in SQLITE_STATEMENTS:
+            await conn.execute(text(statement))
@@ -0,0 +1,7 @@
+"""Content-addressed blob store for uploads, and content hashes on task files."""
+from app.migrations import ops
+
+async def upgrade(engine):
+    from app.models.blob import Blob
+    await ops.create_table(engine, Blob.__table__)
+    await ops.add_column(engine, "task_files", "content_hash", "VARCHAR")
@@ -0,0 +1,8 @@
+"""Index for task file hash lookups."""
+from app.migrations import ops
+
+ONLINE = True
+
+async def upgrade(engine):
+    await ops.create_index(engine, "ix_task_files_content_hash", "task_files", "content_hash")
+    await ops.analyze(engine)
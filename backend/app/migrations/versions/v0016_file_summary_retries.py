@@ -0,0 +1,6 @@
+"""Failed file summaries are retried with backoff instead of blocking the queue."""
+from app.migrations import ops
+
+async def upgrade(engine):
+    await ops.add_column(engine, "project_files", "summary_attempts", "INTEGER DEFAULT 0")
+    await ops.add_column(engine, "project_files", "summary_retry_at", "TIMESTAMP")
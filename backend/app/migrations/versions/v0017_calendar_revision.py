@@ -0,0 +1,13 @@
+"""Write counter for calendar_events, checked by the free/busy index instead of COUNT/MAX."""
+from sqlalchemy import text
+
+from app.migrations import ops
+
+async def upgrade(engine):
+    from app.models.task import CalendarRevision
+    await ops.create_table(engine, CalendarRevision.__table__)
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "INSERT INTO calendar_revision (id, revision) SELECT 1, 0 "
+            "WHERE NOT EXISTS (SELECT 1 FROM calendar_revision WHERE id = 1)"
+        ))
@@ -1,4 +1,6 @@
-from .chat import ChatSession, Message
-from .task import Task, CalendarEvent
+from .chat import ChatSession, Message, MessageArchive
+from .task import Task, CalendarEvent, CalendarRevision
 from .project import Project, ProjectFile
 from .memory import MemoryEntry
+from .vector import VectorChunk
+from .blob import Blob
@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, BigInteger
+from app.database import Base
+
+class Blob(Base):
+    """
+    One stored upload, addressed by the sha256 of its bytes. Project and task
+    files with the same content share it; `ref_count` is how many file rows
+    point at it, and the file on disk goes when that drops to zero.
+    """
+    __tablename__ = "blobs"
+
+    sha256 = Column(String, primary_key=True)
+    size = Column(BigInteger)
+    ref_count = Column(Integer, default=0, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -9,15 +9,19 @@ class ChatSession(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, default="New Chat")
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     # Link to a task if this is a task-specific chat
-    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=True)
+    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=True, index=True)
 
     messages = relationship("Message", back_populates="session", cascade="all, delete-orphan")
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # History load for every chat turn: WHERE session_id = ? ORDER BY timestamp
+        Index("ix_messages_session_timestamp", "session_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("chat_sessions.id"))
@@ -28,3 +32,18 @@ class Message(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
 
     session = relationship("ChatSession", back_populates="messages")
+
+class MessageArchive(Base):
+    """
+    Compressed content of a session's archived messages. The message rows stay
+    (ordering, paging and search keep working) with content set to NULL.
+    """
+    __tablename__ = "message_archives"
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("chat_sessions.id"), unique=True, index=True)
+    codec = Column(String, default="zlib")
+    data = Column(LargeBinary) # JSON [[message_id, content], ...], compressed
+    message_count = Column(Integer)
+    raw_bytes = Column(Integer)
+    archived_at = Column(DateTime, default=datetime.utcnow)
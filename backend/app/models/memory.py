@@ -7,6 +7,6 @@ class MemoryEntry(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text)
-    category = Column(String, default="general") # personal, work, preferences
+    category = Column(String, default="general", index=True) # personal, work, preferences
     pinecone_id = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
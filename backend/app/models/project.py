@@ -20,12 +20,16 @@ class ProjectFile(Base):
     __tablename__ = "project_files"
 
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"))
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
     filename = Column(String)
     file_path = Column(String) # Local path
     file_type = Column(String) # code, doc, etc
     pinecone_id = Column(String, nullable=True) # ID in vector DB
     summary = Column(Text, nullable=True)
+    summarized_at = Column(DateTime, nullable=True, index=True) # NULL until the background summary is written
+    summary_attempts = Column(Integer, default=0) # Failed LLM summary attempts
+    summary_retry_at = Column(DateTime, nullable=True) # Not retried before this after a failure
+    content_hash = Column(String, nullable=True, index=True) # sha256 of the raw file, for dedupe
     created_at = Column(DateTime, default=datetime.utcnow)
 
     project = relationship("Project", back_populates="files")
@@ -1,17 +1,20 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_status_deadline", "status", "deadline"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
     description = Column(Text, nullable=True)
     status = Column(String, default="backlog") # backlog, todo, in_progress, done
-    priority = Column(String, default="med") # low, med, high
-    tag = Column(String, default="GEN")
+    priority = Column(String, default="med", index=True) # low, med, high
+    tag = Column(String, default="GEN", index=True)
     deadline = Column(DateTime, nullable=True)
     user_initials = Column(String, nullable=True) # e.g. "ME" or "AI"
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -30,28 +33,47 @@ class TaskFile(Base):
     __tablename__ = "task_files"
 
     id = Column(Integer, primary_key=True, index=True)
-    task_id = Column(Integer, ForeignKey("tasks.id"))
+    task_id = Column(Integer, ForeignKey("tasks.id"), index=True)
     filename = Column(String)
     file_path = Column(String) # Local path
     file_type = Column(String) # code, doc, etc
     pinecone_id = Column(String, nullable=True) # ID in vector DB
     summary = Column(Text, nullable=True)
+    content_hash = Column(String, nullable=True, index=True) # sha256, key into the blob store
     created_at = Column(DateTime, default=datetime.utcnow)
 
     task = relationship("Task", back_populates="files")
 
 class CalendarEvent(Base):
     __tablename__ = "calendar_events"
+    __table_args__ = (
+        Index("ix_calendar_events_start_end", "start_time", "end_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String)
     description = Column(Text, nullable=True)
-    start_time = Column(DateTime)
+    start_time = Column(DateTime, index=True)
     end_time = Column(DateTime)
     all_day = Column(Boolean, default=False)
     type = Column(String, default="event") # meeting, work, etc.
+
+    # Recurrence: RFC 5545 RRULE, expanded lazily per requested window
+    rrule = Column(String, nullable=True)
+    recurrence_end = Column(DateTime, nullable=True, index=True) # None = repeats forever
     
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=True)
     task = relationship("Task", back_populates="events")
 
     created_at = Column(DateTime, default=datetime.utcnow)
+
+class CalendarRevision(Base):
+    """
+    A single row whose counter is bumped in the same transaction as every
+    calendar_events write, so each worker's free/busy index can tell when
+    it's stale with one primary-key read.
+    """
+    __tablename__ = "calendar_revision"
+
+    id = Column(Integer, primary_key=True)
+    revision = Column(Integer, default=0, nullable=False)
@@ -0,0 +1,17 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from app.database import Base
+
+class VectorChunk(Base):
+    """One vector written to the index and the row it was derived from."""
+    __tablename__ = "vector_chunks"
+    __table_args__ = (
+        Index("ix_vector_chunks_owner", "owner_type", "owner_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_type = Column(String) # project_file, task_file, memory
+    owner_id = Column(Integer)
+    vector_id = Column(String, unique=True, index=True)
+    namespace = Column(String, default="default")
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,63 @@
+"""
+Keyset (cursor) pagination shared by the list endpoints.
+
+A cursor encodes the sort key of the last row on a page, so the next page is an
+index range scan (`WHERE (sort, id) > (last_sort, last_id)`) instead of an
+OFFSET that reads and discards every earlier row. The cursor for the next page
+is returned in the `X-Next-Cursor` response header so list bodies stay plain
+arrays.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, columns: Sequence[Tuple[Any, bool]]) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor shape mismatch")
+        decoded = []
+        for value, (column, _) in zip(values, columns):
+            if value is not None and column.type.python_type is datetime:
+                value = datetime.fromisoformat(value)
+            decoded.append(value)
+        return decoded
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset(stmt, columns: Sequence[Tuple[Any, bool]], cursor: Optional[str]):
+    """
+    Order `stmt` by `columns` ([(column, descending), ...], last one must be
+    unique, e.g. the primary key) and, if a cursor is given, start after it.
+    Sort columns must be non-null.
+    """
+    stmt = stmt.order_by(*[c.desc() if desc else c.asc() for c, desc in columns])
+    if not cursor:
+        return stmt
+
+    values = decode_cursor(cursor, columns)
+    # (a, b, c) after (x, y, z)  ==  a > x OR (a = x AND (b > y OR (b = y AND c > z)))
+    condition = None
+    for (column, desc), value in reversed(list(zip(columns, values))):
+        after = column < value if desc else column > value
+        condition = after if condition is None else or_(after, and_(column == value, condition))
+    return stmt.where(condition)
+
+def set_next_cursor(response: Response, rows: Sequence[Any], limit: int, columns: Sequence[Tuple[Any, bool]]):
+    """Expose the cursor for the following page when this page came back full."""
+    if rows and len(rows) >= limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            [getattr(last, column.key) for column, _ in columns]
+        )
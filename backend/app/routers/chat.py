@@ -1,21 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, UploadFile, File, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
-from typing import List
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import List, Optional
+import asyncio
+import json
+import time
+from contextlib import aclosing
 
 from app.database import get_db, AsyncSessionLocal
 from app.models.chat import ChatSession, Message
 from app import schemas
+from app.config import get_settings
+from app.pagination import NEXT_CURSOR_HEADER, keyset, set_next_cursor
 from app.services.llm_service import llm_service
 from app.services.whisper_service import whisper_service
+from app.services.metrics_service import metrics_service
+from app.services.search_service import search_service
+from app.services.archive_service import message_archive_service
 
 # ... (rest of imports)
 
 # ... (existing endpoints)
 
+settings = get_settings()
 router = APIRouter()
 
+SESSION_ORDER = [(ChatSession.updated_at, True), (ChatSession.id, True)]
+MESSAGE_ORDER = [(Message.timestamp, True), (Message.id, True)]
+
 @router.post("/transcribe")
 async def transcribe_audio(file: UploadFile = File(...)):
     text = await whisper_service.transcribe(file)
@@ -24,13 +37,25 @@ async def transcribe_audio(file: UploadFile = File(...)):
 # --- HTTP Endpoints ---
 
 @router.get("/sessions", response_model=List[schemas.ChatSessionSummary])
-async def read_sessions(skip: int = 0, limit: int = 50, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(ChatSession)
-        .order_by(ChatSession.updated_at.desc())
-        .offset(skip).limit(limit)
-    )
-    return result.scalars().all()
+async def read_sessions(
+    response: Response,
+    skip: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    task_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    query = select(ChatSession)
+    if task_id is not None:
+        query = query.where(ChatSession.task_id == task_id)
+
+    query = keyset(query, SESSION_ORDER, cursor)
+    if not cursor:
+        query = query.offset(skip)
+    result = await db.execute(query.limit(limit))
+    sessions = result.scalars().all()
+    set_next_cursor(response, sessions, limit, SESSION_ORDER)
+    return sessions
 
 @router.post("/sessions", response_model=schemas.ChatSessionSummary)
 async def create_session(session: schemas.ChatSessionBase, db: AsyncSession = Depends(get_db)):
@@ -40,18 +65,57 @@ async def create_session(session: schemas.ChatSessionBase, db: AsyncSession = De
     await db.refresh(db_session)
     return db_session
 
+async def _page_messages(db: AsyncSession, response: Response, session_id: int, limit: int, cursor: Optional[str]) -> List[Message]:
+    """A page of the session's messages, newest first."""
+    query = keyset(select(Message).where(Message.session_id == session_id), MESSAGE_ORDER, cursor)
+    result = await db.execute(query.limit(limit))
+    messages = result.scalars().all()
+    await message_archive_service.fill(db, messages)
+    set_next_cursor(response, messages, limit, MESSAGE_ORDER)
+    return messages
+
+@router.get("/search", response_model=List[schemas.MessageSearchHit])
+async def search_messages(
+    response: Response,
+    q: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    session_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Full-text search across chats, best matches first."""
+    hits, next_cursor = await search_service.search_messages(db, q, limit, cursor, session_id)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return hits
+
 @router.get("/sessions/{session_id}", response_model=schemas.ChatSession)
-async def read_session(session_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(ChatSession)
-        .options(selectinload(ChatSession.messages))
-        .where(ChatSession.id == session_id)
-    )
+async def read_session(session_id: int, response: Response, message_limit: int = 100, db: AsyncSession = Depends(get_db)):
+    """
+    The session with its latest `message_limit` messages, oldest first. If there
+    are more, X-Next-Cursor pages back through /sessions/{id}/messages.
+    """
+    result = await db.execute(select(ChatSession).where(ChatSession.id == session_id))
     db_session = result.scalar_one_or_none()
     if not db_session:
         raise HTTPException(status_code=404, detail="Session not found")
+
+    messages = await _page_messages(db, response, session_id, message_limit, None)
+    # Fill the relationship without loading it
+    set_committed_value(db_session, "messages", list(reversed(messages)))
     return db_session
 
+@router.get("/sessions/{session_id}/messages", response_model=List[schemas.Message])
+async def read_messages(
+    session_id: int,
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Messages newest first; follow X-Next-Cursor for older ones."""
+    return await _page_messages(db, response, session_id, limit, cursor)
+
 @router.put("/sessions/{session_id}", response_model=schemas.ChatSessionSummary)
 async def update_session(session_id: int, session: schemas.ChatSessionBase, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(ChatSession).where(ChatSession.id == session_id))
@@ -71,14 +135,48 @@ async def delete_session(session_id: int, db: AsyncSession = Depends(get_db)):
     if not db_session:
         raise HTTPException(status_code=404, detail="Session not found")
 
+    # Archived text goes back into the rows first so search index entries get removed with them
+    await message_archive_service.restore(db, session_id)
     await db.delete(db_session)
     await db.commit()
     return {"message": "Session deleted"}
 
 # --- WebSocket Endpoint ---
 
-from app.services.rag_service import rag_service
+from app.services.rag_service import rag_service, project_namespace, summary_namespace, task_namespace, MAX_UNSUMMARIZED_FILTER
+from app.services.summary_service import summary_service
 from app.services.agent_service import agent_service
+from app.services.stream_buffer import OutboundBuffer
+
+# Model rounds per chat turn; tools are only offered before the last one
+MAX_AGENT_TURNS = 3
+
+STOP_FRAME = "stop"
+
+def _is_stop_frame(data: str) -> bool:
+    """Control frame {"type": "stop"}; anything else is a user message."""
+    if not data.startswith("{"):
+        return False
+    try:
+        frame = json.loads(data)
+    except ValueError:
+        return False
+    return isinstance(frame, dict) and frame.get("type") == STOP_FRAME
+
+async def _cancel_turn(turn: Optional[asyncio.Task], reason: str):
+    if turn is None or turn.done():
+        return
+    turn.cancel()
+    metrics_service.inc("chat_turns_cancelled_total", labels={"reason": reason})
+    try:
+        await turn
+    except (asyncio.CancelledError, Exception):
+        pass
+
+async def _save_assistant_message(session_id: int, content: str):
+    async with AsyncSessionLocal() as db:
+        db.add(Message(session_id=session_id, role="assistant", content=content))
+        await db.commit()
 
 @router.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: int):
@@ -93,22 +191,27 @@ async def websocket_endpoint(websocket: WebSocket, session_id: int):
     current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     # Fetch Core Memories
-    async with AsyncSessionLocal() as db:
-        mem_result = await db.execute(select(MemoryEntry))
-        memories = mem_result.scalars().all()
-        memory_context = "\n".join([f"- [{m.category.upper()}] {m.content}" for m in memories])
-
-        # Check if this is a project-specific chat session
-        session_result = await db.execute(select(ChatSession).where(ChatSession.id == session_id))
-        session = session_result.scalar_one_or_none()
-        project_id = None
-        if session and session.title.startswith("Project:"):
-            # Extract project name from title "Project: {name}"
-            project_name = session.title.replace("Project:", "").strip()
-            project_result = await db.execute(select(Project).where(Project.name == project_name))
-            project = project_result.scalar_one_or_none()
-            if project:
-                project_id = project.id
+    with metrics_service.span("session_setup"):
+        async with AsyncSessionLocal() as db:
+            # Chatting in an archived session makes it hot again
+            await message_archive_service.restore(db, session_id)
+
+            mem_result = await db.execute(select(MemoryEntry))
+            memories = mem_result.scalars().all()
+            memory_context = "\n".join([f"- [{m.category.upper()}] {m.content}" for m in memories])
+
+            # Check if this is a project-specific chat session
+            session_result = await db.execute(select(ChatSession).where(ChatSession.id == session_id))
+            session = session_result.scalar_one_or_none()
+            project_id = None
+            task_id = session.task_id if session else None
+            if session and session.title.startswith("Project:"):
+                # Extract project name from title "Project: {name}"
+                project_name = session.title.replace("Project:", "").strip()
+                project_result = await db.execute(select(Project).where(Project.name == project_name))
+                project = project_result.scalar_one_or_none()
+                if project:
+                    project_id = project.id
 
     SYSTEM_PROMPT = f"""You are Jarvis, a highly advanced personal AI assistant.
     You have access to the user's projects, tasks, calendar, and preferences via a RAG system.
@@ -124,20 +227,38 @@ async def websocket_endpoint(websocket: WebSocket, session_id: int):
     4. You are running locally on the user's machine.
     """
 
-    try:
-        while True:
-            data = await websocket.receive_text()
+    # Tool groups the previous message used, carried into short follow-ups
+    last_intents = ()
 
+    async def run_turn(data: str):
+        nonlocal last_intents
+        turn_started = time.perf_counter()
+        try:
             # --- Turn Loop (User Msg + Agents) ---
             # 1. Save User Message
-            async with AsyncSessionLocal() as db:
-                user_msg = Message(session_id=session_id, role="user", content=data)
-                db.add(user_msg)
-                await db.commit()
-
-            # 2. Retrieve RAG Context (filtered by project if applicable)
-            rag_filter = {"project_id": project_id} if project_id else None
-            context_docs = await rag_service.query_context(data, filter=rag_filter)
+            with metrics_service.span("save_user_message"):
+                async with AsyncSessionLocal() as db:
+                    user_msg = Message(session_id=session_id, role="user", content=data)
+                    db.add(user_msg)
+                    await db.commit()
+
+            # 2. Retrieve RAG Context (scoped to the task's or project's namespace if applicable)
+            with metrics_service.span("rag_retrieval"):
+                if task_id:
+                    context_docs = await rag_service.query_scoped(data, task_namespace(task_id), {"task_id": task_id})
+                elif project_id:
+                    coarse_namespace, unsummarized = None, None
+                    if settings.FILE_SUMMARIES:
+                        coarse_namespace = summary_namespace(project_id)
+                        async with AsyncSessionLocal() as db:
+                            # One past the cap, so query_scoped can tell it was exceeded
+                            unsummarized = await summary_service.unsummarized_filenames(db, project_id, MAX_UNSUMMARIZED_FILTER + 1)
+                    context_docs = await rag_service.query_scoped(
+                        data, project_namespace(project_id), {"project_id": project_id},
+                        coarse_namespace=coarse_namespace, unsummarized=unsummarized
+                    )
+                else:
+                    context_docs = await rag_service.query_context(data)
             context_str = ""
             if context_docs:
                 context_str = "\nRELEVANT CONTEXT FROM FILES/MEMORY:\n"
@@ -149,13 +270,14 @@ async def websocket_endpoint(websocket: WebSocket, session_id: int):
             llm_messages = [{"role": "system", "content": SYSTEM_PROMPT}]
             
             # Fetch history
-            async with AsyncSessionLocal() as db:
-                result = await db.execute(
-                    select(Message)
-                    .where(Message.session_id == session_id)
-                    .order_by(Message.timestamp.asc())
-                )
-                history = result.scalars().all()
+            with metrics_service.span("history_load"):
+                async with AsyncSessionLocal() as db:
+                    result = await db.execute(
+                        select(Message)
+                        .where(Message.session_id == session_id)
+                        .order_by(Message.timestamp.asc())
+                    )
+                    history = result.scalars().all()
                 
             for msg in history:
                 # Skip the one we just added (it's in history now) to handle it specially with context?
@@ -172,49 +294,84 @@ async def websocket_endpoint(websocket: WebSocket, session_id: int):
                 llm_messages.append({"role": msg.role, "content": content})
 
             
-            # 4. Agent Execution Loop (Max 3 turns)
-            tools = agent_service.get_tools_schema()
+            # 4. Agent Execution Loop (MAX_AGENT_TURNS rounds)
+            intents = agent_service.classify_intent(data, previous=last_intents)
+            last_intents = intents
+            tools = agent_service.tools_for(intents)
             turn_count = 0
             
-            while turn_count < 3:
+            while turn_count < MAX_AGENT_TURNS:
                 turn_count += 1
                 full_content = ""
                 tool_calls = []
+                if turn_count == MAX_AGENT_TURNS:
+                    # Last round: answer with what the tools returned, no more calls
+                    tools = None
                 
-                # Stream Response
-                async for chunk in llm_service.chat_stream(llm_messages, tools=tools):
-                    content = chunk.get('content', '')
-                    if content:
-                        full_content += content
-                        await websocket.send_text(content)
-                    
-                    if chunk.get('tool_calls'):
-                        tool_calls.extend(chunk['tool_calls'])
+                # Two-tier routing: the fast model decides on tool calls and the
+                # answer model writes the reply, without tools
+                if tools and llm_service.tiered:
+                    with metrics_service.span("tool_planning"):
+                        tool_calls = await llm_service.plan_tool_calls(llm_messages, tools)
+                    if tool_calls:
+                        # Same record the streamed path leaves: the assistant turn that made the calls
+                        with metrics_service.span("save_assistant_message"):
+                            await asyncio.shield(_save_assistant_message(session_id, ""))
+                        llm_messages.append({"role": "assistant", "content": "", "tool_calls": tool_calls})
+                    else:
+                        tools = None
+
+                if not tool_calls:
+                    # Stream Response
+                    try:
+                        # aclosing: a cancel mid-stream must still close the Ollama stream now
+                        with metrics_service.span("llm_stream"):
+                            async with aclosing(llm_service.chat_stream(llm_messages, tools=tools)) as stream:
+                                async for chunk in stream:
+                                    content = chunk.get('content', '')
+                                    if content:
+                                        full_content += content
+                                        outbox.put(content)
+
+                                    if chunk.get('tool_calls'):
+                                        tool_calls.extend(chunk['tool_calls'])
+                    except asyncio.CancelledError:
+                        # Stopped mid-answer: the Ollama stream is already closed and
+                        # the LLM slot released; keep what the user has seen
+                        if full_content:
+                            await asyncio.shield(_save_assistant_message(session_id, full_content))
+                        raise
+                    finally:
+                        outbox.finish()
                 
-                # Save Assistant Message
-                async with AsyncSessionLocal() as db:
-                    # If it was a tool call, content might be empty or explanatory
-                    ai_msg = Message(session_id=session_id, role="assistant", content=full_content)
-                    db.add(ai_msg)
-                    await db.commit()
+                    # Save Assistant Message
+                    with metrics_service.span("save_assistant_message"):
+                        # If it was a tool call, content might be empty or explanatory.
+                        # Shielded: a client may send its next message as soon as the
+                        # stream ends, and that interrupt mustn't lose this reply
+                        await asyncio.shield(_save_assistant_message(session_id, full_content))
                 
-                llm_messages.append({"role": "assistant", "content": full_content})
+                    assistant_msg = {"role": "assistant", "content": full_content}
+                    if tool_calls:
+                        assistant_msg["tool_calls"] = tool_calls
+                    llm_messages.append(assistant_msg)
 
-                # If no tool calls, we are done
-                if not tool_calls:
-                    break
+                    # If no tool calls, we are done
+                    if not tool_calls:
+                        break
                 
                 # Execute Tools
                 # Send a marker to client?
-                await websocket.send_text("\n\n*Processing actions...*\n")
+                outbox.put("\n\n*Processing actions...*\n")
                 
                 for tool in tool_calls:
                     func_name = tool['function']['name']
                     args = tool['function']['arguments']
                     
                     # Execute
-                    async with AsyncSessionLocal() as db:
-                        result = await agent_service.execute_tool(func_name, args, db)
+                    with metrics_service.span("tool_execution", tool=func_name):
+                        async with AsyncSessionLocal() as db:
+                            result = await agent_service.execute_tool(func_name, args, db)
                     
                     # Add result to history
                     llm_messages.append({
@@ -229,10 +386,41 @@ async def websocket_endpoint(websocket: WebSocket, session_id: int):
                         db.add(tool_msg)
                         await db.commit()
                         
-                    await websocket.send_text(f"\n> Action: {func_name} -> {result}\n")
+                    outbox.put(f"\n> Action: {func_name} -> {result}\n")
                 
                 # Loop will run again with new history (assistant msg + tool results) to generate final response
-                
+
+            metrics_service.observe("jarvis_chat_turn_seconds", time.perf_counter() - turn_started)
+        except asyncio.CancelledError:
+            raise
+        except WebSocketDisconnect:
+            pass # The read loop sees it too and cleans up
+        except Exception as e:
+            print(f"Error in websocket: {e}")
+            try:
+                await websocket.close()
+            except:
+                pass
+
+    # Generation runs as a task so this loop keeps reading: a stop frame or a
+    # new message cancels it, and so does the client going away. It writes to
+    # the outbox, never to the socket, so a slow client can't hold up the model
+    outbox = OutboundBuffer(
+        websocket,
+        max_frames=settings.WS_SEND_BUFFER_FRAMES,
+        policy=settings.WS_SLOW_CONSUMER_POLICY,
+        send_timeout=settings.WS_SEND_TIMEOUT_SECONDS
+    )
+    outbox.start()
+    turn: Optional[asyncio.Task] = None
+    try:
+        while True:
+            data = await websocket.receive_text()
+            if _is_stop_frame(data):
+                await _cancel_turn(turn, "stop")
+                continue
+            await _cancel_turn(turn, "interrupt")
+            turn = asyncio.create_task(run_turn(data))
     except WebSocketDisconnect:
         print(f"Client disconnected from session {session_id}")
     except Exception as e:
@@ -241,3 +429,6 @@ async def websocket_endpoint(websocket: WebSocket, session_id: int):
             await websocket.close()
         except:
             pass
+    finally:
+        await _cancel_turn(turn, "disconnect")
+        await outbox.stop()
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app import schemas
+from app.services.dashboard_service import dashboard_service
+
+router = APIRouter()
+
+@router.get("/dashboard", response_model=schemas.Dashboard)
+async def read_dashboard(db: AsyncSession = Depends(get_db)):
+    """Task counts, upcoming deadlines, today's events and project/file counts in one call."""
+    return await dashboard_service.get(db)
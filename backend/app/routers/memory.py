@@ -1,18 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List
+from typing import List, Optional
 
 from app.database import get_db
 from app.models.memory import MemoryEntry
 from app import schemas
+from app.services.rag_service import rag_service
+from app.pagination import keyset, set_next_cursor
 
 router = APIRouter()
 
+MEMORY_ORDER = [(MemoryEntry.created_at, True), (MemoryEntry.id, True)]
+
 @router.get("/memory", response_model=List[schemas.Memory])
-async def read_memory(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(MemoryEntry).order_by(MemoryEntry.created_at.desc()).offset(skip).limit(limit))
-    return result.scalars().all()
+async def read_memory(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    category: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    query = select(MemoryEntry)
+    if category:
+        query = query.where(MemoryEntry.category == category)
+
+    query = keyset(query, MEMORY_ORDER, cursor)
+    if not cursor:
+        query = query.offset(skip)
+    result = await db.execute(query.limit(limit))
+    memories = result.scalars().all()
+    set_next_cursor(response, memories, limit, MEMORY_ORDER)
+    return memories
 
 @router.post("/memory", response_model=schemas.Memory)
 async def create_memory(memory: schemas.MemoryCreate, db: AsyncSession = Depends(get_db)):
@@ -32,8 +52,8 @@ async def delete_memory(memory_id: int, db: AsyncSession = Depends(get_db)):
     if not db_memory:
         raise HTTPException(status_code=404, detail="Memory not found")
     
+    await rag_service.forget(db, "memory", [memory_id])
     await db.delete(db_memory)
     await db.commit()
-    # In Phase 3, delete from Pinecone as well
     
     return {"message": "Memory deleted"}
@@ -1,31 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, File, Form, Response, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
-from typing import List
+from typing import List, Optional
+import asyncio
 import shutil
+import tempfile
 import os
 
 from app.database import get_db
 from app.models.project import Project, ProjectFile
 from app import schemas
 from app.config import get_settings
-from app.services.file_service import read_file_content
-from app.services.rag_service import rag_service
+from app.pagination import keyset, set_next_cursor
+from app.services.rag_service import rag_service, project_namespace, summary_namespace
+from app.services.summary_service import summary_service
+from app.services.blob_store import blob_store
+from app.services.dashboard_service import dashboard_service
+from app.services.import_service import import_service, is_archive
+from app.services.metrics_service import metrics_service
 
 settings = get_settings()
 router = APIRouter()
 
+FILE_ORDER = [(ProjectFile.id, False)]
+
+# Counted in SQL (index on project_files.project_id) instead of loading every file row
+file_count_column = (
+    select(func.count(ProjectFile.id))
+    .where(ProjectFile.project_id == Project.id)
+    .correlate(Project)
+    .scalar_subquery()
+    .label("file_count")
+)
+
+async def _get_project_or_404(project_id: int, db: AsyncSession) -> Project:
+    result = await db.execute(select(Project).where(Project.id == project_id))
+    db_project = result.scalar_one_or_none()
+    if not db_project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return db_project
+
 @router.get("/projects", response_model=List[schemas.Project])
 async def read_projects(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
-    # Load projects and count files (simulated count for now or explicit query)
-    result = await db.execute(select(Project).options(selectinload(Project.files)).offset(skip).limit(limit))
-    projects = result.scalars().all()
-    
-    # Populate file_count
-    for p in projects:
-        p.file_count = len(p.files)
-        
+    result = await db.execute(
+        select(Project, file_count_column)
+        .order_by(Project.id)
+        .offset(skip).limit(limit)
+    )
+    projects = []
+    for project, file_count in result.all():
+        project.file_count = file_count
+        projects.append(project)
+
     return projects
 
 @router.post("/projects", response_model=schemas.Project)
@@ -34,22 +61,36 @@ async def create_project(project: schemas.ProjectCreate, db: AsyncSession = Depe
     db.add(db_project)
     await db.commit()
     await db.refresh(db_project)
+    dashboard_service.invalidate()
     return db_project
 
 @router.get("/projects/{project_id}", response_model=schemas.Project)
 async def read_project(project_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Project).options(selectinload(Project.files)).where(Project.id == project_id))
-    db_project = result.scalar_one_or_none()
-    if not db_project:
+    result = await db.execute(select(Project, file_count_column).where(Project.id == project_id))
+    row = result.one_or_none()
+    if not row:
         raise HTTPException(status_code=404, detail="Project not found")
-    
-    db_project.file_count = len(db_project.files)
+
+    db_project, file_count = row
+    db_project.file_count = file_count
     return db_project
 
 @router.get("/projects/{project_id}/files", response_model=List[schemas.ProjectFile])
-async def read_project_files(project_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(ProjectFile).where(ProjectFile.project_id == project_id))
-    return result.scalars().all()
+async def read_project_files(
+    project_id: int,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    query = keyset(select(ProjectFile).where(ProjectFile.project_id == project_id), FILE_ORDER, cursor)
+    if not cursor:
+        query = query.offset(skip)
+    result = await db.execute(query.limit(limit))
+    files = result.scalars().all()
+    set_next_cursor(response, files, limit, FILE_ORDER)
+    return files
 
 @router.post("/projects/{project_id}/upload", response_model=schemas.ProjectFile)
 async def upload_file(project_id: int, file: UploadFile = File(...), db: AsyncSession = Depends(get_db)):
@@ -59,46 +100,102 @@ async def upload_file(project_id: int, file: UploadFile = File(...), db: AsyncSe
     if not db_project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    # 2. Save to Disk
-    upload_dir = os.path.join(settings.UPLOAD_DIR, str(project_id))
-    os.makedirs(upload_dir, exist_ok=True)
-    file_path = os.path.join(upload_dir, file.filename)
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    # 3. Read Content & Index
-    # Reset file pointer for reading content after save (or read before save)
-    # UploadFile file-like object is at the end after copyfileobj?
-    # Actually better to read content, then write content to file.
-    # But read_file_content is async and uses UploadFile methods.
-    
-    await file.seek(0)
-    content = await read_file_content(file)
-    
-    # 4. Upsert to RAG
-    file_id = f"proj_{project_id}_{file.filename}"
-    await rag_service.upsert_document(
-        text=content,
-        metadata={
-            "project_id": int(project_id),  # Ensure integer for Pinecone filtering
-            "filename": file.filename,
-            "type": "project_file"
-        },
-        namespace="default"  # Use default namespace with metadata filtering
-    )
+    # 2. Stage to disk, hashing as it's written
+    with metrics_service.span("upload_save"):
+        staged = await blob_store.stage(file.file)
 
-    # 5. Create DB Entry
-    db_file = ProjectFile(
-        project_id=project_id,
-        filename=file.filename,
-        file_path=file_path,
-        file_type=file.filename.split('.')[-1],
-        pinecone_id=file_id,
-        summary=content[:200] + "..." # specific summary generation later
-    )
-    db.add(db_file)
-    await db.commit()
+    try:
+        # 3. Index in RAG: copies the vectors if this content is already indexed elsewhere
+        namespace = project_namespace(project_id) # One namespace per project keeps scoped queries small
+        with metrics_service.span("upload_index"):
+            vector_ids, content = await blob_store.index(
+                db, staged, file.filename,
+                metadata={
+                    "project_id": int(project_id),  # Ensure integer for Pinecone filtering
+                    "type": "project_file"
+                },
+                namespace=namespace
+            )
+
+        # 4. Create DB Entry, pointing at the shared blob
+        db_file = ProjectFile(
+            project_id=project_id,
+            filename=file.filename,
+            file_path=await blob_store.add(db, staged),
+            file_type=file.filename.split('.')[-1],
+            pinecone_id=f"proj_{project_id}_{file.filename}",
+            summary=content[:200] + "...", # Placeholder until summary_service writes the real one
+            content_hash=staged.digest
+        )
+        db.add(db_file)
+        await db.flush()
+        rag_service.track(db, "project_file", db_file.id, vector_ids, namespace)
+        await db.commit()
+    finally:
+        blob_store.discard(staged)
     await db.refresh(db_file)
+    summary_service.wake()
+    dashboard_service.invalidate()
     
     return db_file
+
+@router.delete("/projects/{project_id}")
+async def delete_project(project_id: int, db: AsyncSession = Depends(get_db)):
+    db_project = await _get_project_or_404(project_id, db)
+
+    # Drop the files' vectors first so nothing is left behind in the index
+    result = await db.execute(select(ProjectFile).where(ProjectFile.project_id == project_id))
+    files = result.scalars().all()
+    await rag_service.forget(db, "project_file", [f.id for f in files])
+    rag_service.drop_namespace(project_namespace(project_id))
+    rag_service.drop_namespace(summary_namespace(project_id))
+    await blob_store.release(db, files)
+
+    await db.delete(db_project)
+    await db.commit()
+    dashboard_service.invalidate()
+    await blob_store.collect()
+    return {"message": "Project deleted"}
+
+@router.post("/projects/{project_id}/import", response_model=schemas.ImportResult)
+async def import_directory(project_id: int, request: schemas.ImportRequest, db: AsyncSession = Depends(get_db)):
+    """Bulk-import a directory on the server (e.g. a cloned repository)."""
+    await _get_project_or_404(project_id, db)
+    # Resolved (symlinks, "..") before the check so the request can't climb out of IMPORT_ROOT
+    path = os.path.realpath(request.path)
+    root = os.path.realpath(settings.IMPORT_ROOT) if settings.IMPORT_ROOT else None
+    if root is None or os.path.commonpath([root, path]) != root:
+        raise HTTPException(status_code=403, detail="Path is outside IMPORT_ROOT")
+    if not os.path.isdir(path):
+        raise HTTPException(status_code=400, detail="Path is not a directory")
+
+    return await import_service.import_directory(
+        db, project_id, path,
+        exclude=request.exclude,
+        max_file_size_kb=request.max_file_size_kb
+    )
+
+def _spool(source, tmp):
+    shutil.copyfileobj(source, tmp)
+    tmp.flush()
+
+@router.post("/projects/{project_id}/import/archive", response_model=schemas.ImportResult)
+async def import_archive(
+    project_id: int,
+    file: UploadFile = File(...),
+    exclude: Optional[str] = Form(None), # Comma-separated patterns
+    max_file_size_kb: Optional[int] = Form(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Bulk-import a .zip / .tar(.gz) archive."""
+    await _get_project_or_404(project_id, db)
+    if not is_archive(file.filename or ""):
+        raise HTTPException(status_code=400, detail="Expected a .zip or .tar archive")
+
+    patterns = [p.strip() for p in exclude.split(",") if p.strip()] if exclude else []
+    with tempfile.NamedTemporaryFile(suffix=os.path.basename(file.filename)) as tmp:
+        await asyncio.to_thread(_spool, file.file, tmp)
+        try:
+            return await import_service.import_archive(db, project_id, tmp.name, patterns, max_file_size_kb)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
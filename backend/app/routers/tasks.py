@@ -1,24 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List
-import os
-import shutil
+from typing import List, Optional
+from datetime import datetime, timedelta
 
 from app.database import get_db
 from app.models.task import Task, CalendarEvent, TaskFile
 from app.models.chat import ChatSession
-from app.services.rag_service import rag_service
+from app.services.rag_service import rag_service, task_namespace
+from app.services.calendar_service import calendar_service, EVENT_ORDER
+from app.services.metrics_service import metrics_service
+from app.services.blob_store import blob_store
+from app.services.dashboard_service import dashboard_service
 from app import schemas
+from app.config import get_settings
+from app.pagination import keyset, set_next_cursor
 
+settings = get_settings()
 router = APIRouter()
 
+TASK_ORDER = [(Task.id, False)]
+
 # --- Tasks ---
 
 @router.get("/tasks", response_model=List[schemas.Task])
-async def read_tasks(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Task).offset(skip).limit(limit))
-    return result.scalars().all()
+async def read_tasks(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    tag: Optional[str] = None,
+    deadline_from: Optional[datetime] = None,
+    deadline_to: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    query = select(Task)
+    if status:
+        query = query.where(Task.status == status)
+    if priority:
+        query = query.where(Task.priority == priority)
+    if tag:
+        query = query.where(Task.tag == tag)
+    if deadline_from:
+        query = query.where(Task.deadline >= deadline_from)
+    if deadline_to:
+        query = query.where(Task.deadline < deadline_to)
+
+    query = keyset(query, TASK_ORDER, cursor)
+    if not cursor:
+        query = query.offset(skip)
+    result = await db.execute(query.limit(limit))
+    tasks = result.scalars().all()
+    set_next_cursor(response, tasks, limit, TASK_ORDER)
+    return tasks
 
 @router.post("/tasks", response_model=schemas.Task)
 async def create_task(task: schemas.TaskCreate, db: AsyncSession = Depends(get_db)):
@@ -26,6 +62,7 @@ async def create_task(task: schemas.TaskCreate, db: AsyncSession = Depends(get_d
     db.add(db_task)
     await db.commit()
     await db.refresh(db_task)
+    dashboard_service.invalidate()
     return db_task
 
 @router.put("/tasks/{task_id}", response_model=schemas.Task)
@@ -40,6 +77,7 @@ async def update_task(task_id: int, task: schemas.TaskUpdate, db: AsyncSession =
     
     await db.commit()
     await db.refresh(db_task)
+    dashboard_service.invalidate()
     return db_task
 
 @router.delete("/tasks/{task_id}")
@@ -48,26 +86,99 @@ async def delete_task(task_id: int, db: AsyncSession = Depends(get_db)):
     db_task = result.scalar_one_or_none()
     if not db_task:
         raise HTTPException(status_code=404, detail="Task not found")
+
+    # Attachments' vectors and blobs go with the task (the rows cascade, the index and disk don't)
+    result = await db.execute(select(TaskFile).where(TaskFile.task_id == task_id))
+    files = result.scalars().all()
+    await rag_service.forget(db, "task_file", [f.id for f in files])
+    rag_service.drop_namespace(task_namespace(task_id))
+    await blob_store.release(db, files)
     
     await db.delete(db_task)
     await db.commit()
+    dashboard_service.invalidate()
+    await blob_store.collect()
     return {"message": "Task deleted"}
 
 # --- Calendar Events ---
 
 @router.get("/events", response_model=List[schemas.Event])
-async def read_events(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(CalendarEvent).offset(skip).limit(limit))
-    return result.scalars().all()
+async def read_events(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    task_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    start = calendar_service.to_naive_utc(start)
+    end = calendar_service.to_naive_utc(end)
+    query = select(CalendarEvent)
+    if task_id is not None:
+        query = query.where(CalendarEvent.task_id == task_id)
+
+    if start and end:
+        return await _read_events_window(response, query, start, end, skip, limit, cursor, db)
+
+    # Open-ended window: stored rows only, recurring series are not expanded
+    if start:
+        query = query.where(CalendarEvent.end_time > start)
+    if end:
+        query = query.where(CalendarEvent.start_time < end)
+
+    query = keyset(query, EVENT_ORDER, cursor)
+    if not cursor:
+        query = query.offset(skip)
+    result = await db.execute(query.limit(limit))
+    events = result.scalars().all()
+    set_next_cursor(response, events, limit, EVENT_ORDER)
+    return events
+
+async def _read_events_window(response: Response, query, start: datetime, end: datetime, skip: int, limit: int, cursor: Optional[str], db: AsyncSession):
+    """Events overlapping [start, end) with recurring series expanded into occurrences."""
+    occurrences = await calendar_service.events_between(
+        db, start, end, query, cursor, limit=limit if cursor else skip + limit
+    )
+    page = occurrences[:limit] if cursor else occurrences[skip:skip + limit]
+    set_next_cursor(response, page, limit, EVENT_ORDER)
+    return page
 
 @router.post("/events", response_model=schemas.Event)
 async def create_event(event: schemas.EventCreate, db: AsyncSession = Depends(get_db)):
     db_event = CalendarEvent(**event.model_dump())
+    if db_event.rrule:
+        try:
+            db_event.recurrence_end = calendar_service.recurrence_end(db_event.rrule, db_event.start_time, db_event.end_time)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     db.add(db_event)
+    revision = await calendar_service.bump(db)
     await db.commit()
     await db.refresh(db_event)
+    calendar_service.track(db_event, revision)
+    dashboard_service.invalidate()
     return db_event
 
+@router.get("/events/free", response_model=List[schemas.TimeSlot])
+async def read_free_slots(
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    duration: int = 30, # minutes
+    day_start: Optional[int] = Query(None, ge=0, le=24),
+    day_end: Optional[int] = Query(None, ge=0, le=24),
+    db: AsyncSession = Depends(get_db)
+):
+    start = calendar_service.to_naive_utc(start)
+    end = calendar_service.to_naive_utc(end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+
+    await calendar_service.ensure_index(db)
+    slots = calendar_service.free_slots(start, end, timedelta(minutes=duration), day_start, day_end)
+    return [schemas.TimeSlot(start=s, end=e) for s, e in slots]
+
 @router.delete("/events/{event_id}")
 async def delete_event(event_id: int, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(CalendarEvent).where(CalendarEvent.id == event_id))
@@ -76,7 +187,10 @@ async def delete_event(event_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Event not found")
     
     await db.delete(db_event)
+    revision = await calendar_service.bump(db)
     await db.commit()
+    calendar_service.untrack(event_id, revision)
+    dashboard_service.invalidate()
     return {"message": "Event deleted"}
 
 # --- Task Files & Chat ---
@@ -94,35 +208,43 @@ async def upload_task_file(task_id: int, file: UploadFile = File(...), db: Async
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    # 2. Save file to disk
-    upload_dir = f"../data/uploads/tasks/{task_id}"
-    os.makedirs(upload_dir, exist_ok=True)
-    file_path = os.path.join(upload_dir, file.filename)
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    # 3. Create DB Entry
-    file_type = file.filename.split('.')[-1]
-    db_file = TaskFile(
-        task_id=task_id,
-        filename=file.filename,
-        file_path=file_path,
-        file_type=file_type
-    )
-    db.add(db_file)
-    await db.commit()
+    # 2. Stage to disk, hashing as it's written
+    with metrics_service.span("upload_save"):
+        staged = await blob_store.stage(file.file)
+
+    try:
+        # 3. Index in RAG, in the task's own namespace (copied if the content is indexed elsewhere)
+        namespace = task_namespace(task_id)
+        vector_ids = []
+        try:
+            with metrics_service.span("upload_index"):
+                vector_ids, _ = await blob_store.index(
+                    db, staged, file.filename,
+                    metadata={"task_id": int(task_id), "type": "task_file"},
+                    namespace=namespace
+                )
+        except Exception as e:
+            print(f"Error indexing file: {e}")
+            # Non-blocking: the attachment is still saved
+
+        # 4. Create DB Entry, pointing at the shared blob
+        file_type = file.filename.split('.')[-1]
+        db_file = TaskFile(
+            task_id=task_id,
+            filename=file.filename,
+            file_path=await blob_store.add(db, staged),
+            file_type=file_type,
+            pinecone_id=f"task_{task_id}_{file.filename}" if vector_ids else None,
+            content_hash=staged.digest
+        )
+        db.add(db_file)
+        await db.flush()
+        rag_service.track(db, "task_file", db_file.id, vector_ids, namespace)
+        await db.commit()
+    finally:
+        blob_store.discard(staged)
     await db.refresh(db_file)
     
-    # 4. Index in RAG (Task Context)
-    # We pass metadata to filter by task_id later if needed, or simply project_id logic 
-    # For now, we'll index it with metadata task_id
-    try:
-        await rag_service.index_file(file_path, metadata={"task_id": task_id, "filename": file.filename})
-    except Exception as e:
-        print(f"Error indexing file: {e}")
-        # Non-blocking for now
-        
     return db_file
 
 @router.post("/tasks/{task_id}/chat", response_model=schemas.ChatSessionSummary)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional, Any
+from typing import Dict, List, Optional, Any
 from datetime import datetime
 
 # --- Task Schemas ---
@@ -45,6 +45,7 @@ class EventBase(BaseModel):
     all_day: bool = False
     type: str = "event"
     task_id: Optional[int] = None
+    rrule: Optional[str] = None # e.g. "FREQ=WEEKLY;BYDAY=MO;COUNT=10"
 
 class EventCreate(EventBase):
     pass
@@ -60,6 +61,10 @@ class Event(EventBase):
     class Config:
         from_attributes = True
 
+class TimeSlot(BaseModel):
+    start: datetime
+    end: datetime
+
 # --- Project Schemas ---
 class ProjectBase(BaseModel):
     name: str
@@ -88,6 +93,21 @@ class ProjectFile(BaseModel):
     class Config:
         from_attributes = True
 
+class ImportRequest(BaseModel):
+    path: str # Directory on the server, under IMPORT_ROOT
+    exclude: List[str] = [] # Extra .gitignore-style patterns
+    max_file_size_kb: Optional[int] = None
+
+class ImportResult(BaseModel):
+    imported: int
+    skipped_duplicate: int
+    skipped_too_large: int
+    skipped_excluded: int
+    vectors: int
+    failed: List[str] = []
+    class Config:
+        from_attributes = True
+
 # --- Chat Schemas ---
 class MessageBase(BaseModel):
     role: str
@@ -105,6 +125,16 @@ class Message(MessageBase):
     class Config:
         from_attributes = True
 
+class MessageSearchHit(BaseModel):
+    id: int
+    session_id: int
+    session_title: Optional[str] = None
+    role: str
+    snippet: str # Matches wrapped in <mark></mark>
+    timestamp: datetime
+    class Config:
+        from_attributes = True
+
 class ChatSessionBase(BaseModel):
     title: str = "New Chat"
 
@@ -137,6 +167,20 @@ class Memory(MemoryBase):
     class Config:
         from_attributes = True
 
+# --- Dashboard Schemas ---
+class TaskCounts(BaseModel):
+    total: int = 0
+    by_status: Dict[str, int] = {}
+    overdue: int = 0 # Not done, deadline passed
+
+class Dashboard(BaseModel):
+    tasks: TaskCounts
+    upcoming_deadlines: List[Task] # Open tasks with the nearest deadlines
+    events_today: List[Event] # Current UTC day, recurrences expanded
+    projects: int
+    project_files: int
+    generated_at: datetime
+
 # --- LLM/Agent Schemas ---
 class ChatRequest(BaseModel):
     message: str
@@ -1,48 +1,145 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import json
-from datetime import datetime
+import re
+from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from app.config import get_settings
 from app.models.task import Task, CalendarEvent
+from app.services.calendar_service import calendar_service
+from app.services.dashboard_service import dashboard_service
+from app.services.metrics_service import metrics_service
 
-class AgentService:
-    def get_tools_schema(self) -> List[Dict[str, Any]]:
-        return [
-            {
-                'type': 'function',
-                'function': {
-                    'name': 'create_task',
-                    'description': 'Create a new task in the Kanban board',
-                    'parameters': {
-                        'type': 'object',
-                        'properties': {
-                            'title': {'type': 'string', 'description': 'Title of the task'},
-                            'priority': {'type': 'string', 'enum': ['low', 'med', 'high'], 'description': 'Priority level'},
-                            'tag': {'type': 'string', 'description': 'Tag like DEV, BUG, GEN'},
-                            'description': {'type': 'string', 'description': 'Detailed description'}
-                        },
-                        'required': ['title']
-                    }
+settings = get_settings()
+
+# Tool schemas, grouped so a turn only carries the ones its message could need
+TOOL_GROUPS: Dict[str, List[Dict[str, Any]]] = {
+    "tasks": [
+        {
+            'type': 'function',
+            'function': {
+                'name': 'create_task',
+                'description': 'Create a new task in the Kanban board',
+                'parameters': {
+                    'type': 'object',
+                    'properties': {
+                        'title': {'type': 'string', 'description': 'Title of the task'},
+                        'priority': {'type': 'string', 'enum': ['low', 'med', 'high'], 'description': 'Priority level'},
+                        'tag': {'type': 'string', 'description': 'Tag like DEV, BUG, GEN'},
+                        'description': {'type': 'string', 'description': 'Detailed description'}
+                    },
+                    'required': ['title']
+                }
+            }
+        }
+    ],
+    "calendar": [
+        {
+            'type': 'function',
+            'function': {
+                'name': 'create_calendar_event',
+                'description': 'Schedule a new event on the calendar',
+                'parameters': {
+                    'type': 'object',
+                    'properties': {
+                        'title': {'type': 'string', 'description': 'Event title'},
+                        'start_time': {'type': 'string', 'description': 'Start time in ISO format (YYYY-MM-DDTHH:MM:SS)'},
+                        'end_time': {'type': 'string', 'description': 'End time in ISO format'},
+                        'description': {'type': 'string', 'description': 'Event details'},
+                        'allow_conflict': {'type': 'boolean', 'description': 'Schedule even if it overlaps existing events'}
+                    },
+                    'required': ['title', 'start_time', 'end_time']
+                }
+            }
+        },
+        {
+            'type': 'function',
+            'function': {
+                'name': 'find_free_slots',
+                'description': 'Find free time slots in the calendar, e.g. "an hour on Thursday"',
+                'parameters': {
+                    'type': 'object',
+                    'properties': {
+                        'start_time': {'type': 'string', 'description': 'Search from, ISO format (YYYY-MM-DDTHH:MM:SS)'},
+                        'end_time': {'type': 'string', 'description': 'Search until, ISO format'},
+                        'duration_minutes': {'type': 'integer', 'description': 'Required length of the slot in minutes'}
+                    },
+                    'required': ['start_time', 'end_time', 'duration_minutes']
                 }
-            },
-            {
-                'type': 'function',
-                'function': {
-                    'name': 'create_calendar_event',
-                    'description': 'Schedule a new event on the calendar',
-                    'parameters': {
-                        'type': 'object',
-                        'properties': {
-                            'title': {'type': 'string', 'description': 'Event title'},
-                            'start_time': {'type': 'string', 'description': 'Start time in ISO format (YYYY-MM-DDTHH:MM:SS)'},
-                            'end_time': {'type': 'string', 'description': 'End time in ISO format'},
-                            'description': {'type': 'string', 'description': 'Event details'}
-                        },
-                        'required': ['title', 'start_time', 'end_time']
-                    }
+            }
+        },
+        {
+            'type': 'function',
+            'function': {
+                'name': 'check_availability',
+                'description': 'List calendar events that overlap a time range',
+                'parameters': {
+                    'type': 'object',
+                    'properties': {
+                        'start_time': {'type': 'string', 'description': 'Start time in ISO format'},
+                        'end_time': {'type': 'string', 'description': 'End time in ISO format'}
+                    },
+                    'required': ['start_time', 'end_time']
                 }
             }
-        ]
+        }
+    ],
+}
+
+# Cheap per-message intent check (no LLM call). Errs towards attaching tools:
+# a false positive costs some prompt tokens, a false negative a missed action.
+_WEEKDAYS = r"monday|tuesday|wednesday|thursday|friday|saturday|sunday"
+INTENT_PATTERNS: Dict[str, re.Pattern] = {
+    "tasks": re.compile(
+        r"\b(tasks?|to-?dos?|remind(er|ers)?|kanban|backlog|tickets?|follow[- ]up|don'?t (let me )?forget)\b",
+        re.IGNORECASE
+    ),
+    "calendar": re.compile(
+        r"\b(schedul\w*|calendar|meetings?|events?|appointments?|book|reschedul\w*|free|busy|availab\w*|slots?"
+        r"|today|tonight|tomorrow|next week|this week|" + _WEEKDAYS + r")\b"
+        r"|\b\d{1,2}(:\d{2})?\s?(am|pm)\b",
+        re.IGNORECASE
+    ),
+}
+
+# A short reply ("yes, make it high priority") keeps the previous message's tools
+FOLLOW_UP_MAX_WORDS = 8
+
+class AgentService:
+    def __init__(self):
+        # Built once per group combination and reused, so turns don't rebuild schemas
+        self._tool_sets: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def get_tools_schema(self) -> List[Dict[str, Any]]:
+        return [tool for group in TOOL_GROUPS.values() for tool in group]
+
+    def match_intent(self, text: str) -> Tuple[str, ...]:
+        """Tool groups whose keywords appear in the message, in TOOL_GROUPS order."""
+        if not settings.TOOL_GATING:
+            return tuple(TOOL_GROUPS)
+        return tuple(name for name, pattern in INTENT_PATTERNS.items() if pattern.search(text))
+
+    def classify_intent(self, text: str, previous: Tuple[str, ...] = ()) -> Tuple[str, ...]:
+        """
+        Tool groups to attach for this message; () for plain chat. `previous` is
+        what the last message got, so a chain of short follow-ups keeps its tools.
+        """
+        groups = self.match_intent(text)
+        if not groups and previous and len(text.split()) <= FOLLOW_UP_MAX_WORDS:
+            groups = previous
+        for group in groups or ("none",):
+            metrics_service.inc("chat_tool_groups_total", labels={"group": group})
+        return groups
+
+    def tools_for(self, groups: Tuple[str, ...]) -> Optional[List[Any]]:
+        """Pre-validated tool list for these groups, or None to send no tools."""
+        if not groups:
+            return None
+        if groups not in self._tool_sets:
+            from app.services.llm_service import llm_service
+            schemas = [tool for name in groups for tool in TOOL_GROUPS[name]]
+            self._tool_sets[groups] = llm_service.prepare_tools(schemas)
+        return self._tool_sets[groups]
 
     async def execute_tool(self, name: str, args: Dict[str, Any], db: AsyncSession) -> str:
         try:
@@ -50,6 +147,10 @@ class AgentService:
                 return await self._create_task(args, db)
             elif name == 'create_calendar_event':
                 return await self._create_calendar_event(args, db)
+            elif name == 'find_free_slots':
+                return await self._find_free_slots(args, db)
+            elif name == 'check_availability':
+                return await self._check_availability(args, db)
             else:
                 return f"Error: Tool {name} not found"
         except Exception as e:
@@ -66,14 +167,31 @@ class AgentService:
         db.add(task)
         await db.commit()
         await db.refresh(task)
+        dashboard_service.invalidate()
         return f"Task created successfully: ID {task.id} - {task.title}"
 
+    def _parse_times(self, args: Dict[str, Any]) -> Tuple[datetime, datetime]:
+        """start_time/end_time as naive UTC, like stored events ("...Z" and offsets are converted)."""
+        start = datetime.fromisoformat(args.get('start_time'))
+        end = datetime.fromisoformat(args.get('end_time'))
+        return calendar_service.to_naive_utc(start), calendar_service.to_naive_utc(end)
+
     async def _create_calendar_event(self, args: Dict[str, Any], db: AsyncSession) -> str:
         try:
-            start = datetime.fromisoformat(args.get('start_time'))
-            end = datetime.fromisoformat(args.get('end_time'))
-        except ValueError:
+            start, end = self._parse_times(args)
+        except (TypeError, ValueError):
             return "Error: Invalid date format. Use ISO format."
+        if end <= start:
+            return "Error: end_time must be after start_time."
+
+        if not args.get('allow_conflict'):
+            await calendar_service.ensure_index(db)
+            conflicts = calendar_service.busy(start, end)
+            if conflicts:
+                listing = "; ".join(f"{e.title} ({e.start_time} - {e.end_time})" for e in conflicts)
+                slots = calendar_service.free_slots(start, start + timedelta(days=7), end - start, day_start=8, day_end=20)
+                suggestion = f" Next free slot: {slots[0][0]} to {slots[0][0] + (end - start)}." if slots else ""
+                return f"Not scheduled: conflicts with {listing}.{suggestion} Retry with allow_conflict=true to book anyway."
 
         event = CalendarEvent(
             title=args.get('title'),
@@ -82,8 +200,43 @@ class AgentService:
             description=args.get('description')
         )
         db.add(event)
+        revision = await calendar_service.bump(db)
         await db.commit()
         await db.refresh(event)
+        calendar_service.track(event, revision)
+        dashboard_service.invalidate()
         return f"Event scheduled: {event.title} from {start} to {end}"
 
+    async def _find_free_slots(self, args: Dict[str, Any], db: AsyncSession) -> str:
+        try:
+            start, end = self._parse_times(args)
+            duration = timedelta(minutes=int(args.get('duration_minutes', 30)))
+        except (TypeError, ValueError):
+            return "Error: Invalid arguments. Use ISO format times and an integer duration."
+        if end <= start:
+            return "Error: end_time must be after start_time."
+
+        await calendar_service.ensure_index(db)
+        # Daytime hours only, nobody wants a 3am meeting suggestion
+        slots = calendar_service.free_slots(start, end, duration, day_start=8, day_end=20)
+        if not slots:
+            return "No free slots found in that range."
+        return "Free slots: " + "; ".join(f"{s} to {e}" for s, e in slots[:10])
+
+    async def _check_availability(self, args: Dict[str, Any], db: AsyncSession) -> str:
+        try:
+            start, end = self._parse_times(args)
+        except (TypeError, ValueError):
+            return "Error: Invalid date format. Use ISO format."
+        if end <= start:
+            return "Error: end_time must be after start_time."
+
+        await calendar_service.ensure_index(db)
+        conflicts = calendar_service.busy(start, end)
+        if not conflicts:
+            return f"Free from {start} to {end}."
+        return "Busy: " + "; ".join(f"{e.title} ({e.start_time} - {e.end_time})" for e in conflicts)
+
 agent_service = AgentService()
+
+metrics_service.counter("chat_tool_groups_total", "Tool groups attached to chat turns by the intent check (group=none: plain chat)")
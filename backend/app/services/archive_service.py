@@ -0,0 +1,200 @@
+"""
+Cold storage for old chat messages (SQLite).
+
+Sessions with no new message for MESSAGE_ARCHIVE_AFTER_DAYS have their message
+text moved into one zlib-compressed blob per session (`message_archives`). The
+message rows stay, with content NULL, so ordering, paging and search work
+as before. Readers fill the text back in from the blob, and a session is
+restored to plain rows as soon as it's opened for chatting again.
+
+Archiving frees pages inside the database file; SQLite reuses them for new
+rows. Handing them back to the filesystem takes a full VACUUM, which locks the
+database and rewrites the whole file, so the background job only runs one
+after a compaction pass leaves at least VACUUM_FREE_PERCENT of the file (and
+VACUUM_MIN_FREE_PAGES) free. `migrate_db.py --vacuum` runs one on request.
+"""
+import asyncio
+import json
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, func, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal, engine, IS_SQLITE
+from app.models.chat import Message, MessageArchive
+from app.services.metrics_service import metrics_service
+
+settings = get_settings()
+
+CODEC = "zlib"
+COMPACT_BATCH = 100 # Sessions archived per pass
+ARCHIVE_TRIGGERS_MIGRATION = 13 # Search triggers that keep archived messages indexed
+
+def _encode(contents: Dict[int, str]) -> bytes:
+    raw = json.dumps(sorted(contents.items())).encode()
+    return zlib.compress(raw, 9)
+
+def _decode(codec: str, data: bytes) -> Dict[int, str]:
+    if codec != CODEC:
+        raise ValueError(f"Unknown message archive codec '{codec}'")
+    return {int(mid): content for mid, content in json.loads(zlib.decompress(data))}
+
+class MessageArchiveService:
+    async def load(self, db: AsyncSession, session_id: int) -> Dict[int, str]:
+        """Archived text of a session by message id; {} if it has none."""
+        result = await db.execute(select(MessageArchive).where(MessageArchive.session_id == session_id))
+        archive = result.scalar_one_or_none()
+        if archive is None:
+            return {}
+        with metrics_service.span("message_archive_decode"):
+            return _decode(archive.codec, archive.data)
+
+    async def fill(self, db: AsyncSession, messages: Iterable[Message]):
+        """Put archived text back on loaded messages (in memory only, nothing is written)."""
+        archived: Dict[int, list] = {}
+        for message in messages:
+            if message.content is None:
+                archived.setdefault(message.session_id, []).append(message)
+        for session_id, pending in archived.items():
+            contents = await self.load(db, session_id)
+            for message in pending:
+                set_committed_value(message, "content", contents.get(message.id, ""))
+
+    async def restore(self, db: AsyncSession, session_id: int) -> int:
+        """Move a session's archived text back into its rows. Commits; returns messages restored."""
+        contents = await self.load(db, session_id)
+        if not contents:
+            return 0
+        # Bulk UPDATE by primary key
+        await db.execute(update(Message), [{"id": mid, "content": content} for mid, content in contents.items()])
+        await db.execute(delete(MessageArchive).where(MessageArchive.session_id == session_id))
+        await db.commit()
+        metrics_service.inc("message_archive_messages_total", len(contents), {"op": "restored"})
+        return len(contents)
+
+    async def _archive_session(self, db: AsyncSession, session_id: int) -> int:
+        result = await db.execute(
+            select(Message.id, Message.content)
+            .where(Message.session_id == session_id, Message.content.is_not(None))
+        )
+        contents = {mid: content for mid, content in result.all()}
+        if not contents:
+            return 0
+        added, added_bytes = len(contents), sum(len(c.encode()) for c in contents.values())
+
+        archive_result = await db.execute(select(MessageArchive).where(MessageArchive.session_id == session_id))
+        archive = archive_result.scalar_one_or_none()
+        if archive is not None:
+            contents = {**_decode(archive.codec, archive.data), **contents}
+        else:
+            archive = MessageArchive(session_id=session_id)
+            db.add(archive)
+
+        archive.codec = CODEC
+        archive.data = _encode(contents)
+        archive.message_count = len(contents)
+        archive.raw_bytes = sum(len(c.encode()) for c in contents.values())
+        archive.archived_at = datetime.utcnow()
+        await db.execute(
+            update(Message)
+            .where(Message.session_id == session_id, Message.content.is_not(None))
+            .values(content=None)
+        )
+        await db.commit()
+
+        metrics_service.inc("message_archive_messages_total", added, {"op": "archived"})
+        metrics_service.inc("message_archive_bytes_total", added_bytes, {"kind": "raw"})
+        metrics_service.inc("message_archive_bytes_total", len(archive.data), {"kind": "compressed"})
+        return added
+
+    async def compact(self, older_than_days: Optional[int] = None, limit: int = COMPACT_BATCH) -> Dict[str, int]:
+        """Archive up to `limit` sessions whose last message is older than the threshold."""
+        stats = {"sessions": 0, "messages": 0}
+        if not IS_SQLITE:
+            return stats # PostgreSQL compresses large values itself (TOAST)
+
+        from app.migrations import applied_versions
+        if ARCHIVE_TRIGGERS_MIGRATION not in await applied_versions(engine):
+            return stats # Archiving before then would drop messages from search
+
+        days = settings.MESSAGE_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        with metrics_service.span("message_archive_compact"):
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(Message.session_id)
+                    .group_by(Message.session_id)
+                    .having(func.max(Message.timestamp) < cutoff, func.count(Message.content) > 0)
+                    .limit(limit)
+                )
+                for session_id in result.scalars().all():
+                    archived = await self._archive_session(db, session_id)
+                    stats["sessions"] += 1
+                    stats["messages"] += archived
+                    await asyncio.sleep(0) # Let request handlers at the write lock
+        return stats
+
+    async def free_pages(self) -> Tuple[int, int]:
+        """(free pages, total pages) of the SQLite database file."""
+        async with engine.connect() as conn:
+            pages = (await conn.execute(text("PRAGMA page_count"))).scalar() or 0
+            free = (await conn.execute(text("PRAGMA freelist_count"))).scalar() or 0
+        return free, pages
+
+    async def vacuum(self) -> int:
+        """
+        VACUUM the SQLite database and truncate the WAL. Blocks every writer
+        for the whole rewrite, so only run from the background job (see
+        vacuum_if_worthwhile) or as a maintenance step. Returns the pages handed back.
+        """
+        if not IS_SQLITE:
+            return 0
+        free, _ = await self.free_pages()
+        # VACUUM can't run inside a transaction
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            with metrics_service.span("sqlite_vacuum"):
+                await conn.execute(text("VACUUM"))
+                await conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        return free
+
+    async def vacuum_if_worthwhile(self) -> int:
+        """VACUUM if enough of the file is free pages to be worth the lock. Returns the pages handed back."""
+        if not IS_SQLITE or settings.VACUUM_FREE_PERCENT <= 0:
+            return 0
+        free, pages = await self.free_pages()
+        if free < settings.VACUUM_MIN_FREE_PAGES or free * 100 < pages * settings.VACUUM_FREE_PERCENT:
+            return 0
+        reclaimed = await self.vacuum()
+        metrics_service.inc("sqlite_vacuum_pages_total", reclaimed)
+        return reclaimed
+
+    async def run_forever(self):
+        interval = settings.MESSAGE_ARCHIVE_INTERVAL_HOURS * 3600
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                while True:
+                    stats = await self.compact()
+                    if stats["sessions"]:
+                        print(f"Message archive: {stats}")
+                    if stats["sessions"] < COMPACT_BATCH:
+                        break
+                reclaimed = await self.vacuum_if_worthwhile()
+                if reclaimed:
+                    print(f"Message archive: VACUUM reclaimed {reclaimed} pages")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Message archive error: {e}")
+
+message_archive_service = MessageArchiveService()
+
+metrics_service.counter("message_archive_messages_total", "Chat messages moved into (archived) or out of (restored) cold storage")
+metrics_service.counter("message_archive_bytes_total", "Text archived (raw) and blob bytes written (compressed)")
+metrics_service.counter("sqlite_vacuum_pages_total", "Free pages handed back to the filesystem by scheduled VACUUMs")
@@ -0,0 +1,257 @@
+"""
+Content-addressed storage for uploaded files.
+
+Project and task uploads (and bulk imports) are stored once under
+UPLOAD_DIR/blobs/<2 hex>/<sha256>, whatever their name and however many
+projects or tasks they're attached to, so same-named files no longer overwrite
+each other. `blobs.ref_count` counts the file rows pointing at each blob; the
+file on disk is deleted when the last of them goes.
+
+A file whose content is already indexed for another project or task gets
+copies of those vectors instead of being extracted and embedded again.
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, event, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.models.blob import Blob
+from app.models.project import ProjectFile
+from app.models.task import TaskFile
+from app.models.vector import VectorChunk
+from app.services.metrics_service import metrics_service
+from app.services.rag_service import rag_service, SUMMARY_SUFFIX
+
+settings = get_settings()
+
+# File rows that reference blobs, by vector owner type
+OWNER_MODELS = {
+    "project_file": ProjectFile,
+    "task_file": TaskFile,
+}
+
+COPY_CHUNK_BYTES = 1024 * 1024
+
+@dataclass
+class StagedBlob:
+    """An upload written to a temp file and hashed, not yet in the store."""
+    digest: str
+    size: int
+    temp_path: str
+
+class BlobStore:
+    def __init__(self):
+        self.root = os.path.join(settings.UPLOAD_DIR, "blobs")
+        # Held while refs change and files move, so collect() can't delete a blob being re-added
+        self._lock = asyncio.Lock()
+        # Background cleanups of blobs written by transactions that rolled back
+        self._cleanups = set()
+
+    def path_for(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def owns(self, path: Optional[str]) -> bool:
+        """Whether a file row's path is a blob (rows from before the store have their own files)."""
+        return bool(path) and os.path.dirname(os.path.dirname(os.path.abspath(path))) == os.path.abspath(self.root)
+
+    def _stage(self, source: BinaryIO) -> StagedBlob:
+        os.makedirs(self.root, exist_ok=True)
+        sha = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=self.root, prefix=".upload-", delete=False) as tmp:
+            while chunk := source.read(COPY_CHUNK_BYTES):
+                sha.update(chunk)
+                tmp.write(chunk)
+                size += len(chunk)
+        return StagedBlob(sha.hexdigest(), size, tmp.name)
+
+    async def stage(self, source: BinaryIO) -> StagedBlob:
+        """Copy an upload stream to a temp file, hashing on the way (in a worker thread)."""
+        return await asyncio.to_thread(self._stage, source)
+
+    def discard(self, staged: StagedBlob):
+        """Remove the temp file of an upload that wasn't added (no-op once added)."""
+        if os.path.exists(staged.temp_path):
+            os.remove(staged.temp_path)
+
+    def _place(self, digest: str, temp_path: Optional[str] = None, data: Optional[bytes] = None):
+        path = self.path_for(digest)
+        if os.path.exists(path):
+            if temp_path:
+                os.remove(temp_path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if temp_path is None:
+            fd, temp_path = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+        os.replace(temp_path, path) # Atomic: readers never see a partial blob
+
+    async def _acquire(self, db: AsyncSession, digest: str, size: int) -> bool:
+        """Add a reference (flushed, the caller commits). True if the blob was already stored."""
+        result = await db.execute(
+            update(Blob).where(Blob.sha256 == digest).values(ref_count=Blob.ref_count + 1)
+        )
+        if result.rowcount:
+            return True
+        db.add(Blob(sha256=digest, size=size, ref_count=1))
+        await db.flush()
+        self._watch(db, digest)
+        return False
+
+    def _watch(self, db: AsyncSession, digest: str):
+        """Remember a blob this session created, to remove its file if the session doesn't commit."""
+        created = db.info.setdefault("blob_store_created", set())
+        created.add(digest)
+        if db.info.get("blob_store_watched"):
+            return
+        db.info["blob_store_watched"] = True
+        sync_session = db.sync_session
+
+        def committed(session):
+            session.info.get("blob_store_created", set()).clear()
+
+        def ended(session, transaction):
+            if transaction.parent is not None:
+                return # A savepoint; the outer transaction decides
+            digests = session.info.pop("blob_store_created", None)
+            if digests:
+                # Rolled back (or closed without committing): the Blob rows are gone
+                task = asyncio.get_running_loop().create_task(self._drop_unreferenced(list(digests)))
+                self._cleanups.add(task)
+                task.add_done_callback(self._cleanups.discard)
+
+        event.listen(sync_session, "after_commit", committed)
+        event.listen(sync_session, "after_transaction_end", ended)
+
+    async def _drop_unreferenced(self, digests: List[str]):
+        """Remove the files of blobs that have no row (their adding transaction rolled back)."""
+        async with self._lock, AsyncSessionLocal() as db:
+            result = await db.execute(select(Blob.sha256).where(Blob.sha256.in_(digests)))
+            stored = set(result.scalars().all())
+        for digest in digests:
+            if digest in stored:
+                continue # Added again by another session meanwhile
+            try:
+                os.remove(self.path_for(digest))
+            except FileNotFoundError:
+                pass
+
+    async def add(self, db: AsyncSession, staged: StagedBlob) -> str:
+        """
+        Move a staged upload into the store and reference it. Call right before
+        adding the file row; the caller commits. Returns the blob's path.
+        """
+        async with self._lock:
+            existed = await self._acquire(db, staged.digest, staged.size)
+            await asyncio.to_thread(self._place, staged.digest, temp_path=staged.temp_path)
+        self._record(existed, staged.size)
+        return self.path_for(staged.digest)
+
+    async def add_data(self, db: AsyncSession, data: bytes, digest: str) -> str:
+        """`add` for content already in memory and hashed (bulk import)."""
+        async with self._lock:
+            existed = await self._acquire(db, digest, len(data))
+            await asyncio.to_thread(self._place, digest, data=data)
+        self._record(existed, len(data))
+        return self.path_for(digest)
+
+    def _record(self, existed: bool, size: int):
+        metrics_service.inc("blob_store_writes_total", labels={"result": "duplicate" if existed else "new"})
+        if existed:
+            metrics_service.inc("blob_store_bytes_saved_total", size)
+
+    async def release(self, db: AsyncSession, files: Iterable[Any]):
+        """Drop the references of file rows being deleted (caller commits, then calls collect)."""
+        counts: Dict[str, int] = {}
+        for f in files:
+            if f.content_hash and self.owns(f.file_path):
+                counts[f.content_hash] = counts.get(f.content_hash, 0) + 1
+        for digest, count in counts.items():
+            await db.execute(
+                update(Blob).where(Blob.sha256 == digest).values(ref_count=Blob.ref_count - count)
+            )
+
+    async def collect(self) -> int:
+        """Delete blobs nothing references any more. Returns how many were deleted."""
+        async with self._lock, AsyncSessionLocal() as db:
+            result = await db.execute(select(Blob.sha256).where(Blob.ref_count <= 0))
+            candidates = result.scalars().all()
+            if not candidates:
+                return 0
+            # Re-checked by the DELETE itself: another session may have re-referenced
+            # a blob since the SELECT (its UPDATE commits before this row is deleted)
+            result = await db.execute(
+                delete(Blob)
+                .where(Blob.sha256.in_(candidates), Blob.ref_count <= 0)
+                .returning(Blob.sha256)
+            )
+            digests = result.scalars().all()
+            await db.commit()
+
+            for digest in digests:
+                try:
+                    os.remove(self.path_for(digest))
+                except FileNotFoundError:
+                    pass
+        metrics_service.inc("blob_store_deleted_total", len(digests))
+        return len(digests)
+
+    async def find_indexed(self, db: AsyncSession, digests: List[str]) -> Dict[str, Tuple[str, List[str]]]:
+        """For each digest already indexed as some file's chunks: (namespace, vector IDs) of one such file."""
+        found: Dict[str, Tuple[str, List[str]]] = {}
+        sources: Dict[str, Tuple[str, int, str]] = {}
+        if not digests:
+            return found
+        for owner_type, model in OWNER_MODELS.items():
+            result = await db.execute(
+                select(model.content_hash, VectorChunk.owner_id, VectorChunk.namespace, VectorChunk.vector_id)
+                .join(model, model.id == VectorChunk.owner_id)
+                .where(
+                    VectorChunk.owner_type == owner_type,
+                    model.content_hash.in_(digests),
+                    VectorChunk.namespace.not_like(f"%{SUMMARY_SUFFIX}")
+                )
+                .order_by(VectorChunk.owner_id, VectorChunk.id)
+            )
+            for digest, owner_id, namespace, vector_id in result.all():
+                # First file seen wins; all of its chunks, none of the others'
+                source = sources.setdefault(digest, (owner_type, owner_id, namespace))
+                if source == (owner_type, owner_id, namespace):
+                    found.setdefault(digest, (namespace, []))[1].append(vector_id)
+        return found
+
+    async def copy_index(self, db: AsyncSession, digest: str, metadata: Dict[str, Any], namespace: str) -> Tuple[List[str], str]:
+        """Vectors copied from another file with this content, and its text; ([], "") if there is none."""
+        source = (await self.find_indexed(db, [digest])).get(digest)
+        if source is None:
+            return [], ""
+        ids, text = await rag_service.copy_vectors(source[1], source[0], metadata, namespace)
+        if ids:
+            metrics_service.inc("blob_store_index_reused_total")
+        return ids, text
+
+    async def index(self, db: AsyncSession, staged: StagedBlob, filename: str, metadata: Dict[str, Any], namespace: str) -> Tuple[List[str], str]:
+        """
+        Index a staged upload: copy the vectors of a file with the same content
+        if there is one, else extract and embed it. Returns (vector IDs, text).
+        """
+        ids, text = await self.copy_index(db, staged.digest, {"filename": filename, **metadata}, namespace)
+        if ids:
+            return ids, text
+        return await rag_service.index_file(staged.temp_path, metadata, namespace=namespace, filename=filename)
+
+blob_store = BlobStore()
+
+metrics_service.counter("blob_store_writes_total", "Uploads added to the blob store: new content, or a duplicate of a stored blob")
+metrics_service.counter("blob_store_bytes_saved_total", "Upload bytes not stored again because the content was already there")
+metrics_service.counter("blob_store_deleted_total", "Blobs deleted after their last file was removed")
+metrics_service.counter("blob_store_index_reused_total", "Files indexed by copying the vectors of a file with the same content")
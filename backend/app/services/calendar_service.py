@@ -0,0 +1,309 @@
+import asyncio
+import bisect
+import itertools
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from dateutil.rrule import rrulestr
+from sqlalchemy import or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.models.task import CalendarEvent, CalendarRevision
+from app import schemas
+from app.pagination import keyset, decode_cursor
+from app.services.metrics_service import metrics_service
+
+# Occurrences expanded to find where a COUNT/UNTIL series ends
+MAX_OCCURRENCES = 10000
+
+_UTC_UNTIL = re.compile(r"(UNTIL=\d{8}(?:T\d{6})?)Z", re.IGNORECASE)
+_UNTIL = re.compile(r"UNTIL=(\d{8}(?:T\d{6})?)", re.IGNORECASE)
+_COUNT = re.compile(r"COUNT=(\d+)", re.IGNORECASE)
+
+EVENT_ORDER = [(CalendarEvent.start_time, False), (CalendarEvent.id, False)]
+
+class IntervalIndex:
+    """
+    Events sorted by start time. Anything overlapping [a, b) must start in
+    (a - longest_duration, b), so a lookup is two bisects plus the hits.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[datetime, int]] = [] # (start_time, event_id), sorted
+        self._events: Dict[int, schemas.Event] = {}
+        self._max_duration = timedelta(0) # Upper bound, not shrunk on removal
+
+    def __len__(self):
+        return len(self._events)
+
+    def contains(self, event_id: int) -> bool:
+        return event_id in self._events
+
+    def add(self, event: schemas.Event):
+        self.remove(event.id)
+        bisect.insort(self._keys, (event.start_time, event.id))
+        self._events[event.id] = event
+        self._max_duration = max(self._max_duration, event.end_time - event.start_time)
+
+    def remove(self, event_id: int):
+        event = self._events.pop(event_id, None)
+        if event is None:
+            return
+        i = bisect.bisect_left(self._keys, (event.start_time, event_id))
+        if i < len(self._keys) and self._keys[i] == (event.start_time, event_id):
+            del self._keys[i]
+
+    def overlapping(self, start: datetime, end: datetime) -> List[schemas.Event]:
+        lo = bisect.bisect_right(self._keys, (start - self._max_duration, float("inf")))
+        hi = bisect.bisect_left(self._keys, (end, -1))
+        hits = []
+        for _, event_id in self._keys[lo:hi]:
+            event = self._events[event_id]
+            if event.end_time > start:
+                hits.append(event)
+        return hits
+
+class CalendarService:
+    """
+    Recurring events are stored once (start_time/end_time of the first
+    occurrence plus an RRULE) and only expanded for the window being viewed.
+
+    Free/busy queries are answered from an in-process interval index, updated
+    by this worker's create/delete paths. Each worker keeps its own copy, so
+    every event write also calls bump() in its transaction, and before every
+    use ensure_index compares the index's revision with calendar_revision and
+    reloads when they differ: events written by another worker are seen on the
+    next query, not after a restart.
+    """
+
+    def __init__(self):
+        self.index = IntervalIndex()
+        self._series: Dict[int, schemas.Event] = {} # Recurring events, expanded per query
+        self._revision: Optional[int] = None # calendar_revision the index matches
+        self._load_lock = asyncio.Lock()
+
+    def to_naive_utc(self, value: Optional[datetime]) -> Optional[datetime]:
+        """Times are stored naive (UTC); normalise aware query params to match."""
+        if value is not None and value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    def parse_rule(self, rule: str, dtstart: datetime):
+        """Parse an RFC 5545 RRULE ("FREQ=WEEKLY;BYDAY=MO" or "RRULE:...")."""
+        # Times are naive UTC, so a UTC UNTIL ("...T000000Z") is the same instant without the Z
+        rule = _UTC_UNTIL.sub(r"\1", rule)
+        try:
+            return rrulestr(rule, dtstart=dtstart)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid recurrence rule: {e}")
+
+    def recurrence_end(self, rule: str, start_time: datetime, end_time: datetime) -> Optional[datetime]:
+        """
+        End of the last occurrence, or None for a series that never ends. At
+        most MAX_OCCURRENCES are expanded: a longer UNTIL series gets UNTIL plus
+        the duration (an upper bound), a longer COUNT series is rejected.
+        """
+        parsed = self.parse_rule(rule, start_time)
+        count = _COUNT.search(rule)
+        until = _UNTIL.search(rule)
+        if count is None and until is None:
+            return None
+        if count is not None and int(count.group(1)) > MAX_OCCURRENCES:
+            raise ValueError(f"Invalid recurrence rule: COUNT above {MAX_OCCURRENCES}")
+
+        last, seen = None, 0
+        for last in itertools.islice(parsed, MAX_OCCURRENCES + 1):
+            seen += 1
+        if last is None:
+            return end_time
+        if seen > MAX_OCCURRENCES:
+            fmt = "%Y%m%dT%H%M%S" if "T" in until.group(1) else "%Y%m%d"
+            last = datetime.strptime(until.group(1), fmt)
+        return last + (end_time - start_time)
+
+    def expand(self, event: CalendarEvent, start: datetime, end: datetime) -> List[schemas.Event]:
+        """Occurrences of `event` that overlap [start, end)."""
+        base = schemas.Event.model_validate(event)
+        if not event.rrule:
+            return [base]
+
+        duration = event.end_time - event.start_time
+        rule = self.parse_rule(event.rrule, event.start_time)
+        # Occurrence overlaps when occ_start < end and occ_start + duration > start
+        occurrences = rule.between(start - duration, end, inc=False)
+        return [
+            base.model_copy(update={"start_time": occ, "end_time": occ + duration})
+            for occ in occurrences
+        ]
+
+    async def events_between(
+        self,
+        db: AsyncSession,
+        start: datetime,
+        end: datetime,
+        query=None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[schemas.Event]:
+        """
+        Events overlapping [start, end) read from the DB, recurring series
+        expanded into occurrences, sorted by (start_time, id). `query` narrows
+        the rows (e.g. to one task); with `cursor` only occurrences after it are
+        returned, and `limit` caps the one-off rows read (enough for one page).
+        """
+        query = query if query is not None else select(CalendarEvent)
+
+        # One-off events: range scan on (start_time, end_time)
+        single = query.where(
+            CalendarEvent.rrule.is_(None),
+            CalendarEvent.start_time < end,
+            CalendarEvent.end_time > start
+        )
+        single = keyset(single, EVENT_ORDER, cursor)
+        if limit is not None:
+            single = single.limit(limit)
+        result = await db.execute(single)
+        occurrences = [schemas.Event.model_validate(e) for e in result.scalars().all()]
+
+        # Recurring series that have started and not yet ended before the window
+        recurring = query.where(
+            CalendarEvent.rrule.isnot(None),
+            CalendarEvent.start_time < end,
+            or_(CalendarEvent.recurrence_end.is_(None), CalendarEvent.recurrence_end > start)
+        )
+        result = await db.execute(recurring)
+        expanded = []
+        for series in result.scalars().all():
+            try:
+                expanded.extend(self.expand(series, start, end))
+            except ValueError as e:
+                print(f"Skipping event {series.id}: {e}")
+        if cursor:
+            after = tuple(decode_cursor(cursor, EVENT_ORDER))
+            expanded = [o for o in expanded if (o.start_time, o.id) > after]
+
+        occurrences.extend(expanded)
+        occurrences.sort(key=lambda o: (o.start_time, o.id))
+        return occurrences
+
+    # --- Free/busy index ---
+
+    async def bump(self, db: AsyncSession) -> int:
+        """Call in the transaction of every event write (the caller commits). Returns the new revision."""
+        result = await db.execute(
+            update(CalendarRevision)
+            .where(CalendarRevision.id == 1)
+            .values(revision=CalendarRevision.revision + 1)
+            .returning(CalendarRevision.revision)
+        )
+        revision = result.scalar_one_or_none()
+        if revision is None:
+            # Row not seeded yet (migration pending): start counting
+            db.add(CalendarRevision(id=1, revision=1))
+            await db.flush()
+            revision = 1
+        return revision
+
+    async def _current_revision(self, db: AsyncSession) -> int:
+        result = await db.execute(select(CalendarRevision.revision).where(CalendarRevision.id == 1))
+        return result.scalar_one_or_none() or 0
+
+    async def ensure_index(self, db: AsyncSession):
+        """Call before busy/free_slots: (re)loads the index if events were written since it was built."""
+        revision = await self._current_revision(db)
+        if revision == self._revision:
+            return
+        async with self._load_lock:
+            # Read before the events: a write landing in between makes the next check reload again
+            revision = await self._current_revision(db)
+            if revision == self._revision:
+                return
+            result = await db.execute(select(CalendarEvent))
+            self.index = IntervalIndex()
+            self._series = {}
+            for event in result.scalars().all():
+                self._add(event)
+            self._revision = revision
+            metrics_service.inc("calendar_index_loads_total")
+
+    def _advance(self, revision: int):
+        # Only our own write since the index was built: it stays current. Otherwise reload next time.
+        if self._revision is not None and revision == self._revision + 1:
+            self._revision = revision
+
+    def track(self, event: CalendarEvent, revision: int):
+        """Add an event after it was created in the DB, with the revision bump() returned."""
+        self._add(event)
+        self._advance(revision)
+
+    def _add(self, event: CalendarEvent):
+        snapshot = schemas.Event.model_validate(event)
+        if snapshot.rrule:
+            self.index.remove(snapshot.id)
+            self._series[snapshot.id] = snapshot
+        else:
+            self._series.pop(snapshot.id, None)
+            self.index.add(snapshot)
+
+    def untrack(self, event_id: int, revision: int):
+        """Drop an event after it was deleted from the DB, with the revision bump() returned."""
+        self.index.remove(event_id)
+        self._series.pop(event_id, None)
+        self._advance(revision)
+
+    def busy(self, start: datetime, end: datetime) -> List[schemas.Event]:
+        """Events (recurrences expanded) overlapping [start, end), by start time."""
+        events = self.index.overlapping(start, end)
+        for series in self._series.values():
+            if series.start_time >= end:
+                continue
+            try:
+                events.extend(self.expand(series, start, end))
+            except ValueError:
+                continue
+        events.sort(key=lambda e: (e.start_time, e.id))
+        return events
+
+    def free_slots(
+        self,
+        start: datetime,
+        end: datetime,
+        duration: timedelta,
+        day_start: Optional[int] = None,
+        day_end: Optional[int] = None,
+    ) -> List[Tuple[datetime, datetime]]:
+        """
+        Gaps of at least `duration` in [start, end). With day_start/day_end
+        (hours, 0-24) only time inside those daily hours counts.
+        """
+        if day_start is None and day_end is None:
+            windows = [(start, end)]
+        else:
+            windows = []
+            day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+            while day < end:
+                w_start = max(start, day + timedelta(hours=day_start or 0))
+                w_end = min(end, day + timedelta(hours=day_end if day_end is not None else 24))
+                if w_start < w_end:
+                    windows.append((w_start, w_end))
+                day += timedelta(days=1)
+
+        busy = [(e.start_time, e.end_time) for e in self.busy(start, end)]
+        slots = []
+        for w_start, w_end in windows:
+            cursor = w_start
+            for b_start, b_end in busy:
+                if b_end <= cursor:
+                    continue
+                if b_start >= w_end:
+                    break
+                if b_start - cursor >= duration:
+                    slots.append((cursor, b_start))
+                cursor = max(cursor, b_end)
+            if w_end - cursor >= duration:
+                slots.append((cursor, w_end))
+        return slots
+
+calendar_service = CalendarService()
+
+metrics_service.counter("calendar_index_loads_total", "Free/busy index (re)loads from the database, e.g. after another worker wrote events")
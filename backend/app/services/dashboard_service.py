@@ -0,0 +1,109 @@
+"""
+Everything the dashboard shows, in one query round-trip per figure.
+
+Counts come from SQL aggregates (GROUP BY / COUNT, no rows loaded) and today's
+events from a range query on calendar_events, with recurring series expanded;
+everything is read from the database. The result is kept as a snapshot: task,
+event and project writes call `invalidate()`, and the snapshot also expires
+after DASHBOARD_CACHE_SECONDS so writes from other workers and the passing of
+time (overdue tasks, a new day) show up.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app import schemas
+from app.config import get_settings
+from app.models.project import Project, ProjectFile
+from app.models.task import Task
+from app.services.calendar_service import calendar_service
+from app.services.metrics_service import metrics_service
+
+settings = get_settings()
+
+UPCOMING_DEADLINES = 5
+DONE_STATUS = "done"
+
+class DashboardService:
+    def __init__(self):
+        self._snapshot: Optional[schemas.Dashboard] = None
+        self._built_at = 0.0
+        self._version = 0 # Bumped by every invalidate(), so a build that raced a write isn't cached
+        self._build_lock = asyncio.Lock()
+
+    def invalidate(self):
+        """Call after writing tasks, events, projects or project files."""
+        self._version += 1
+        self._snapshot = None
+
+    def _fresh(self) -> Optional[schemas.Dashboard]:
+        if self._snapshot is not None and time.monotonic() - self._built_at < settings.DASHBOARD_CACHE_SECONDS:
+            return self._snapshot
+        return None
+
+    async def get(self, db: AsyncSession) -> schemas.Dashboard:
+        snapshot = self._fresh()
+        if snapshot is not None:
+            metrics_service.inc("dashboard_requests_total", labels={"cache": "hit"})
+            return snapshot
+
+        # One build at a time; requests that arrive meanwhile get its result
+        async with self._build_lock:
+            snapshot = self._fresh()
+            if snapshot is not None:
+                metrics_service.inc("dashboard_requests_total", labels={"cache": "hit"})
+                return snapshot
+
+            version = self._version
+            with metrics_service.span("dashboard_build"):
+                snapshot = await self._build(db)
+            if version == self._version:
+                self._snapshot, self._built_at = snapshot, time.monotonic()
+        metrics_service.inc("dashboard_requests_total", labels={"cache": "miss"})
+        return snapshot
+
+    async def _build(self, db: AsyncSession) -> schemas.Dashboard:
+        now = datetime.utcnow()
+        open_task = Task.status != DONE_STATUS
+
+        result = await db.execute(select(Task.status, func.count(Task.id)).group_by(Task.status))
+        by_status = {status: count for status, count in result.all()}
+        result = await db.execute(select(func.count(Task.id)).where(open_task, Task.deadline < now))
+        overdue = result.scalar_one()
+
+        result = await db.execute(
+            select(Task)
+            .where(open_task, Task.deadline >= now)
+            .order_by(Task.deadline, Task.id)
+            .limit(UPCOMING_DEADLINES)
+        )
+        upcoming = result.scalars().all()
+
+        result = await db.execute(
+            select(
+                select(func.count(Project.id)).scalar_subquery(),
+                select(func.count(ProjectFile.id)).scalar_subquery(),
+            )
+        )
+        projects, project_files = result.one()
+
+        day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        events_today = await calendar_service.events_between(db, day_start, day_start + timedelta(days=1))
+
+        return schemas.Dashboard(
+            tasks=schemas.TaskCounts(total=sum(by_status.values()), by_status=by_status, overdue=overdue),
+            upcoming_deadlines=[schemas.Task.model_validate(t) for t in upcoming],
+            events_today=events_today,
+            projects=projects,
+            project_files=project_files,
+            generated_at=now,
+        )
+
+dashboard_service = DashboardService()
+
+metrics_service.counter("dashboard_requests_total", "Dashboard requests, served from the cached snapshot (hit) or rebuilt (miss)")
@@ -1,46 +1,69 @@
+import mmap
 import os
+from typing import Optional
 from fastapi import UploadFile
-import pypdf
-from docx import Document
 
-async def read_file_content(file: UploadFile) -> str:
-    filename = file.filename.lower()
+TEXT_EXTENSIONS = ('.txt', '.md', '.py', '.js', '.jsx', '.ts', '.tsx', '.json', '.html', '.css', '.c', '.cpp', '.h')
+
+def extract_text(filename: str, data: bytes) -> str:
+    """Extract text from raw file bytes. Sync; call from a worker thread for big files."""
+    filename = filename.lower()
     content = ""
-    
-    # Text/Code files
-    if filename.endswith(('.txt', '.md', '.py', '.js', '.jsx', '.ts', '.tsx', '.json', '.html', '.css', '.c', '.cpp', '.h')):
-        content = (await file.read()).decode('utf-8')
-        await file.seek(0) # Reset
-        
+
+    # Text/Code files (a stray non-UTF-8 byte becomes U+FFFD rather than failing the upload)
+    if filename.endswith(TEXT_EXTENSIONS):
+        content = data.decode('utf-8', errors='replace')
+
     # PDF
     elif filename.endswith('.pdf'):
-        # Save temp to read with pypdf (it likes file paths or streams)
-        # using sync reader on bytes
+        # pypdf likes file paths or streams, so wrap the bytes
         try:
             import io
-            file_bytes = await file.read()
-            pdf_reader = pypdf.PdfReader(io.BytesIO(file_bytes))
+            import pypdf
+            pdf_reader = pypdf.PdfReader(io.BytesIO(data))
             for page in pdf_reader.pages:
                 content += page.extract_text() + "\n"
         except Exception as e:
             print(f"Error reading PDF: {e}")
-            
+
     # DOCX
     elif filename.endswith('.docx'):
         try:
             import io
-            file_bytes = await file.read()
-            doc = Document(io.BytesIO(file_bytes))
+            from docx import Document
+            doc = Document(io.BytesIO(data))
             for para in doc.paragraphs:
                 content += para.text + "\n"
         except Exception as e:
             print(f"Error reading DOCX: {e}")
-            
+
     else:
         # Try as text default
         try:
-            content = (await file.read()).decode('utf-8')
+            content = data.decode('utf-8')
         except:
             content = "[Binary or Unsupported File]"
-            
+
     return content
+
+async def read_file_content(file: UploadFile) -> str:
+    data = await file.read()
+    await file.seek(0) # Reset
+    return extract_text(file.filename, data)
+
+def extract_file(path: str, filename: Optional[str] = None) -> str:
+    """
+    Extract text from a file on disk. Text files are decoded straight from a
+    memory map (no intermediate bytes copy); other types go through extract_text.
+    The type comes from `filename` if given (blobs have no extension), else
+    from `path`. Sync; run it in a worker thread.
+    """
+    filename = filename or os.path.basename(path)
+    if filename.lower().endswith(TEXT_EXTENSIONS):
+        if os.path.getsize(path) == 0:
+            return ""
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return str(mm, "utf-8", errors="replace")
+
+    with open(path, "rb") as f:
+        return extract_text(filename, f.read())
@@ -0,0 +1,365 @@
+"""
+Bulk import of a local directory or archive into a project.
+
+Files are discovered with a single os.walk (pruning ignored directories), then
+processed in batches: read + sha256 in a thread pool, dedupe against the batch
+and the project's existing files, copy the vectors of content already indexed
+elsewhere, extract text in the pool and embed all chunks of the rest together,
+store the files in the blob store, and insert the ProjectFile rows with one
+commit per batch.
+"""
+import asyncio
+import fnmatch
+import hashlib
+import os
+import tarfile
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import get_settings
+from app.models.project import ProjectFile
+from app.services.file_service import extract_text
+from app.services.metrics_service import metrics_service
+from app.services.rag_service import rag_service, project_namespace
+from app.services.blob_store import blob_store
+from app.services.dashboard_service import dashboard_service
+from app.services.summary_service import summary_service
+
+settings = get_settings()
+
+# Always skipped, on top of .gitignore and user excludes
+DEFAULT_EXCLUDES = [
+    ".git/", ".hg/", ".svn/", "node_modules/", "__pycache__/", ".venv/", "venv/",
+    ".mypy_cache/", ".pytest_cache/", ".DS_Store", "*.pyc", "*.pyo", "*.so", "*.dll",
+    "*.exe", "*.bin", "*.zip", "*.tar", "*.gz", "*.png", "*.jpg", "*.jpeg", "*.gif",
+]
+
+BATCH_SIZE = 64
+COPY_CHUNK_BYTES = 1024 * 1024
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    skipped_duplicate: int = 0
+    skipped_too_large: int = 0
+    skipped_excluded: int = 0 # Files plus pruned directories
+    vectors: int = 0
+    failed: List[str] = field(default_factory=list)
+
+class IgnoreRules:
+    """
+    The commonly used subset of .gitignore syntax: globs, `dir/` (directories
+    only), leading or inner `/` (anchored to the root), `!` (re-include) and
+    `#` comments. The last matching rule wins.
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.rules = []
+        for raw in patterns:
+            line = raw.strip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if line.startswith("**/"):
+                line, anchored = line[3:], False
+            if line:
+                self.rules.append((line, negate, dir_only, anchored))
+
+    @classmethod
+    def for_directory(cls, root: str, extra: Optional[List[str]] = None) -> "IgnoreRules":
+        patterns = list(DEFAULT_EXCLUDES)
+        gitignore = os.path.join(root, ".gitignore")
+        if os.path.isfile(gitignore):
+            with open(gitignore, encoding="utf-8", errors="replace") as f:
+                patterns.extend(f.read().splitlines())
+        patterns.extend(extra or [])
+        return cls(patterns)
+
+    def ignored(self, relpath: str, is_dir: bool) -> bool:
+        relpath = relpath.replace(os.sep, "/")
+        name = relpath.rsplit("/", 1)[-1]
+        result = False
+        for pattern, negate, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            target = relpath if anchored else name
+            if fnmatch.fnmatchcase(target, pattern):
+                result = not negate
+        return result
+
+def walk(root: str, rules: IgnoreRules, max_bytes: int, report: ImportReport) -> Iterator[Tuple[str, str]]:
+    """Yield (absolute path, relative path) of files to import."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        reldir = os.path.relpath(dirpath, root)
+        reldir = "" if reldir == "." else reldir
+
+        # Prune in place so ignored trees (node_modules, .git) are never listed
+        kept = []
+        for d in dirnames:
+            if rules.ignored(os.path.join(reldir, d), is_dir=True):
+                report.skipped_excluded += 1
+            else:
+                kept.append(d)
+        dirnames[:] = sorted(kept)
+
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            relpath = os.path.join(reldir, name).replace(os.sep, "/")
+            if os.path.islink(path) or rules.ignored(relpath, is_dir=False):
+                report.skipped_excluded += 1
+                continue
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                report.failed.append(relpath)
+                continue
+            if size > max_bytes:
+                report.skipped_too_large += 1
+                continue
+            yield path, relpath
+
+def _read_and_hash(path: str) -> Tuple[bytes, str]:
+    with open(path, "rb") as f:
+        data = f.read()
+    return data, hashlib.sha256(data).hexdigest()
+
+def _file_metadata(project_id: int, relpath: str) -> Dict[str, Any]:
+    return {"project_id": int(project_id), "filename": relpath, "type": "project_file"}
+
+class ImportService:
+    async def import_directory(
+        self,
+        db: AsyncSession,
+        project_id: int,
+        root: str,
+        exclude: Optional[List[str]] = None,
+        max_file_size_kb: Optional[int] = None,
+    ) -> ImportReport:
+        root = os.path.abspath(root)
+        report = ImportReport()
+        rules = IgnoreRules.for_directory(root, exclude)
+        max_bytes = (max_file_size_kb or settings.IMPORT_MAX_FILE_SIZE_KB) * 1024
+
+        result = await db.execute(
+            select(ProjectFile.content_hash)
+            .where(ProjectFile.project_id == project_id, ProjectFile.content_hash.isnot(None))
+        )
+        seen: Set[str] = set(result.scalars().all())
+
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=settings.IMPORT_WORKERS) as pool:
+            files = await loop.run_in_executor(pool, lambda: list(walk(root, rules, max_bytes, report)))
+            for start in range(0, len(files), BATCH_SIZE):
+                with metrics_service.span("import_batch"):
+                    await self._import_batch(db, project_id, files[start:start + BATCH_SIZE], seen, report, pool)
+
+        for outcome, count in (
+            ("imported", report.imported),
+            ("duplicate", report.skipped_duplicate),
+            ("too_large", report.skipped_too_large),
+            ("failed", len(report.failed)),
+        ):
+            metrics_service.inc("project_import_files_total", count, {"result": outcome})
+        return report
+
+    async def _import_batch(self, db: AsyncSession, project_id: int, batch: List[Tuple[str, str]], seen: Set[str], report: ImportReport, pool: ThreadPoolExecutor):
+        loop = asyncio.get_running_loop()
+
+        loaded = await asyncio.gather(
+            *(loop.run_in_executor(pool, _read_and_hash, path) for path, _ in batch),
+            return_exceptions=True
+        )
+        unique = []
+        for (_, relpath), outcome in zip(batch, loaded):
+            if isinstance(outcome, Exception):
+                report.failed.append(relpath)
+                continue
+            data, digest = outcome
+            if digest in seen:
+                report.skipped_duplicate += 1
+                continue
+            seen.add(digest)
+            unique.append((relpath, data, digest))
+
+        namespace = project_namespace(project_id)
+        contents: Dict[str, str] = {}
+        vectors: Dict[str, List[str]] = {}
+
+        # Content already indexed for another project or task: copy its vectors
+        sources = await blob_store.find_indexed(db, [digest for _, _, digest in unique])
+        for relpath, _, digest in unique:
+            if digest in sources:
+                source_namespace, source_ids = sources[digest]
+                ids, content = await rag_service.copy_vectors(source_ids, source_namespace, _file_metadata(project_id, relpath), namespace)
+                if ids:
+                    contents[relpath], vectors[relpath] = content, ids
+        if vectors:
+            metrics_service.inc("blob_store_index_reused_total", len(vectors))
+
+        fresh = [(relpath, data, digest) for relpath, data, digest in unique if relpath not in vectors]
+        extracted = await asyncio.gather(
+            *(loop.run_in_executor(pool, extract_text, relpath, data) for relpath, data, _ in fresh),
+            return_exceptions=True
+        )
+
+        documents = []
+        for (relpath, _, digest), content in zip(fresh, extracted):
+            if isinstance(content, Exception):
+                print(f"Import failed for {relpath}: {content}")
+                report.failed.append(relpath)
+                seen.discard(digest)
+                continue
+            contents[relpath] = content
+            documents.append((content, _file_metadata(project_id, relpath)))
+
+        vector_ids = await rag_service.upsert_documents(documents, namespace=namespace)
+        for (_, metadata), ids in zip(documents, vector_ids):
+            vectors[metadata["filename"]] = ids
+        report.vectors += sum(len(ids) for ids in vectors.values())
+
+        rows = []
+        for relpath, data, digest in unique:
+            if relpath not in contents:
+                continue
+            rows.append(ProjectFile(
+                project_id=project_id,
+                filename=relpath,
+                file_path=await blob_store.add_data(db, data, digest),
+                file_type=relpath.split('.')[-1],
+                pinecone_id=f"proj_{project_id}_{relpath}",
+                summary=contents[relpath][:200] + "...",
+                content_hash=digest,
+            ))
+
+        if rows:
+            db.add_all(rows)
+            await db.flush()
+            for row in rows:
+                rag_service.track(db, "project_file", row.id, vectors.get(row.filename, []), namespace)
+            await db.commit()
+            report.imported += len(rows)
+            summary_service.wake()
+            dashboard_service.invalidate()
+
+    async def import_archive(
+        self,
+        db: AsyncSession,
+        project_id: int,
+        archive_path: str,
+        exclude: Optional[List[str]] = None,
+        max_file_size_kb: Optional[int] = None,
+    ) -> ImportReport:
+        max_bytes = (max_file_size_kb or settings.IMPORT_MAX_FILE_SIZE_KB) * 1024
+        with tempfile.TemporaryDirectory(prefix="jarvis-import-") as workdir:
+            root, too_large = await asyncio.to_thread(extract_archive, archive_path, workdir, max_bytes)
+            report = await self.import_directory(db, project_id, root, exclude, max_file_size_kb)
+        report.skipped_too_large += too_large
+        metrics_service.inc("project_import_files_total", too_large, {"result": "too_large"})
+        return report
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+def _safe_target(dest: str, name: str) -> Optional[str]:
+    target = os.path.abspath(os.path.join(dest, name))
+    if os.path.commonpath([dest, target]) != dest:
+        return None
+    return target
+
+class _ArchiveLimits:
+    """Caps on what an archive may unpack to, counted from the bytes actually written."""
+
+    def __init__(self, max_file_bytes: int):
+        self.max_file_bytes = max_file_bytes
+        self.total_left = settings.IMPORT_ARCHIVE_MAX_TOTAL_MB * 1024 * 1024
+        self.entries_left = settings.IMPORT_ARCHIVE_MAX_ENTRIES
+        self.skipped_too_large = 0
+
+    def entry(self):
+        self.entries_left -= 1
+        if self.entries_left < 0:
+            raise ValueError(f"Archive has more than {settings.IMPORT_ARCHIVE_MAX_ENTRIES} entries")
+
+    def copy(self, src: BinaryIO, target: str) -> bool:
+        """Stream one entry to `target`. False (and nothing left on disk) if it's over the per-file limit."""
+        written = 0
+        with open(target, "wb") as out:
+            while chunk := src.read(COPY_CHUNK_BYTES):
+                written += len(chunk)
+                if written > self.max_file_bytes:
+                    break
+                if written > self.total_left:
+                    out.close()
+                    os.remove(target)
+                    raise ValueError(f"Archive unpacks to more than {settings.IMPORT_ARCHIVE_MAX_TOTAL_MB} MB")
+                out.write(chunk)
+            else:
+                self.total_left -= written
+                return True
+        os.remove(target)
+        self.skipped_too_large += 1
+        return False
+
+def extract_archive(archive_path: str, dest: str, max_file_bytes: int) -> Tuple[str, int]:
+    """
+    Unpack a zip/tar archive into `dest`, skipping entries that would land
+    outside it as well as links, devices and files over `max_file_bytes`.
+    Entries are streamed and counted as they're written, so header sizes can't
+    be used to get past the limits; an archive over IMPORT_ARCHIVE_MAX_TOTAL_MB
+    or IMPORT_ARCHIVE_MAX_ENTRIES raises ValueError.
+
+    Returns the import root (the single top-level folder if there is one,
+    GitHub-style `repo-main/`, else `dest`) and how many files were too large.
+    """
+    dest = os.path.abspath(dest)
+    limits = _ArchiveLimits(max_file_bytes)
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as zf:
+            for info in zf.infolist():
+                limits.entry()
+                target = _safe_target(dest, info.filename)
+                if target is None or info.is_dir():
+                    continue
+                if info.file_size > max_file_bytes:
+                    limits.skipped_too_large += 1
+                    continue
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with zf.open(info) as src:
+                    limits.copy(src, target)
+    elif tarfile.is_tarfile(archive_path):
+        with tarfile.open(archive_path) as tf:
+            for member in tf:
+                limits.entry()
+                target = _safe_target(dest, member.name)
+                if target is None or not member.isfile():
+                    continue
+                if member.size > max_file_bytes:
+                    limits.skipped_too_large += 1
+                    continue
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with tf.extractfile(member) as src:
+                    limits.copy(src, target)
+    else:
+        raise ValueError("Unsupported archive format (expected .zip or .tar[.gz|.bz2|.xz])")
+
+    entries = os.listdir(dest)
+    if len(entries) == 1 and os.path.isdir(os.path.join(dest, entries[0])):
+        return os.path.join(dest, entries[0]), limits.skipped_too_large
+    return dest, limits.skipped_too_large
+
+import_service = ImportService()
+
+metrics_service.counter("project_import_files_total", "Files seen by bulk project import, by outcome")
@@ -1,27 +1,129 @@
-import ollama
+import asyncio
+import time
 from app.config import get_settings
+from app.services.metrics_service import metrics_service
 from typing import List, Dict, Generator, AsyncGenerator, Any
 
 settings = get_settings()
 
+# Which model tier serves each kind of call. "answer" is what the user reads;
+# everything the user doesn't see goes to the fast tier.
+ROUTES = {
+    "answer": "answer",
+    "tool_planning": "fast",
+    "summary": "fast",
+}
+
 class LLMService:
     def __init__(self):
         self.model = settings.LLM_MODEL
-        self.client = ollama.AsyncClient(host=settings.OLLAMA_BASE_URL)
+        self.models = {
+            "answer": settings.LLM_MODEL,
+            "fast": settings.LLM_FAST_MODEL or settings.LLM_MODEL,
+        }
+        self._client = None
+        self.slots = asyncio.Semaphore(settings.LLM_MAX_CONCURRENT_REQUESTS)
+
+    @property
+    def tiered(self) -> bool:
+        """True when a separate fast model is configured."""
+        return self.models["fast"] != self.models["answer"]
+
+    def route(self, purpose: str) -> str:
+        """Tier for a kind of call; unknown purposes get the answer model."""
+        return ROUTES.get(purpose, "answer")
+
+    @property
+    def client(self):
+        # ollama (and httpx under it) is imported on first use to keep startup fast
+        if self._client is None:
+            import ollama
+            self._client = ollama.AsyncClient(host=settings.OLLAMA_BASE_URL)
+        return self._client
+
+    async def warmup(self):
+        """Ask Ollama to load the chat and embedding models so the first turn doesn't pay for it."""
+        try:
+            for model in set(self.models.values()):
+                await self.client.chat(model=model, messages=[])
+            await self.client.embeddings(model=settings.EMBEDDING_MODEL, prompt="warmup")
+        except Exception as e:
+            print(f"LLM warmup failed: {e}")
 
-    async def chat_stream(self, messages: List[Dict[str, str]], tools: List[Dict[str, Any]] = None) -> AsyncGenerator[Dict[str, Any], None]:
+    def prepare_tools(self, schemas: List[Dict[str, Any]]) -> List[Any]:
+        """Validate tool schemas into ollama's models once; chat() re-validates plain dicts on every call."""
+        from ollama import Tool
+        return [Tool.model_validate(schema) for schema in schemas]
+
+    def _record_usage(self, part: Dict[str, Any], tier: str):
+        """Token counts and decode speed from Ollama's final (done) chunk."""
+        prompt_tokens = part.get('prompt_eval_count') or 0
+        output_tokens = part.get('eval_count') or 0
+        eval_ns = part.get('eval_duration') or 0
+        metrics_service.inc("llm_tokens_total", prompt_tokens, {"kind": "prompt", "tier": tier})
+        metrics_service.inc("llm_tokens_total", output_tokens, {"kind": "output", "tier": tier})
+        if output_tokens and eval_ns:
+            metrics_service.observe("llm_tokens_per_second", output_tokens / (eval_ns / 1e9), {"tier": tier})
+
+    async def chat_stream(self, messages: List[Dict[str, str]], tools: List[Dict[str, Any]] = None, purpose: str = "answer") -> AsyncGenerator[Dict[str, Any], None]:
         """
         Stream chat responses from Ollama.
         Yields chunks of the response.
         """
-        try:
-            async for part in await self.client.chat(model=self.model, messages=messages, stream=True, tools=tools):
-                yield part['message']
-        except Exception as e:
-            # Fallback or error handling
-            yield {"content": f"Error connecting to LLM: {str(e)}", "role": "assistant"}
+        tier = self.route(purpose)
+        labels = {"tier": tier}
+        metrics_service.inc("llm_requests_total", labels={"tier": tier, "purpose": purpose})
+        queued_at = time.perf_counter()
+        async with self.slots:
+            started = time.perf_counter()
+            metrics_service.observe("llm_queue_wait_seconds", started - queued_at)
+            metrics_service.add_gauge("llm_requests_in_flight", 1)
+            first_token = False
+            stream = None
+            try:
+                stream = await self.client.chat(model=self.models[tier], messages=messages, stream=True, tools=tools)
+                async for part in stream:
+                    message = part['message']
+                    if not first_token and (message.get('content') or message.get('tool_calls')):
+                        first_token = True
+                        metrics_service.observe("llm_time_to_first_token_seconds", time.perf_counter() - started, labels)
+                    if part.get('done'):
+                        self._record_usage(part, tier)
+                    yield message
+            except asyncio.CancelledError:
+                # Caller gave up (stop / disconnect): leaving this block closes the
+                # HTTP stream, which makes Ollama stop generating, and frees the slot
+                metrics_service.inc("llm_requests_cancelled_total")
+                raise
+            except Exception as e:
+                # Fallback or error handling
+                yield {"content": f"Error connecting to LLM: {str(e)}", "role": "assistant"}
+            finally:
+                if stream is not None:
+                    await stream.aclose()
+                metrics_service.observe("llm_generation_seconds", time.perf_counter() - started, labels)
+                metrics_service.add_gauge("llm_requests_in_flight", -1)
+
+    async def _complete(self, messages: List[Dict[str, Any]], purpose: str, **kwargs) -> Any:
+        """One non-streaming chat call on the tier `purpose` routes to."""
+        tier = self.route(purpose)
+        labels = {"tier": tier}
+        metrics_service.inc("llm_requests_total", labels={"tier": tier, "purpose": purpose})
+        queued_at = time.perf_counter()
+        async with self.slots:
+            started = time.perf_counter()
+            metrics_service.observe("llm_queue_wait_seconds", started - queued_at)
+            metrics_service.add_gauge("llm_requests_in_flight", 1)
+            try:
+                with metrics_service.span("llm_generate", purpose=purpose):
+                    response = await self.client.chat(model=self.models[tier], messages=messages, stream=False, **kwargs)
+            finally:
+                metrics_service.add_gauge("llm_requests_in_flight", -1)
+            metrics_service.observe("llm_generation_seconds", time.perf_counter() - started, labels)
+        self._record_usage(response, tier)
+        return response
 
-    async def generate_response(self, prompt: str, system_prompt: str = None) -> str:
+    async def generate_response(self, prompt: str, system_prompt: str = None, purpose: str = "answer") -> str:
         """
         Generate a single response (non-streaming).
         """
@@ -29,19 +131,51 @@ class LLMService:
         if system_prompt:
             messages.append({'role': 'system', 'content': system_prompt})
         messages.append({'role': 'user', 'content': prompt})
-        
-        response = await self.client.chat(model=self.model, messages=messages, stream=False)
+
+        response = await self._complete(messages, purpose)
         return response['message']['content']
 
+    async def plan_tool_calls(self, messages: List[Dict[str, Any]], tools: List[Any]) -> List[Any]:
+        """
+        Ask the fast model which tools to call. Its text is thrown away (the
+        answer model writes the reply), so output is capped: a plan that hasn't
+        produced a tool call by then is treated as "no tools needed".
+        """
+        try:
+            response = await self._complete(
+                messages, "tool_planning", tools=tools,
+                options={"num_predict": settings.LLM_PLANNER_MAX_TOKENS}
+            )
+        except Exception as e:
+            print(f"Tool planning failed, answering without tools: {e}")
+            return []
+        return list(response['message'].get('tool_calls') or [])
+
     async def get_embedding(self, text: str) -> List[float]:
         """
         Generate embedding for text using nomic-embed-text.
         """
         try:
-            response = await self.client.embeddings(model=settings.EMBEDDING_MODEL, prompt=text)
+            with metrics_service.span("embedding"):
+                response = await self.client.embeddings(model=settings.EMBEDDING_MODEL, prompt=text)
             return response['embedding']
         except Exception as e:
             print(f"Error generating embedding: {e}")
             return []
 
+    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several texts in one request. Falls back to one request per
+        text if the batch call fails; failed texts get an empty list.
+        """
+        if not texts:
+            return []
+        try:
+            with metrics_service.span("embedding_batch"):
+                response = await self.client.embed(model=settings.EMBEDDING_MODEL, input=texts)
+            return [list(e) for e in response['embeddings']]
+        except Exception as e:
+            print(f"Batch embedding failed, falling back to single requests: {e}")
+            return [await self.get_embedding(t) for t in texts]
+
 llm_service = LLMService()
@@ -0,0 +1,409 @@
+"""
+Embedded vector index (VECTOR_BACKEND=local) with optional quantized storage.
+
+Implements the slice of the Pinecone Index API that RAGService uses (upsert,
+query, fetch, delete, list, describe_index_stats), so it is a drop-in for a
+single machine.
+
+Storage per namespace directory:
+- vectors.f32    full-precision rows, append-only; memory-mapped, not loaded
+- records.jsonl  append-only log of upserts (id, row, metadata) and deletes
+
+In RAM each row is kept as a search code chosen by VECTOR_QUANTIZATION:
+- none    float32, 4 bytes/dim (exact search, nothing to re-score)
+- int8    symmetric scalar quantization, 1 byte/dim + a float32 scale (~4x less)
+- binary  sign bits, 1 bit/dim, hamming distance (~32x less)
+
+Quantized searches score every row on the codes, then re-score the best
+top_k * VECTOR_RESCORE_CANDIDATES rows against the memory-mapped float rows.
+Codes are rebuilt from vectors.f32 on load, so the mode can be switched freely.
+"""
+import json
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+QUANTIZATIONS = ("none", "int8", "binary")
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+_BLOCK_ROWS = 8192 # Rows scored per step; keeps the float32 temporaries cache-sized
+_MIN_CAPACITY = 1024
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def _matches(metadata: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+    """Pinecone metadata filter subset: equality, $eq, $ne, $in, $nin, $exists, $and, $or."""
+    for key, cond in filter.items():
+        if key == "$and":
+            if not all(_matches(metadata, f) for f in cond):
+                return False
+            continue
+        if key == "$or":
+            if not any(_matches(metadata, f) for f in cond):
+                return False
+            continue
+        value = metadata.get(key)
+        if isinstance(cond, dict):
+            for op, expected in cond.items():
+                if op == "$eq" and value != expected:
+                    return False
+                if op == "$ne" and value == expected:
+                    return False
+                if op == "$in" and value not in expected:
+                    return False
+                if op == "$nin" and value in expected:
+                    return False
+                if op == "$exists" and (key in metadata) != bool(expected):
+                    return False
+        elif value != cond:
+            return False
+    return True
+
+class _Codec:
+    """Encodes normalized float32 rows into search codes and scores queries against them."""
+
+    def __init__(self, quantization: str, dim: int):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"VECTOR_QUANTIZATION must be one of {QUANTIZATIONS}, got {quantization!r}")
+        self.quantization = quantization
+        self.dim = dim
+        if quantization == "none":
+            self.dtype, self.width = np.float32, dim
+        elif quantization == "int8":
+            self.dtype, self.width = np.int8, dim
+        else:
+            self.dtype, self.width = np.uint8, (dim + 7) // 8
+
+    def encode(self, unit: np.ndarray):
+        """(codes, scales); scales is None except for int8."""
+        if self.quantization == "none":
+            return unit.astype(np.float32), None
+        if self.quantization == "int8":
+            scales = np.maximum(np.abs(unit).max(axis=1), 1e-12) / 127.0
+            codes = np.clip(np.rint(unit / scales[:, None]), -127, 127).astype(np.int8)
+            return codes, scales.astype(np.float32)
+        return np.packbits(unit > 0, axis=1), None
+
+    def score(self, codes: np.ndarray, scales: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+        """Approximate similarity of `query` (normalized float32) to each code row."""
+        if self.quantization == "none":
+            return codes @ query
+        if self.quantization == "int8":
+            return (codes.astype(np.float32) @ query) * scales
+        query_bits = np.packbits(query > 0)
+        hamming = _POPCOUNT[np.bitwise_xor(codes, query_bits)].sum(axis=1, dtype=np.int32)
+        return (self.dim - 2 * hamming).astype(np.float32)
+
+class _Namespace:
+    def __init__(self, path: str, quantization: str, dim: Optional[int] = None):
+        self.path = path
+        self.quantization = quantization
+        self.dim = dim
+        self.codec: Optional[_Codec] = None
+        self.ids: List[Optional[str]] = [] # By row; None once deleted or replaced
+        self.metadata: List[Optional[Dict[str, Any]]] = []
+        self.rows: Dict[str, int] = {} # Live id -> row
+        self.count = 0 # Rows in vectors.f32
+        self.codes: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+        self.alive = np.zeros(0, dtype=bool)
+        self._full: Optional[np.memmap] = None
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    @property
+    def vectors_path(self) -> str:
+        return os.path.join(self.path, "vectors.f32")
+
+    @property
+    def records_path(self) -> str:
+        return os.path.join(self.path, "records.jsonl")
+
+    # --- Loading / persistence ---
+
+    def _load(self):
+        manifest = os.path.join(self.path, "manifest.json")
+        if os.path.exists(manifest):
+            with open(manifest) as f:
+                self.dim = json.load(f)["dim"]
+        if not self.dim:
+            return
+        self._init_codec()
+
+        rows_on_disk = os.path.getsize(self.vectors_path) // (4 * self.dim) if os.path.exists(self.vectors_path) else 0
+        self.count = rows_on_disk
+        self.ids = [None] * rows_on_disk
+        self.metadata = [None] * rows_on_disk
+        if os.path.exists(self.records_path):
+            with open(self.records_path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break # Torn final line from a crash
+                    if "d" in record:
+                        for vid in record["d"]:
+                            self._forget(vid)
+                    elif record["r"] < rows_on_disk:
+                        self._forget(record["u"])
+                        self.ids[record["r"]] = record["u"]
+                        self.metadata[record["r"]] = record["m"]
+                        self.rows[record["u"]] = record["r"]
+
+        self._ensure_capacity(rows_on_disk)
+        full = self._full_rows()
+        for start in range(0, rows_on_disk, _BLOCK_ROWS):
+            block = np.asarray(full[start:start + _BLOCK_ROWS])
+            self._store_codes(start, block)
+        self.alive[:rows_on_disk] = [vid is not None for vid in self.ids]
+
+        if rows_on_disk > _MIN_CAPACITY and len(self.rows) < rows_on_disk // 2:
+            self.compact()
+
+    def _init_codec(self):
+        self.codec = _Codec(self.quantization, self.dim)
+        with open(os.path.join(self.path, "manifest.json"), "w") as f:
+            json.dump({"dim": self.dim}, f)
+
+    def _append_records(self, records: List[Dict[str, Any]]):
+        with open(self.records_path, "a") as f:
+            f.write("".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records))
+
+    def _full_rows(self) -> np.ndarray:
+        """Memory-mapped view of every row written so far."""
+        if self.count == 0:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        if self._full is None or self._full.shape[0] != self.count:
+            self._full = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.count, self.dim))
+        return self._full
+
+    def _ensure_capacity(self, rows: int):
+        capacity = 0 if self.codes is None else self.codes.shape[0]
+        if rows <= capacity:
+            return
+        new_capacity = max(_MIN_CAPACITY, capacity * 2, rows)
+        codes = np.zeros((new_capacity, self.codec.width), dtype=self.codec.dtype)
+        alive = np.zeros(new_capacity, dtype=bool)
+        if self.codes is not None:
+            codes[:capacity] = self.codes
+            alive[:capacity] = self.alive
+        self.codes, self.alive = codes, alive
+        if self.codec.quantization == "int8":
+            scales = np.zeros(new_capacity, dtype=np.float32)
+            if self.scales is not None:
+                scales[:capacity] = self.scales
+            self.scales = scales
+
+    def _store_codes(self, start: int, raw: np.ndarray):
+        codes, scales = self.codec.encode(_normalize(raw.astype(np.float32)))
+        self.codes[start:start + len(raw)] = codes
+        if scales is not None:
+            self.scales[start:start + len(raw)] = scales
+
+    def _forget(self, vid: str) -> bool:
+        row = self.rows.pop(vid, None)
+        if row is None:
+            return False
+        self.ids[row] = None
+        self.metadata[row] = None
+        if row < len(self.alive):
+            self.alive[row] = False
+        return True
+
+    # --- Operations ---
+
+    def upsert(self, vectors: List[Dict[str, Any]]):
+        if not vectors:
+            return
+        raw = np.asarray([v["values"] for v in vectors], dtype=np.float32)
+        if self.dim is None:
+            self.dim = raw.shape[1]
+            self._init_codec()
+        if raw.shape[1] != self.dim:
+            raise ValueError(f"Vector dimension {raw.shape[1]} does not match index dimension {self.dim}")
+
+        start = self.count
+        # Rows hit the disk before the log that references them (crash-safe replay)
+        with open(self.vectors_path, "ab") as f:
+            f.write(raw.tobytes())
+        records = []
+        for offset, v in enumerate(vectors):
+            records.append({"u": v["id"], "r": start + offset, "m": v.get("metadata") or {}})
+        self._append_records(records)
+
+        self._ensure_capacity(start + len(vectors))
+        self._store_codes(start, raw)
+        for record in records:
+            self._forget(record["u"])
+            self.ids.append(record["u"])
+            self.metadata.append(record["m"])
+            self.rows[record["u"]] = record["r"]
+            self.alive[record["r"]] = True
+        self.count += len(vectors)
+
+    def delete(self, ids: List[str]):
+        removed = [vid for vid in ids if self._forget(vid)]
+        if removed:
+            self._append_records([{"d": removed}])
+
+    def delete_matching(self, filter: Dict[str, Any]):
+        self.delete([vid for vid, row in self.rows.items() if _matches(self.metadata[row], filter)])
+
+    def fetch(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        full = self._full_rows()
+        out = {}
+        for vid in ids:
+            row = self.rows.get(vid)
+            if row is not None:
+                out[vid] = {"id": vid, "values": full[row].tolist(), "metadata": self.metadata[row]}
+        return out
+
+    def query(self, vector: List[float], top_k: int, filter: Optional[Dict[str, Any]], rescore: int) -> List[tuple]:
+        """[(score, row)] best first."""
+        if not self.rows or self.codec is None:
+            return []
+        query = _normalize(np.asarray(vector, dtype=np.float32))
+
+        mask = self.alive[:self.count].copy()
+        if filter:
+            for vid, row in self.rows.items():
+                if not _matches(self.metadata[row], filter):
+                    mask[row] = False
+        candidates = int(mask.sum())
+        if candidates == 0:
+            return []
+
+        approx = np.empty(self.count, dtype=np.float32)
+        for start in range(0, self.count, _BLOCK_ROWS):
+            end = min(start + _BLOCK_ROWS, self.count)
+            scales = self.scales[start:end] if self.scales is not None else None
+            approx[start:end] = self.codec.score(self.codes[start:end], scales, query)
+        approx[~mask] = -np.inf
+
+        exact = self.codec.quantization == "none"
+        keep = min(candidates, top_k if exact else top_k * max(1, rescore))
+        best = np.argpartition(-approx, keep - 1)[:keep]
+
+        if exact:
+            scores = approx[best]
+        else:
+            # Full-precision re-score; sorted rows keep the memmap reads sequential
+            best = np.sort(best)
+            full = np.asarray(self._full_rows()[best])
+            scores = _normalize(full) @ query
+
+        order = np.argsort(-scores)[:top_k]
+        return [(float(scores[i]), int(best[i])) for i in order]
+
+    def compact(self):
+        """Rewrite the files with live rows only."""
+        live = sorted(self.rows.values())
+        full = self._full_rows()
+        tmp_vectors = self.vectors_path + ".tmp"
+        with open(tmp_vectors, "wb") as f:
+            for start in range(0, len(live), _BLOCK_ROWS):
+                f.write(np.asarray(full[live[start:start + _BLOCK_ROWS]], dtype=np.float32).tobytes())
+        tmp_records = self.records_path + ".tmp"
+        with open(tmp_records, "w") as f:
+            for new_row, old_row in enumerate(live):
+                record = {"u": self.ids[old_row], "r": new_row, "m": self.metadata[old_row]}
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+        self._full = None
+        os.replace(tmp_vectors, self.vectors_path)
+        os.replace(tmp_records, self.records_path)
+        self.ids, self.metadata, self.rows = [], [], {}
+        self.codes = self.scales = None
+        self.alive = np.zeros(0, dtype=bool)
+        self._load()
+
+    def memory_bytes(self) -> int:
+        total = 0
+        for array in (self.codes, self.scales, self.alive):
+            if array is not None:
+                total += array.nbytes
+        return total
+
+class LocalVectorIndex:
+    def __init__(self, path: str, quantization: str = "none", rescore: int = 10):
+        self.path = path
+        self.quantization = quantization
+        self.rescore = rescore
+        self._lock = threading.RLock()
+        self._namespaces: Dict[str, _Namespace] = {}
+        os.makedirs(path, exist_ok=True)
+        for name in sorted(os.listdir(path)):
+            if os.path.isdir(os.path.join(path, name)):
+                self._namespaces[unquote(name)] = _Namespace(os.path.join(path, name), quantization)
+
+    def _namespace(self, namespace: str, create: bool = False) -> Optional[_Namespace]:
+        ns = self._namespaces.get(namespace)
+        if ns is None and create:
+            ns = _Namespace(os.path.join(self.path, quote(namespace, safe="")), self.quantization)
+            self._namespaces[namespace] = ns
+        return ns
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = ""):
+        with self._lock:
+            self._namespace(namespace, create=True).upsert(vectors)
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids: Optional[List[str]] = None, namespace: str = "", delete_all: bool = False, filter: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            ns = self._namespace(namespace)
+            if ns is None:
+                return {}
+            if delete_all:
+                self._namespaces.pop(namespace)
+                ns._full = None
+                for name in os.listdir(ns.path):
+                    os.remove(os.path.join(ns.path, name))
+                os.rmdir(ns.path)
+                return {}
+            if ids:
+                ns.delete(ids)
+            if filter:
+                ns.delete_matching(filter)
+        return {}
+
+    def fetch(self, ids: List[str], namespace: str = ""):
+        with self._lock:
+            ns = self._namespace(namespace)
+            return {"vectors": ns.fetch(ids) if ns else {}, "namespace": namespace}
+
+    def query(self, vector: List[float], top_k: int = 5, namespace: str = "", include_metadata: bool = False,
+              filter: Optional[Dict[str, Any]] = None, include_values: bool = False, **_):
+        with self._lock:
+            ns = self._namespace(namespace)
+            hits = ns.query(vector, top_k, filter, self.rescore) if ns else []
+            matches = []
+            for score, row in hits:
+                match = {"id": ns.ids[row], "score": score}
+                if include_metadata:
+                    match["metadata"] = ns.metadata[row]
+                if include_values:
+                    match["values"] = ns._full_rows()[row].tolist()
+                matches.append(match)
+        return {"matches": matches, "namespace": namespace}
+
+    def list(self, prefix: Optional[str] = None, namespace: str = "", limit: int = 100) -> Iterator[List[str]]:
+        with self._lock:
+            ns = self._namespace(namespace)
+            ids = [vid for vid in (ns.rows if ns else {}) if not prefix or vid.startswith(prefix)]
+        for i in range(0, len(ids), limit):
+            yield ids[i:i + limit]
+
+    def describe_index_stats(self):
+        with self._lock:
+            namespaces = {name: {"vector_count": len(ns.rows)} for name, ns in self._namespaces.items()}
+            return {
+                "namespaces": namespaces,
+                "total_vector_count": sum(n["vector_count"] for n in namespaces.values()),
+                "quantization": self.quantization,
+                "memory_bytes": sum(ns.memory_bytes() for ns in self._namespaces.values()),
+            }
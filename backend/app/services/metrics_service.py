@@ -0,0 +1,127 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Seconds; spans range from sub-millisecond DB reads to multi-second generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _render_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+class MetricsService:
+    """
+    Small in-process metrics registry rendered in the Prometheus text format
+    at /metrics. Histograms are cumulative per label set, like prometheus_client.
+    """
+
+    def __init__(self):
+        self._help: Dict[str, Tuple[str, str]] = {} # name -> (type, help)
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._buckets: Dict[str, tuple] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+
+    def histogram(self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS):
+        self._help[name] = ("histogram", help)
+        self._buckets[name] = buckets
+        self._histograms.setdefault(name, {})
+
+    def counter(self, name: str, help: str):
+        self._help[name] = ("counter", help)
+        self._counters.setdefault(name, {})
+
+    def gauge(self, name: str, help: str):
+        self._help[name] = ("gauge", help)
+        self._gauges.setdefault(name, {})
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        series = self._histograms.setdefault(name, {})
+        key = _label_key(labels)
+        if key not in series:
+            series[key] = _Histogram(self._buckets.get(name, DEFAULT_BUCKETS))
+        series[key].observe(value)
+
+    def inc(self, name: str, value: float = 1, labels: Optional[Dict[str, str]] = None):
+        series = self._counters.setdefault(name, {})
+        key = _label_key(labels)
+        series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def add_gauge(self, name: str, delta: float, labels: Optional[Dict[str, str]] = None):
+        series = self._gauges.setdefault(name, {})
+        key = _label_key(labels)
+        series[key] = series.get(key, 0) + delta
+
+    @contextmanager
+    def span(self, stage: str, **labels):
+        """Time a pipeline stage into jarvis_stage_seconds{stage=...}."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("jarvis_stage_seconds", time.perf_counter() - start, {"stage": stage, **labels})
+
+    def render(self) -> str:
+        lines: List[str] = []
+        names = sorted(set(self._histograms) | set(self._counters) | set(self._gauges))
+        for name in names:
+            kind, help = self._help.get(name, ("untyped", ""))
+            if help:
+                lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+
+            for key, value in sorted(self._counters.get(name, {}).items()):
+                lines.append(f"{name}{_render_labels(key)} {value}")
+            for key, value in sorted(self._gauges.get(name, {}).items()):
+                lines.append(f"{name}{_render_labels(key)} {value}")
+            for key, hist in sorted(self._histograms.get(name, {}).items()):
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append(f"{name}_bucket{_render_labels(key, ('le', str(bound)))} {count}")
+                lines.append(f"{name}_bucket{_render_labels(key, ('le', '+Inf'))} {hist.count}")
+                lines.append(f"{name}_sum{_render_labels(key)} {hist.sum}")
+                lines.append(f"{name}_count{_render_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+metrics_service = MetricsService()
+
+metrics_service.histogram("jarvis_stage_seconds", "Latency of each pipeline stage (chat turn, ingest, transcription)")
+metrics_service.histogram("jarvis_chat_turn_seconds", "End-to-end latency of a chat turn")
+metrics_service.histogram("llm_queue_wait_seconds", "Time spent waiting for a free LLM slot")
+metrics_service.histogram("llm_time_to_first_token_seconds", "Time from request to first streamed token")
+metrics_service.histogram("llm_generation_seconds", "Total streaming generation time")
+metrics_service.histogram(
+    "llm_tokens_per_second", "Decode throughput reported by Ollama",
+    buckets=(1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 400)
+)
+metrics_service.counter("llm_tokens_total", "Tokens processed by the LLM, per model tier")
+metrics_service.counter("llm_requests_total", "LLM calls per model tier and purpose")
+metrics_service.counter("llm_requests_cancelled_total", "LLM streams aborted before completion")
+metrics_service.counter("chat_turns_cancelled_total", "Chat turns cancelled by a stop frame, a new message or a disconnect")
+metrics_service.gauge("llm_requests_in_flight", "LLM requests currently holding a slot")
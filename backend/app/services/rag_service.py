@@ -1,11 +1,53 @@
-from pinecone import Pinecone, ServerlessSpec
 from app.config import get_settings
 from app.services.llm_service import llm_service
-from typing import List, Dict, Any
+from app.services.metrics_service import metrics_service
+from app.services.file_service import extract_file
+from app.models.vector import VectorChunk
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import os
+import time
 import uuid
 
 settings = get_settings()
 
+# General knowledge (and, until migrate_vectors.py runs, legacy project files)
+GLOBAL_NAMESPACE = "default"
+# Chunk types that belong in a per-project / per-task namespace
+SCOPED_TYPES = ("project_file", "task_file")
+# Two-stage retrieval is skipped (all chunks searched) while more files than this lack a summary
+MAX_UNSUMMARIZED_FILTER = 100
+SUMMARY_SUFFIX = "-summaries"
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+
+def project_namespace(project_id: int) -> str:
+    return f"project-{project_id}"
+
+def summary_namespace(project_id: int) -> str:
+    """One vector per file (its summary), searched before the project's chunks."""
+    return f"project-{project_id}{SUMMARY_SUFFIX}"
+
+def task_namespace(task_id: int) -> str:
+    return f"task-{task_id}"
+
+def response_field(obj: Any, key: str, default: Any = None) -> Any:
+    # Pinecone responses are objects, the fakes and the local index return dicts
+    if isinstance(obj, dict):
+        return obj.get(key, default)
+    return getattr(obj, key, default)
+
+def namespace_for(metadata: Dict[str, Any]) -> str:
+    """Where a chunk with this metadata belongs."""
+    if metadata.get("task_id") is not None:
+        return task_namespace(int(metadata["task_id"]))
+    if metadata.get("project_id") is not None:
+        return project_namespace(int(metadata["project_id"]))
+    return GLOBAL_NAMESPACE
+
 class RAGService:
     def __init__(self):
         self.pc = None
@@ -15,12 +57,30 @@ class RAGService:
     def initialize(self):
         if self.initialized:
             return
+
+        if settings.VECTOR_BACKEND == "local":
+            try:
+                # numpy-backed; imported on first use like the Pinecone client
+                from app.services.local_index import LocalVectorIndex
+                self.index = LocalVectorIndex(
+                    settings.LOCAL_INDEX_DIR,
+                    quantization=settings.VECTOR_QUANTIZATION,
+                    rescore=settings.VECTOR_RESCORE_CANDIDATES
+                )
+                self.initialized = True
+                print(f"Local vector index loaded ({settings.VECTOR_QUANTIZATION} quantization)")
+            except Exception as e:
+                print(f"Error loading local vector index: {e}")
+            return
         
         if not settings.PINECONE_API_KEY:
             print("Pinecone API Key not set. RAG disabled.")
             return
 
         try:
+            # Imported here: the pinecone client is slow to import and unused without a key
+            from pinecone import Pinecone, ServerlessSpec
+
             self.pc = Pinecone(api_key=settings.PINECONE_API_KEY)
             
             # Check if index exists, create if not
@@ -43,40 +103,136 @@ class RAGService:
         except Exception as e:
             print(f"Error initializing Pinecone: {e}")
 
-    def chunk_text(self, text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
+    def chunk_text(self, text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
         """Simple text chunker via character count."""
         chunks = []
         for i in range(0, len(text), chunk_size - overlap):
             chunks.append(text[i:i + chunk_size])
         return chunks
 
-    async def upsert_document(self, text: str, metadata: Dict[str, Any], namespace: str = "default"):
+    def join_chunks(self, chunks: List[str], overlap: int = CHUNK_OVERLAP) -> str:
+        """Inverse of chunk_text: the text back from its chunks, in order."""
+        return "".join([chunks[0]] + [c[overlap:] for c in chunks[1:]]) if chunks else ""
+
+    async def upsert_document(self, text: str, metadata: Dict[str, Any], namespace: str = GLOBAL_NAMESPACE) -> List[str]:
+        """Returns the IDs of the vectors written."""
+        ids = await self.upsert_documents([(text, metadata)], namespace=namespace)
+        return ids[0]
+
+    async def index_file(self, file_path: str, metadata: Dict[str, Any], namespace: str = GLOBAL_NAMESPACE, filename: Optional[str] = None) -> Tuple[List[str], str]:
+        """
+        Index a file already saved on disk. Extraction runs in a worker thread;
+        `filename` (default: the path's basename) picks the extractor and is
+        stored in the metadata. Returns the IDs of the vectors written and the text.
+        """
+        filename = filename or os.path.basename(file_path)
+        with metrics_service.span("upload_extract"):
+            text = await asyncio.to_thread(extract_file, file_path, filename)
+        if not text.strip():
+            return [], text
+
+        metadata = {"filename": filename, **metadata}
+        return await self.upsert_document(text, metadata, namespace=namespace), text
+
+    async def copy_vectors(self, ids: List[str], source_namespace: str, metadata: Dict[str, Any], namespace: str) -> Tuple[List[str], str]:
+        """
+        Write copies of a document's chunk vectors under new metadata, without
+        embedding anything (for files whose content is already indexed).
+        Returns the new vector IDs and the document text rebuilt from the
+        chunks; ([], "") if the source can't be read.
+        """
+        if not ids:
+            return [], ""
         if not self.initialized:
             self.initialize()
             if not self.initialized:
-                return
+                return [], ""
 
-        chunks = self.chunk_text(text)
+        fetched = {}
+        try:
+            for i in range(0, len(ids), 100): # IDs go in the URL, keep requests short
+                with metrics_service.span("vector_fetch"):
+                    page = self.index.fetch(ids=ids[i:i + 100], namespace=source_namespace)
+                fetched.update(response_field(page, "vectors", {}) or {})
+        except Exception as e:
+            print(f"Error fetching vectors: {e}")
+            return [], ""
+        if len(fetched) < len(ids):
+            return [], "" # Partly gone (GC'd, or a failed write): embed afresh instead
+
+        sources = sorted(fetched.values(), key=lambda v: (response_field(v, "metadata", None) or {}).get("chunk_index", 0))
+        indexed_at = int(time.time())
         vectors = []
-        
-        for i, chunk in enumerate(chunks):
-            embedding = await llm_service.get_embedding(chunk)
-            if not embedding:
-                continue
-                
-            doc_id = f"{metadata.get('filename', 'doc')}_{i}_{uuid.uuid4().hex[:8]}"
-            
-            # Metadata for the chunk
-            chunk_metadata = metadata.copy()
-            chunk_metadata['text'] = chunk
-            chunk_metadata['chunk_index'] = i
-            
+        chunks = []
+        for source in sources:
+            source_metadata = response_field(source, "metadata", None) or {}
+            chunk_index = source_metadata.get("chunk_index", 0)
+            chunks.append(source_metadata.get("text", ""))
             vectors.append({
-                "id": doc_id,
-                "values": embedding,
-                "metadata": chunk_metadata
+                "id": f"{metadata.get('filename', 'doc')}_{chunk_index}_{uuid.uuid4().hex[:8]}",
+                "values": list(response_field(source, "values", [])),
+                "metadata": {
+                    **metadata,
+                    "text": source_metadata.get("text", ""),
+                    "chunk_index": chunk_index,
+                    "indexed_at": indexed_at,
+                }
             })
-            
+
+        try:
+            for i in range(0, len(vectors), 100):
+                with metrics_service.span("vector_upsert"):
+                    self.index.upsert(vectors=vectors[i:i + 100], namespace=namespace)
+        except Exception as e:
+            # Batches written before the failure are untracked; the GC reaps them
+            print(f"Error upserting vectors: {e}")
+            return [], ""
+        return [v["id"] for v in vectors], self.join_chunks(chunks)
+
+    async def upsert_documents(self, documents: List[Tuple[str, Dict[str, Any]]], namespace: str = GLOBAL_NAMESPACE) -> List[List[str]]:
+        """
+        Chunk, embed and upsert many (text, metadata) documents. Chunks are
+        embedded EMBED_BATCH_SIZE at a time rather than one request per chunk.
+        Returns the vector IDs written for each document, in order; record
+        them with `track` so they are deleted along with their owner.
+        """
+        ids: List[List[str]] = [[] for _ in documents]
+        if not self.initialized:
+            self.initialize()
+            if not self.initialized:
+                return ids
+
+        pending = [] # (document index, chunk, metadata, chunk_index)
+        for d, (text, metadata) in enumerate(documents):
+            for i, chunk in enumerate(self.chunk_text(text)):
+                pending.append((d, chunk, metadata, i))
+
+        vectors = []
+        owners = []
+        indexed_at = int(time.time())
+        batch_size = max(1, settings.EMBED_BATCH_SIZE)
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            embeddings = await llm_service.get_embeddings([chunk for _, chunk, _, _ in batch])
+            for (d, chunk, metadata, i), embedding in zip(batch, embeddings):
+                if not embedding:
+                    continue
+
+                doc_id = f"{metadata.get('filename', 'doc')}_{i}_{uuid.uuid4().hex[:8]}"
+
+                # Metadata for the chunk
+                chunk_metadata = metadata.copy()
+                chunk_metadata['text'] = chunk
+                chunk_metadata['chunk_index'] = i
+                chunk_metadata['indexed_at'] = indexed_at # Lets the GC spare vectors whose row isn't committed yet
+
+                vectors.append({
+                    "id": doc_id,
+                    "values": embedding,
+                    "metadata": chunk_metadata
+                })
+                owners.append(d)
+
         # Batch upsert (limit 100 per request usually safe)
         if vectors:
             try:
@@ -84,11 +240,18 @@ class RAGService:
                 batch_size = 100
                 for i in range(0, len(vectors), batch_size):
                     batch = vectors[i:i+batch_size]
-                    self.index.upsert(vectors=batch, namespace=namespace)
+                    with metrics_service.span("vector_upsert"):
+                        self.index.upsert(vectors=batch, namespace=namespace)
+                    for vector, d in zip(batch, owners[i:i+batch_size]):
+                        ids[d].append(vector["id"])
             except Exception as e:
+                # Batches written before the failure are untracked; the GC reaps them
                 print(f"Error upserting vectors: {e}")
+                return [[] for _ in documents]
+
+        return ids
 
-    async def query_context(self, query: str, namespace: str = "default", top_k: int = 5, filter: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    async def query_context(self, query: str, namespace: str = GLOBAL_NAMESPACE, top_k: int = 5, filter: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         if not self.initialized:
             self.initialize()
             if not self.initialized:
@@ -98,6 +261,55 @@ class RAGService:
         if not embedding:
             return []
 
+        return self._query(embedding, namespace, top_k, filter)
+
+    async def query_scoped(self, query: str, namespace: str, owner_filter: Dict[str, Any], top_k: int = 5, coarse_namespace: Optional[str] = None, unsummarized: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Tiered retrieval for a project/task chat: search the scope's own
+        namespace first, and only if it yields fewer than
+        RAG_FALLBACK_MIN_RESULTS good matches also search the global namespace
+        (general knowledge plus this scope's not-yet-migrated vectors).
+
+        With `coarse_namespace` (per-file summaries) the scope search is two
+        stage: pick the RAG_SUMMARY_TOP_FILES most relevant files, then search
+        chunks of those files plus `unsummarized` (files with no summary
+        vector, which the first stage can't find).
+        """
+        if not self.initialized:
+            self.initialize()
+            if not self.initialized:
+                return []
+
+        embedding = await llm_service.get_embedding(query)
+        if not embedding:
+            return []
+
+        chunk_filter = None
+        unsummarized = unsummarized or []
+        if coarse_namespace and len(unsummarized) <= MAX_UNSUMMARIZED_FILTER:
+            top_files = settings.RAG_SUMMARY_TOP_FILES
+            files = self._query(embedding, coarse_namespace, top_files)
+            filenames = {f["metadata"].get("filename") for f in files}
+            # Fewer summarized files than we'd keep: nothing to prune, search everything
+            if len(filenames) >= top_files:
+                chunk_filter = {"filename": {"$in": sorted(filenames | set(unsummarized))}}
+
+        matches = self._query(embedding, namespace, top_k, chunk_filter)
+        good = [m for m in matches if m["score"] >= settings.RAG_FALLBACK_MIN_SCORE]
+        if not settings.RAG_GLOBAL_FALLBACK or len(good) >= settings.RAG_FALLBACK_MIN_RESULTS:
+            return matches
+
+        metrics_service.inc("rag_global_fallback_total")
+        # Exclude other projects'/tasks' files that still live in the global namespace
+        global_filter = {"$or": [{"type": {"$nin": list(SCOPED_TYPES)}}, owner_filter]}
+        seen = {m["text"] for m in matches}
+        for match in self._query(embedding, GLOBAL_NAMESPACE, top_k, global_filter):
+            if match["text"] not in seen:
+                matches.append(match)
+        matches.sort(key=lambda m: m["score"], reverse=True)
+        return matches[:top_k]
+
+    def _query(self, embedding: List[float], namespace: str, top_k: int, filter: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         try:
             query_params = {
                 "namespace": namespace,
@@ -110,7 +322,8 @@ class RAGService:
             if filter:
                 query_params["filter"] = filter
 
-            results = self.index.query(**query_params)
+            with metrics_service.span("vector_query"):
+                results = self.index.query(**query_params)
 
             matches = []
             for match in results['matches']:
@@ -126,4 +339,74 @@ class RAGService:
             print(f"Error querying Pinecone: {e}")
             return []
 
+    def delete_vectors(self, ids: List[str], namespace: str = GLOBAL_NAMESPACE) -> bool:
+        """Delete vectors by ID (Pinecone caps a delete at 1000 IDs). Returns False on failure."""
+        if not ids:
+            return True
+        if not self.initialized:
+            self.initialize()
+            if not self.initialized:
+                return False
+        try:
+            for i in range(0, len(ids), 1000):
+                with metrics_service.span("vector_delete"):
+                    self.index.delete(ids=ids[i:i + 1000], namespace=namespace)
+            return True
+        except Exception as e:
+            print(f"Error deleting vectors: {e}")
+            return False
+
+    def drop_namespace(self, namespace: str) -> bool:
+        """Delete a whole project/task namespace, including any untracked leftovers."""
+        if namespace == GLOBAL_NAMESPACE or not self.initialized:
+            return False
+        try:
+            with metrics_service.span("vector_delete"):
+                self.index.delete(delete_all=True, namespace=namespace)
+            return True
+        except Exception as e:
+            # Pinecone errors on namespaces that were never written to
+            print(f"Error dropping namespace {namespace}: {e}")
+            return False
+
+    def track(self, db: AsyncSession, owner_type: str, owner_id: int, ids: List[str], namespace: str = GLOBAL_NAMESPACE):
+        """Record vector IDs against their owner row. Added to `db`; the caller commits."""
+        db.add_all([
+            VectorChunk(owner_type=owner_type, owner_id=owner_id, vector_id=vid, namespace=namespace)
+            for vid in ids
+        ])
+
+    async def forget(self, db: AsyncSession, owner_type: str, owner_ids: List[int]) -> int:
+        """
+        Delete the vectors of the given owners from the index, then their
+        tracking rows (caller commits). If the index can't be reached the rows
+        are kept so the background reconciler retries once the owner is gone.
+        Returns the number of vectors deleted.
+        """
+        if not owner_ids:
+            return 0
+        result = await db.execute(
+            select(VectorChunk.namespace, VectorChunk.vector_id)
+            .where(VectorChunk.owner_type == owner_type, VectorChunk.owner_id.in_(owner_ids))
+        )
+        by_namespace: Dict[str, List[str]] = {}
+        for namespace, vector_id in result.all():
+            by_namespace.setdefault(namespace, []).append(vector_id)
+        if not by_namespace:
+            return 0
+
+        deleted = 0
+        for namespace, ids in by_namespace.items():
+            if not self.delete_vectors(ids, namespace):
+                return deleted
+            deleted += len(ids)
+
+        await db.execute(
+            delete(VectorChunk)
+            .where(VectorChunk.owner_type == owner_type, VectorChunk.owner_id.in_(owner_ids))
+        )
+        return deleted
+
 rag_service = RAGService()
+
+metrics_service.counter("rag_global_fallback_total", "Scoped retrievals that also searched the global namespace")
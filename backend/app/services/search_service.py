@@ -0,0 +1,132 @@
+"""
+Full-text search over chat messages.
+
+SQLite uses the `messages_fts` FTS5 index (migration 0011) with bm25 ranking
+and snippet(); PostgreSQL uses to_tsvector/ts_rank/ts_headline over the GIN
+index. Results are ordered best match first, ties by message id, and paged
+with the same keyset cursors as the list endpoints.
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import Float, bindparam, func, literal_column, select, table, column
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import IS_SQLITE
+from app.models.chat import ChatSession, Message
+from app.pagination import encode_cursor, keyset
+from app.services.archive_service import message_archive_service
+
+HIGHLIGHT_START, HIGHLIGHT_END = "<mark>", "</mark>"
+SNIPPET_TOKENS = 16
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+def fts5_query(q: str) -> Optional[str]:
+    """
+    User input as an FTS5 query: every word must match, the last one as a
+    prefix (for search-as-you-type). Terms are quoted so operators and
+    punctuation in the input can't cause syntax errors.
+    """
+    terms = _TERM_RE.findall(q)
+    if not terms:
+        return None
+    return " ".join(f'"{t}"' for t in terms) + "*"
+
+def highlight(text: str, q: str, tokens: int = SNIPPET_TOKENS) -> str:
+    """
+    Python stand-in for snippet(), for archived messages whose text FTS5 can't
+    read. Matching is approximate (word prefixes instead of porter stems).
+    """
+    stems = [t.lower()[:max(3, len(t) - 3)] for t in _TERM_RE.findall(q)]
+    words = text.split()
+    hits = [any(w.lower().strip("\"'()[]{}.,;:!?*-").startswith(s) for s in stems) for w in words]
+    first = hits.index(True) if True in hits else 0
+    start = max(0, min(first - tokens // 4, len(words) - tokens))
+    end = min(len(words), start + tokens)
+    parts = [f"{HIGHLIGHT_START}{w}{HIGHLIGHT_END}" if hit else w for w, hit in zip(words[start:end], hits[start:end])]
+    return ("…" if start > 0 else "") + " ".join(parts) + ("…" if end < len(words) else "")
+
+class SearchService:
+    def _hits(self, q: str):
+        """Subquery of matching messages with `rank` (lower is better) and `snippet`."""
+        if IS_SQLITE:
+            fts = table("messages_fts", column("rowid"))
+            match = literal_column("messages_fts").op("MATCH")(bindparam("q", fts5_query(q)))
+            rank = literal_column("rank", Float) # bm25, negative: lower is better
+            snippet = func.snippet(
+                literal_column("messages_fts"), -1, HIGHLIGHT_START, HIGHLIGHT_END, "…", SNIPPET_TOKENS
+            )
+            base = select(Message.id).select_from(fts).join(Message, Message.id == fts.c.rowid)
+        else:
+            # Literals, not bind parameters, so the planner matches the GIN index expression
+            english = literal_column("'english'::regconfig")
+            document = func.to_tsvector(english, func.coalesce(Message.content, literal_column("''")))
+            query = func.websearch_to_tsquery(english, q)
+            match = document.op("@@")(query)
+            rank = -func.ts_rank(document, query, type_=Float)
+            snippet = func.ts_headline(
+                english, Message.content, query,
+                f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxFragments=1, "
+                f"MaxWords={SNIPPET_TOKENS * 2}, MinWords={SNIPPET_TOKENS // 2}"
+            )
+            base = select(Message.id)
+
+        return (
+            base.add_columns(
+                Message.session_id,
+                Message.role,
+                Message.timestamp,
+                ChatSession.title.label("session_title"),
+                snippet.label("snippet"),
+                rank.label("rank"),
+            )
+            .join(ChatSession, ChatSession.id == Message.session_id)
+            .where(match)
+        )
+
+    async def search_messages(
+        self,
+        db: AsyncSession,
+        q: str,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        session_id: Optional[int] = None,
+    ):
+        """Returns (rows, cursor of the next page or None)."""
+        if IS_SQLITE and fts5_query(q) is None:
+            return [], None
+
+        hits = self._hits(q)
+        if session_id is not None:
+            hits = hits.where(Message.session_id == session_id)
+        hits = hits.subquery("hits")
+        order = [(hits.c.rank, False), (hits.c.id, False)]
+
+        stmt = keyset(select(hits), order, cursor).limit(limit)
+        try:
+            result = await db.execute(stmt)
+        except DBAPIError as e:
+            if IS_SQLITE and "no such table: messages_fts" in str(e):
+                # Migration 0011 runs in the background after startup
+                raise HTTPException(status_code=503, detail="Search index is still being built, try again shortly")
+            raise
+
+        rows = result.all()
+        next_cursor = encode_cursor([rows[-1].rank, rows[-1].id]) if len(rows) >= limit else None
+        return await self._fill_archived_snippets(db, rows, q), next_cursor
+
+    async def _fill_archived_snippets(self, db: AsyncSession, rows, q: str) -> List[Dict[str, Any]]:
+        """Archived messages are still indexed, but snippet() can't see their text."""
+        hits = [row._asdict() for row in rows]
+        archives: Dict[int, Dict[int, str]] = {}
+        for hit in hits:
+            if hit["snippet"] is None:
+                if hit["session_id"] not in archives:
+                    archives[hit["session_id"]] = await message_archive_service.load(db, hit["session_id"])
+                hit["snippet"] = highlight(archives[hit["session_id"]].get(hit["id"], ""), q)
+        return hits
+
+search_service = SearchService()
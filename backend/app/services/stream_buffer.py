@@ -0,0 +1,135 @@
+"""
+Per-connection outbound buffer for streamed chat replies.
+
+Generation only appends to the buffer, so it never waits on the socket. A
+writer task drains the buffer, joining everything queued into one frame (the
+client concatenates chunks, so merging frames doesn't change what it shows).
+If sends fall behind and `max_frames` chunks pile up, the slow-consumer policy
+decides what happens:
+
+- coalesce:   keep merging new chunks into the last queued frame
+- final_only: stop streaming and send the rest of the answer in one frame
+              when it's finished
+- disconnect: close the socket (1008), which cancels the turn
+"""
+import asyncio
+from collections import deque
+from typing import List, Optional
+
+from fastapi import WebSocket
+
+from app.services.metrics_service import metrics_service
+
+POLICIES = ("coalesce", "final_only", "disconnect")
+
+class OutboundBuffer:
+    def __init__(self, websocket: WebSocket, max_frames: int = 256, policy: str = "coalesce", send_timeout: float = 30):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown slow-consumer policy '{policy}', expected one of {POLICIES}")
+        self.websocket = websocket
+        self.max_frames = max(1, max_frames)
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.frames: deque = deque()
+        self.held: List[str] = [] # final_only: the rest of the current answer
+        self.closed = False
+        self._overflowing = False
+        self._close_code: Optional[int] = None
+        self._ready = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._writer = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the writer; anything still queued is dropped."""
+        self.closed = True
+        if self._writer is not None and not self._writer.done():
+            self._writer.cancel()
+            try:
+                await self._writer
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._discard()
+
+    def put(self, text: str):
+        if self.closed or not text:
+            return
+        if self.held:
+            self.held.append(text)
+            return
+        if len(self.frames) < self.max_frames:
+            self.frames.append(text)
+            metrics_service.add_gauge("ws_outbound_buffer_frames", 1)
+            self._ready.set()
+            return
+
+        if not self._overflowing:
+            self._overflowing = True
+            metrics_service.inc("ws_slow_consumer_total", labels={"policy": self.policy})
+        if self.policy == "coalesce":
+            self.frames[-1] += text
+        elif self.policy == "final_only":
+            self.held.append(text)
+        else:
+            self._close_code = 1008
+            self.closed = True
+            self._discard()
+            if self._writer is not None:
+                self._writer.cancel()
+
+    def finish(self):
+        """End of an answer: release text held back by the final_only policy."""
+        if self.held and not self.closed:
+            self.frames.append("".join(self.held))
+            metrics_service.add_gauge("ws_outbound_buffer_frames", 1)
+            self._ready.set()
+        self.held = []
+
+    def _discard(self):
+        if self.frames:
+            metrics_service.add_gauge("ws_outbound_buffer_frames", -len(self.frames))
+            self.frames.clear()
+        self.held = []
+
+    async def _run(self):
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                if not self.frames:
+                    continue
+                batch = len(self.frames)
+                text = "".join(self.frames)
+                self.frames.clear()
+                self._overflowing = False
+                metrics_service.add_gauge("ws_outbound_buffer_frames", -batch)
+                metrics_service.observe("ws_outbound_batch_frames", batch)
+                try:
+                    await asyncio.wait_for(self.websocket.send_text(text), timeout=self.send_timeout)
+                except asyncio.TimeoutError:
+                    # A client this far behind is as good as gone
+                    metrics_service.inc("ws_slow_consumer_total", labels={"policy": "send_timeout"})
+                    self._close_code = 1008
+                    break
+                except Exception:
+                    # Socket is gone; the read loop notices and cancels the turn
+                    self.closed = True
+                    self._discard()
+                    return
+        except asyncio.CancelledError:
+            if self._close_code is None:
+                raise
+        self.closed = True
+        self._discard()
+        try:
+            await self.websocket.close(code=self._close_code)
+        except Exception:
+            pass
+
+metrics_service.gauge("ws_outbound_buffer_frames", "Chunks queued for WebSocket clients, across connections")
+metrics_service.histogram(
+    "ws_outbound_batch_frames", "Chunks merged into each WebSocket send",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+)
+metrics_service.counter("ws_slow_consumer_total", "Times a WebSocket client fell behind and the slow-consumer policy kicked in")
@@ -0,0 +1,200 @@
+"""
+Background per-file summaries for project files.
+
+Uploads and imports store a placeholder summary (the first 200 characters) and
+leave `summarized_at` NULL. This worker picks those files up, asks the LLM for
+a short summary, stores it on the row and upserts its embedding into the
+project's summary namespace, which two-stage retrieval searches first. A file
+with the same content as one already summarized reuses its summary instead.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import List
+
+from sqlalchemy import and_, exists, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.models.project import ProjectFile
+from app.models.vector import VectorChunk
+from app.services.file_service import extract_file
+from app.services.llm_service import llm_service
+from app.services.metrics_service import metrics_service
+from app.services.rag_service import rag_service, summary_namespace
+
+settings = get_settings()
+
+SUMMARY_PROMPT = """Summarize the following file in 2-4 sentences for a search index.
+Say what kind of file it is, what it covers, and name the key topics, components or entities.
+Reply with the summary only.
+
+File: {filename}
+
+{content}"""
+
+POLL_SECONDS = 60 # Also picks up files left over from before a restart
+RETRY_SECONDS = 300 # After a failure; doubled per failed attempt for a single file
+MAX_ATTEMPTS = 5 # Then the file keeps its placeholder summary
+
+class SummaryService:
+    def __init__(self):
+        self._wake = asyncio.Event()
+
+    def wake(self):
+        """Call after adding project files so they're summarized right away."""
+        self._wake.set()
+
+    async def summarize_pending(self, limit: int = 10) -> int:
+        """Summarize up to `limit` pending files. Returns how many were done."""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(ProjectFile)
+                .where(
+                    ProjectFile.summarized_at.is_(None),
+                    or_(ProjectFile.summary_retry_at.is_(None), ProjectFile.summary_retry_at <= datetime.utcnow())
+                )
+                .order_by(ProjectFile.id)
+                .limit(limit)
+            )
+            files = result.scalars().all()
+
+            for db_file in files:
+                if await self._copy_duplicate(db, db_file):
+                    db_file.summarized_at = datetime.utcnow()
+                    await db.commit()
+                    continue
+
+                try:
+                    content = await asyncio.to_thread(extract_file, db_file.file_path, db_file.filename)
+                except Exception as e:
+                    # Unreadable (deleted, binary): keep the placeholder, don't retry
+                    print(f"Summary skipped for {db_file.filename}: {e}")
+                    content = ""
+
+                if content.strip():
+                    try:
+                        with metrics_service.span("file_summary"):
+                            summary = await llm_service.generate_response(
+                                SUMMARY_PROMPT.format(filename=db_file.filename, content=content[:settings.SUMMARY_INPUT_CHARS]),
+                                purpose="summary"
+                            )
+                        summary = summary.strip()
+                        namespace = summary_namespace(db_file.project_id)
+                        ids = await rag_service.upsert_documents([(summary, {
+                            "project_id": db_file.project_id,
+                            "filename": db_file.filename,
+                            "type": "file_summary"
+                        })], namespace=namespace)
+                    except Exception as e:
+                        # Back this file off and carry on with the rest of the queue
+                        self._failed(db_file, e)
+                        await db.commit()
+                        continue
+                    rag_service.track(db, "project_file", db_file.id, ids[0], namespace)
+                    db_file.summary = summary
+
+                db_file.summarized_at = datetime.utcnow()
+                await db.commit()
+
+            return len(files)
+
+    def _failed(self, db_file: ProjectFile, error: Exception):
+        attempts = (db_file.summary_attempts or 0) + 1
+        db_file.summary_attempts = attempts
+        metrics_service.inc("file_summary_failures_total")
+        if attempts >= MAX_ATTEMPTS:
+            print(f"Summary failed for {db_file.filename}, giving up after {attempts} attempts: {error}")
+            db_file.summarized_at = datetime.utcnow()
+            return
+        delay = RETRY_SECONDS * 2 ** (attempts - 1)
+        print(f"Summary failed for {db_file.filename} (attempt {attempts}), retrying in {delay}s: {error}")
+        db_file.summary_retry_at = datetime.utcnow() + timedelta(seconds=delay)
+
+    async def unsummarized_filenames(self, db: AsyncSession, project_id: int, limit: int) -> List[str]:
+        """
+        Up to `limit` of the project's files that have no summary vector (still
+        queued, failed, or unreadable), which two-stage retrieval must search too.
+        """
+        namespace = summary_namespace(project_id)
+        result = await db.execute(
+            select(ProjectFile.filename)
+            .where(
+                ProjectFile.project_id == project_id,
+                ~exists().where(and_(
+                    VectorChunk.owner_type == "project_file",
+                    VectorChunk.owner_id == ProjectFile.id,
+                    VectorChunk.namespace == namespace
+                ))
+            )
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    async def _copy_duplicate(self, db: AsyncSession, db_file: ProjectFile) -> bool:
+        """Reuse the summary (and its vector) of an already summarized file with the same content."""
+        if not db_file.content_hash:
+            return False
+        result = await db.execute(
+            select(ProjectFile)
+            .where(
+                ProjectFile.content_hash == db_file.content_hash,
+                ProjectFile.summarized_at.isnot(None),
+                ProjectFile.id != db_file.id
+            )
+            .order_by(ProjectFile.id)
+            .limit(1)
+        )
+        source = result.scalar_one_or_none()
+        if source is None:
+            return False
+
+        source_namespace = summary_namespace(source.project_id)
+        result = await db.execute(
+            select(VectorChunk.vector_id)
+            .where(
+                VectorChunk.owner_type == "project_file",
+                VectorChunk.owner_id == source.id,
+                VectorChunk.namespace == source_namespace
+            )
+        )
+        source_ids = result.scalars().all()
+        if source_ids:
+            namespace = summary_namespace(db_file.project_id)
+            ids, _ = await rag_service.copy_vectors(source_ids, source_namespace, {
+                "project_id": db_file.project_id,
+                "filename": db_file.filename,
+                "type": "file_summary"
+            }, namespace)
+            if not ids:
+                return False # Source vector unreadable: summarize from scratch
+            rag_service.track(db, "project_file", db_file.id, ids, namespace)
+
+        db_file.summary = source.summary
+        metrics_service.inc("file_summaries_reused_total")
+        return True
+
+    async def run_forever(self):
+        while True:
+            try:
+                # Drain the backlog, then sleep until woken or the next poll
+                while await self.summarize_pending():
+                    await asyncio.sleep(0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"File summary error: {e}")
+                await asyncio.sleep(RETRY_SECONDS)
+                continue
+
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+summary_service = SummaryService()
+
+metrics_service.counter("file_summaries_reused_total", "Files given the summary of an identical, already summarized file")
+metrics_service.counter("file_summary_failures_total", "File summaries that failed and were backed off")
@@ -0,0 +1,225 @@
+"""
+Background reconciliation between the database and the vector index.
+
+Owners delete their vectors synchronously (`rag_service.forget`), but that
+misses rows removed by other paths (e.g. ORM cascades) and fails when the
+index is unreachable. The reconciler periodically:
+
+1. Reaps tracked vectors whose owner row no longer exists.
+2. Walks the index for vectors with no tracking row (written before tracking
+   existed, or whose owner's commit failed). If the owner can still be found
+   from the chunk metadata the vector is adopted, otherwise it is deleted.
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, not_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal
+from app.models.memory import MemoryEntry
+from app.models.project import ProjectFile
+from app.models.task import TaskFile
+from app.models.vector import VectorChunk
+from app.services.metrics_service import metrics_service
+from app.services.rag_service import rag_service, namespace_for, response_field, GLOBAL_NAMESPACE
+
+settings = get_settings()
+
+OWNER_MODELS = {
+    "project_file": ProjectFile,
+    "task_file": TaskFile,
+    "memory": MemoryEntry,
+}
+
+class VectorGCService:
+    async def reconcile(self) -> Dict[str, int]:
+        stats = {"reaped": 0, "adopted": 0, "deleted_untracked": 0}
+        if not rag_service.initialized:
+            rag_service.initialize()
+            if not rag_service.initialized:
+                return stats
+
+        with metrics_service.span("vector_gc"):
+            async with AsyncSessionLocal() as db:
+                stats["reaped"] = await self._reap_tracked(db)
+                adopted, deleted = await self._sweep_index(db)
+                stats["adopted"], stats["deleted_untracked"] = adopted, deleted
+
+        metrics_service.inc("vector_gc_deleted_total", stats["reaped"], {"reason": "owner_deleted"})
+        metrics_service.inc("vector_gc_deleted_total", stats["deleted_untracked"], {"reason": "untracked"})
+        return stats
+
+    async def _reap_tracked(self, db: AsyncSession) -> int:
+        reaped = 0
+        for owner_type, model in OWNER_MODELS.items():
+            while True:
+                result = await db.execute(
+                    select(VectorChunk.id, VectorChunk.namespace, VectorChunk.vector_id)
+                    .where(
+                        VectorChunk.owner_type == owner_type,
+                        not_(VectorChunk.owner_id.in_(select(model.id)))
+                    )
+                    .limit(settings.VECTOR_GC_BATCH_SIZE)
+                )
+                rows = result.all()
+                if not rows:
+                    break
+
+                by_namespace: Dict[str, List[str]] = {}
+                for _, namespace, vector_id in rows:
+                    by_namespace.setdefault(namespace, []).append(vector_id)
+                if not all(rag_service.delete_vectors(ids, ns) for ns, ids in by_namespace.items()):
+                    return reaped # Index unreachable; next run retries
+
+                await db.execute(delete(VectorChunk).where(VectorChunk.id.in_([r[0] for r in rows])))
+                await db.commit()
+                reaped += len(rows)
+                await asyncio.sleep(0)
+        return reaped
+
+    async def _sweep_index(self, db: AsyncSession) -> Tuple[int, int]:
+        index = rag_service.index
+        if not hasattr(index, "list"):
+            return 0, 0 # Listing IDs needs a serverless index
+
+        try:
+            namespaces = list(response_field(index.describe_index_stats(), "namespaces", {}) or {})
+        except Exception as e:
+            print(f"Vector GC: could not read index stats: {e}")
+            return 0, 0
+
+        adopted = deleted = 0
+        grace_cutoff = time.time() - settings.VECTOR_GC_GRACE_SECONDS
+        for namespace in namespaces:
+            try:
+                pages = index.list(namespace=namespace)
+                a, d = await self._sweep_namespace(db, index, namespace, pages, grace_cutoff)
+            except Exception as e:
+                print(f"Vector GC: could not sweep namespace '{namespace}': {e}")
+                continue
+            adopted += a
+            deleted += d
+        return adopted, deleted
+
+    async def _sweep_namespace(self, db: AsyncSession, index, namespace: str, pages, grace_cutoff: float) -> Tuple[int, int]:
+        adopted = deleted = 0
+        for page in pages:
+            page = list(page)
+            if not page:
+                continue
+            result = await db.execute(select(VectorChunk.vector_id).where(VectorChunk.vector_id.in_(page)))
+            tracked = set(result.scalars().all())
+            untracked = [vid for vid in page if vid not in tracked]
+            if not untracked:
+                continue
+
+            fetched = response_field(index.fetch(ids=untracked, namespace=namespace), "vectors", {}) or {}
+            orphans = []
+            owners: Dict[Tuple, Optional[Tuple[str, int]]] = {}
+            for vid in untracked:
+                metadata = response_field(fetched.get(vid), "metadata", None) or {}
+                if metadata.get("indexed_at", 0) > grace_cutoff:
+                    continue # Owner row may not be committed yet
+                owner = await self._resolve_owner(db, metadata, owners)
+                if owner is False:
+                    continue # Not ours to judge (no owner metadata)
+                if owner is None:
+                    orphans.append(vid)
+                else:
+                    rag_service.track(db, owner[0], owner[1], [vid], namespace)
+                    adopted += 1
+
+            if orphans and rag_service.delete_vectors(orphans, namespace):
+                deleted += len(orphans)
+            await db.commit()
+            await asyncio.sleep(0)
+        return adopted, deleted
+
+    async def _resolve_owner(self, db: AsyncSession, metadata: Dict[str, Any], cache: Dict[Tuple, Any]):
+        """(owner_type, id) for the chunk's row, None if it's gone, False if unknown."""
+        filename = metadata.get("filename")
+        if metadata.get("task_id") is not None and filename:
+            key = ("task_file", int(metadata["task_id"]), filename)
+            query = select(TaskFile.id).where(TaskFile.task_id == key[1], TaskFile.filename == filename)
+        elif metadata.get("project_id") is not None and filename:
+            key = ("project_file", int(metadata["project_id"]), filename)
+            query = select(ProjectFile.id).where(ProjectFile.project_id == key[1], ProjectFile.filename == filename)
+        else:
+            return False
+
+        if key not in cache:
+            result = await db.execute(query.limit(1))
+            owner_id = result.scalar_one_or_none()
+            cache[key] = (key[0], owner_id) if owner_id is not None else None
+        return cache[key]
+
+    async def relocate_scoped_vectors(self, dry_run: bool = False) -> Dict[str, int]:
+        """
+        One-off move of project/task chunks from the global namespace into
+        their own (see migrate_vectors.py). Each page is written to the target
+        before it is deleted from the source, so an interrupted run leaves
+        duplicates (de-duplicated at query time) rather than gaps; re-run it.
+        """
+        stats = {"moved": 0, "kept": 0}
+        if not rag_service.initialized:
+            rag_service.initialize()
+            if not rag_service.initialized:
+                return stats
+        index = rag_service.index
+
+        async with AsyncSessionLocal() as db:
+            for page in index.list(namespace=GLOBAL_NAMESPACE):
+                page = list(page)
+                if not page:
+                    continue
+                fetched = response_field(index.fetch(ids=page, namespace=GLOBAL_NAMESPACE), "vectors", {}) or {}
+
+                moves: Dict[str, List[Dict[str, Any]]] = {}
+                for vid in page:
+                    vector = fetched.get(vid)
+                    if vector is None:
+                        continue
+                    metadata = dict(response_field(vector, "metadata", None) or {})
+                    target = namespace_for(metadata)
+                    if target == GLOBAL_NAMESPACE:
+                        stats["kept"] += 1
+                        continue
+                    moves.setdefault(target, []).append({
+                        "id": vid,
+                        "values": list(response_field(vector, "values", [])),
+                        "metadata": metadata
+                    })
+
+                for target, vectors in moves.items():
+                    ids = [v["id"] for v in vectors]
+                    if not dry_run:
+                        with metrics_service.span("vector_upsert"):
+                            index.upsert(vectors=vectors, namespace=target)
+                        await db.execute(
+                            update(VectorChunk).where(VectorChunk.vector_id.in_(ids)).values(namespace=target)
+                        )
+                        await db.commit()
+                        rag_service.delete_vectors(ids, GLOBAL_NAMESPACE)
+                    stats["moved"] += len(ids)
+        return stats
+
+    async def run_forever(self):
+        interval = settings.VECTOR_GC_INTERVAL_MINUTES * 60
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                stats = await self.reconcile()
+                if any(stats.values()):
+                    print(f"Vector GC: {stats}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Vector GC error: {e}")
+
+vector_gc_service = VectorGCService()
+
+metrics_service.counter("vector_gc_deleted_total", "Orphaned vectors removed from the index")
@@ -1,16 +1,13 @@
 import os
 import shutil
 from fastapi import UploadFile
+from app.services.metrics_service import metrics_service
 # faster-whisper is generally faster on CPU/GPU
 # But lets stick to a simple implementation with `openai-whisper` or `faster-whisper`
 # Installing `faster-whisper` is recommended.
 # Check requirements.txt, I didn't add it yet. I need to add it.
 # For now, I'll assume we can install it.
-
-try:
-    from faster_whisper import WhisperModel
-except ImportError:
-    WhisperModel = None
+# Imported lazily in initialize(): faster-whisper pulls in ctranslate2 and av.
 
 class WhisperService:
     def __init__(self):
@@ -22,7 +19,9 @@ class WhisperService:
         if self.initialized:
             return
             
-        if not WhisperModel:
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
             print("faster-whisper not installed. Voice disabled.")
             return
 
@@ -50,8 +49,10 @@ class WhisperService:
             shutil.copyfileobj(file.file, buffer)
             
         try:
-            segments, info = self.model.transcribe(temp_filename, beam_size=5)
-            text = " ".join([segment.text for segment in segments])
+            with metrics_service.span("transcription"):
+                segments, info = self.model.transcribe(temp_filename, beam_size=5)
+                # Segments are generated lazily, decoding happens while joining
+                text = " ".join([segment.text for segment in segments])
             return text.strip()
         except Exception as e:
             return f"Error transcribing: {str(e)}"
@@ -0,0 +1,244 @@
+"""
+Local stand-ins for the external services so benchmarks run offline.
+
+- FakeOllama: HTTP server speaking the subset of the Ollama API the backend
+  uses (/api/chat streaming + tools, /api/embeddings) with a configurable
+  first-token latency and token rate.
+- FakeVectorIndex: in-process replacement for the Pinecone index object
+  (upsert / query / delete) using brute-force cosine similarity.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+EMBEDDING_DIM = 768
+
+# Every fake reply ends with this token so clients can detect the end of a turn
+END_OF_REPLY = " [[eot]]"
+
+_WORD_RE = re.compile(r"\w+")
+
+def fake_embedding(text: str, dim: int = EMBEDDING_DIM) -> List[float]:
+    """Deterministic hashed bag-of-words vector; similar texts score higher."""
+    vec = [0.0] * dim
+    for word in _WORD_RE.findall(text.lower()):
+        h = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+        vec[h % dim] += 1.0 if (h >> 32) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+@dataclass
+class FakeOllamaConfig:
+    first_token_latency: float = 0.05 # seconds before the first token
+    token_rate: float = 200.0 # tokens per second after the first one
+    reply_tokens: int = 40
+    embed_latency: float = 0.002
+    # Per-model token_rate overrides, e.g. a faster small model for tiered routing
+    model_token_rates: Dict[str, float] = field(default_factory=dict)
+    # Messages containing one of these trigger a create_task tool call (once per turn)
+    tool_triggers: tuple = ("create a task", "add a task", "remind me")
+
+class FakeOllama:
+    def __init__(self, config: Optional[FakeOllamaConfig] = None):
+        self.config = config or FakeOllamaConfig()
+        self.requests = {"chat": 0, "embeddings": 0}
+        self.app = Starlette(routes=[
+            Route("/api/chat", self._chat, methods=["POST"]),
+            Route("/api/embeddings", self._embeddings, methods=["POST"]),
+            Route("/api/embed", self._embed, methods=["POST"]),
+        ])
+        self._server: Optional[uvicorn.Server] = None
+        self._thread: Optional[threading.Thread] = None
+        self.port: Optional[int] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def _tool_call_for(self, messages: List[Dict[str, Any]], tools) -> Optional[Dict[str, Any]]:
+        if not tools or not messages:
+            return None
+        last = messages[-1]
+        if last.get("role") != "user":
+            return None # Already answered a tool round this turn
+        text = (last.get("content") or "").lower()
+        if any(trigger in text for trigger in self.config.tool_triggers):
+            return {"function": {"name": "create_task", "arguments": {"title": "Benchmark task", "priority": "low"}}}
+        return None
+
+    async def _chat(self, request: Request):
+        body = await request.json()
+        self.requests["chat"] += 1
+        messages = body.get("messages") or []
+        tool_call = self._tool_call_for(messages, body.get("tools"))
+        model = body.get("model", "fake")
+        cfg = self.config
+        token_rate = cfg.model_token_rates.get(model, cfg.token_rate)
+        reply_tokens = min(cfg.reply_tokens, (body.get("options") or {}).get("num_predict") or cfg.reply_tokens)
+
+        def line(message: Dict[str, Any], done: bool = False, **extra) -> bytes:
+            return (json.dumps({"model": model, "message": message, "done": done, **extra}) + "\n").encode()
+
+        async def stream():
+            started = time.perf_counter()
+            await asyncio.sleep(cfg.first_token_latency)
+            if tool_call:
+                yield line({"role": "assistant", "content": "", "tool_calls": [tool_call]})
+                count = 1
+            else:
+                delay = 1.0 / token_rate if token_rate > 0 else 0
+                for i in range(reply_tokens):
+                    if i:
+                        await asyncio.sleep(delay)
+                    yield line({"role": "assistant", "content": f" tok{i}"})
+                yield line({"role": "assistant", "content": END_OF_REPLY})
+                count = reply_tokens + 1
+            elapsed = time.perf_counter() - started
+            yield line(
+                {"role": "assistant", "content": ""}, done=True, done_reason="stop",
+                prompt_eval_count=sum(len((m.get("content") or "").split()) for m in messages),
+                eval_count=count, eval_duration=int(elapsed * 1e9), total_duration=int(elapsed * 1e9)
+            )
+
+        if not body.get("stream", True):
+            if tool_call:
+                await asyncio.sleep(cfg.first_token_latency)
+                message = {"role": "assistant", "content": "", "tool_calls": [tool_call]}
+            else:
+                await asyncio.sleep(cfg.first_token_latency + reply_tokens / max(token_rate, 1e-9))
+                message = {"role": "assistant", "content": "".join([f" tok{i}" for i in range(reply_tokens)])}
+            return JSONResponse({"model": model, "message": message, "done": True})
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    async def _embeddings(self, request: Request):
+        body = await request.json()
+        self.requests["embeddings"] += 1
+        await asyncio.sleep(self.config.embed_latency)
+        return JSONResponse({"embedding": fake_embedding(body.get("prompt", ""))})
+
+    async def _embed(self, request: Request):
+        body = await request.json()
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        self.requests["embeddings"] += 1
+        await asyncio.sleep(self.config.embed_latency)
+        return JSONResponse({"model": body.get("model"), "embeddings": [fake_embedding(t) for t in inputs]})
+
+    def start(self, port: int = 0):
+        self._server, self._thread, self.port = serve_in_thread(self.app, port)
+
+    def stop(self):
+        if self._server:
+            self._server.should_exit = True
+            self._thread.join(timeout=5)
+
+def serve_in_thread(app, port: int = 0):
+    """Run an ASGI app with uvicorn on a background thread. Returns (server, thread, port)."""
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 15
+    while not server.started:
+        if time.time() > deadline or not thread.is_alive():
+            raise RuntimeError("Server failed to start")
+        time.sleep(0.01)
+    bound_port = server.servers[0].sockets[0].getsockname()[1]
+    return server, thread, bound_port
+
+class FakeVectorIndex:
+    """Implements the slice of the Pinecone Index API used by RAGService."""
+
+    def __init__(self):
+        self.namespaces: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = ""):
+        ns = self.namespaces.setdefault(namespace, {})
+        for v in vectors:
+            ns[v["id"]] = {"values": v["values"], "metadata": v.get("metadata") or {}}
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids: Optional[List[str]] = None, namespace: str = "", delete_all: bool = False, filter=None):
+        ns = self.namespaces.get(namespace, {})
+        if delete_all:
+            ns.clear()
+        for vid in ids or []:
+            ns.pop(vid, None)
+        if filter:
+            for vid in [vid for vid, item in ns.items() if _matches(item["metadata"], filter)]:
+                del ns[vid]
+        return {}
+
+    def fetch(self, ids: List[str], namespace: str = ""):
+        ns = self.namespaces.get(namespace, {})
+        return {"vectors": {vid: {"id": vid, **ns[vid]} for vid in ids if vid in ns}}
+
+    def list(self, prefix: Optional[str] = None, namespace: str = "", limit: int = 100):
+        """Yields pages of IDs, like Pinecone's serverless list()."""
+        ids = [vid for vid in self.namespaces.get(namespace, {}) if not prefix or vid.startswith(prefix)]
+        for i in range(0, len(ids), limit):
+            yield ids[i:i + limit]
+
+    def query(self, vector: List[float], top_k: int = 5, namespace: str = "", include_metadata: bool = False,
+              filter: Optional[Dict[str, Any]] = None, include_values: bool = False, **_):
+        scored = []
+        for vid, item in self.namespaces.get(namespace, {}).items():
+            if filter and not _matches(item["metadata"], filter):
+                continue
+            score = sum(a * b for a, b in zip(vector, item["values"]))
+            scored.append((score, vid, item))
+        scored.sort(key=lambda s: s[0], reverse=True)
+        matches = []
+        for score, vid, item in scored[:top_k]:
+            match = {"id": vid, "score": score}
+            if include_metadata:
+                match["metadata"] = item["metadata"]
+            if include_values:
+                match["values"] = item["values"]
+            matches.append(match)
+        return {"matches": matches, "namespace": namespace}
+
+    def describe_index_stats(self):
+        return {
+            "namespaces": {ns: {"vector_count": len(items)} for ns, items in self.namespaces.items()},
+            "total_vector_count": sum(len(items) for items in self.namespaces.values()),
+        }
+
+def _matches(metadata: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+    """Minimal Pinecone filter support: equality, $eq, $ne, $in, $nin, $and, $or."""
+    for key, cond in filter.items():
+        if key == "$and":
+            if not all(_matches(metadata, f) for f in cond):
+                return False
+            continue
+        if key == "$or":
+            if not any(_matches(metadata, f) for f in cond):
+                return False
+            continue
+        value = metadata.get(key)
+        if isinstance(cond, dict):
+            for op, expected in cond.items():
+                if op == "$eq" and value != expected:
+                    return False
+                if op == "$ne" and value == expected:
+                    return False
+                if op == "$in" and value not in expected:
+                    return False
+                if op == "$nin" and value in expected:
+                    return False
+        elif value != cond:
+            return False
+    return True
@@ -0,0 +1,128 @@
+"""
+Boots the backend against the fakes in `benchmarks.fakes`.
+
+The app reads its settings once at import time, so BenchEnvironment.start()
+must run before anything imports `app.*`.
+"""
+import http.client
+import json
+import os
+import statistics
+import tempfile
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.fakes import FakeOllama, FakeOllamaConfig, FakeVectorIndex, serve_in_thread
+
+class BenchEnvironment:
+    def __init__(self, ollama_config: Optional[FakeOllamaConfig] = None, workdir: Optional[str] = None, database_url: Optional[str] = None):
+        self.ollama_config = ollama_config or FakeOllamaConfig()
+        self.workdir = workdir
+        # None = fresh SQLite file in the workdir; pass a Postgres URL to benchmark that backend
+        self.database_url = database_url
+        self.fake_ollama: Optional[FakeOllama] = None
+        self.index: Optional[FakeVectorIndex] = None
+        self.app = None
+        self.port: Optional[int] = None
+        self.loop = None # The app server's event loop, for in-process probes
+        self._server = None
+        self._thread = None
+
+    def start(self) -> "BenchEnvironment":
+        self.workdir = self.workdir or tempfile.mkdtemp(prefix="jarvis-bench-")
+        self.fake_ollama = FakeOllama(self.ollama_config)
+        self.fake_ollama.start()
+
+        os.environ.update({
+            "DATABASE_URL": self.database_url or f"sqlite+aiosqlite:///{os.path.join(self.workdir, 'bench.db')}",
+            "UPLOAD_DIR": os.path.join(self.workdir, "uploads"),
+            "OLLAMA_BASE_URL": self.fake_ollama.base_url,
+            "PINECONE_API_KEY": "",
+            "SQL_ECHO": "false",
+        })
+
+        from app.main import app
+        from app.services.rag_service import rag_service
+
+        # Swap Pinecone for the in-process index
+        self.index = FakeVectorIndex()
+        rag_service.index = self.index
+        rag_service.initialized = True
+
+        self.app = app
+        self._server, self._thread, self.port = serve_in_thread(app)
+        self.loop = self._server.servers[0].get_loop()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.should_exit = True
+            self._thread.join(timeout=10)
+        if self.fake_ollama:
+            self.fake_ollama.stop()
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}"
+
+    def connection(self) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+
+    def request(self, method: str, path: str, body: Any = None, conn: Optional[http.client.HTTPConnection] = None) -> Tuple[int, Any]:
+        """JSON request; reuses `conn` for keep-alive when given."""
+        own = conn is None
+        conn = conn or self.connection()
+        try:
+            headers = {}
+            payload = None
+            if body is not None:
+                payload = json.dumps(body)
+                headers["Content-Type"] = "application/json"
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+            try:
+                parsed = json.loads(data) if data else None
+            except ValueError:
+                parsed = data.decode(errors="replace")
+            return response.status, parsed
+        finally:
+            if own:
+                conn.close()
+
+    def upload(self, path: str, filename: str, content: bytes, content_type: str = "application/octet-stream") -> Tuple[int, Any]:
+        boundary = uuid.uuid4().hex
+        body = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+        conn = self.connection()
+        try:
+            conn.request("POST", path, body=body, headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+            response = conn.getresponse()
+            data = response.read()
+            return response.status, json.loads(data) if data else None
+        finally:
+            conn.close()
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        k = (len(ordered) - 1) * p
+        lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+        return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pct(0.50) * 1000,
+        "p95_ms": pct(0.95) * 1000,
+        "p99_ms": pct(0.99) * 1000,
+        "min_ms": ordered[0] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
@@ -0,0 +1,213 @@
+"""
+WebSocket load test for /api/chat/ws/{session_id}.
+
+Opens N concurrent chat sessions, each driving a scripted multi-turn
+conversation (some turns trigger tool calls), and reports TTFT, inter-token
+latency and server event-loop lag for every concurrency level.
+
+    cd backend
+    python -m benchmarks.loadtest --sessions 1 5 10 25 --turns 4
+    python -m benchmarks.loadtest --sessions 10 --token-rate 30 --ttft-slo 1500
+
+By default it boots the app against the fake Ollama server. With --url it
+targets an already running backend instead (event-loop lag is then not
+available, and replies must end with the fake's end-of-reply marker).
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fakes import END_OF_REPLY, FakeOllamaConfig
+from benchmarks.harness import BenchEnvironment, summarize
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(__file__), "results", "loadtest.json")
+
+SCRIPT = [
+    "Hi Jarvis, what's on my plate today?",
+    "Please create a task to review the quarterly report",
+    "What do you know about the project architecture?",
+    "Remind me to call the dentist tomorrow",
+    "Summarise what we discussed so far.",
+]
+
+class SessionStats:
+    def __init__(self):
+        self.ttft: List[float] = []
+        self.inter_token: List[float] = []
+        self.turn: List[float] = []
+        self.errors = 0
+
+async def _run_session(ws_url: str, session_id: int, turns: int, think_time: float, stats: SessionStats, turn_timeout: float):
+    from websockets.asyncio.client import connect
+
+    try:
+        async with connect(f"{ws_url}/api/chat/ws/{session_id}", max_size=None) as ws:
+            for i in range(turns):
+                started = time.perf_counter()
+                await ws.send(SCRIPT[i % len(SCRIPT)])
+                last = None
+                received = ""
+                while END_OF_REPLY not in received:
+                    frame = await asyncio.wait_for(ws.recv(), timeout=turn_timeout)
+                    now = time.perf_counter()
+                    if last is None:
+                        stats.ttft.append(now - started)
+                    else:
+                        stats.inter_token.append(now - last)
+                    last = now
+                    received += frame if isinstance(frame, str) else frame.decode()
+                stats.turn.append(time.perf_counter() - started)
+                if think_time:
+                    await asyncio.sleep(think_time)
+    except Exception as e:
+        stats.errors += 1
+        print(f"Session {session_id} failed: {e!r}")
+
+async def _probe_loop_lag(interval: float, samples: List[float], stop: asyncio.Event):
+    """Runs on the server's event loop: how late does a timer fire?"""
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - expected))
+
+async def run_level(
+    ws_url: str,
+    request,
+    sessions: int,
+    turns: int,
+    think_time: float,
+    ramp: float,
+    turn_timeout: float,
+    server_loop: Optional[asyncio.AbstractEventLoop],
+) -> Dict[str, Any]:
+    session_ids = []
+    for i in range(sessions):
+        status, body = await asyncio.to_thread(request, "POST", "/api/chat/sessions", {"title": f"Load {i}"})
+        session_ids.append(body["id"])
+
+    lag: List[float] = []
+    stop = None
+    probe = None
+    if server_loop is not None:
+        # The probe and its stop flag live on the server's loop, not ours
+        stop = await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(_make_event(), server_loop))
+        probe = asyncio.run_coroutine_threadsafe(_probe_loop_lag(0.01, lag, stop), server_loop)
+
+    stats = SessionStats()
+    started = time.perf_counter()
+    tasks = []
+    for i, sid in enumerate(session_ids):
+        tasks.append(asyncio.create_task(_run_session(ws_url, sid, turns, think_time, stats, turn_timeout)))
+        if ramp and sessions > 1:
+            await asyncio.sleep(ramp / sessions)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    if probe is not None:
+        server_loop.call_soon_threadsafe(stop.set)
+        await asyncio.wrap_future(probe)
+
+    return {
+        "sessions": sessions,
+        "turns_per_session": turns,
+        "completed_turns": len(stats.turn),
+        "errors": stats.errors,
+        "wall_seconds": elapsed,
+        "turns_per_sec": len(stats.turn) / elapsed if elapsed else None,
+        "ttft": summarize(stats.ttft),
+        "inter_token": summarize(stats.inter_token),
+        "turn_latency": summarize(stats.turn),
+        "event_loop_lag": summarize(lag) if server_loop is not None else None,
+    }
+
+async def _make_event() -> asyncio.Event:
+    return asyncio.Event()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent WebSocket chat load test")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 25], help="Concurrency levels to sweep")
+    parser.add_argument("--turns", type=int, default=4, help="Turns per session")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds between turns")
+    parser.add_argument("--ramp", type=float, default=0.5, help="Seconds to spread session starts over")
+    parser.add_argument("--turn-timeout", type=float, default=120.0)
+    parser.add_argument("--ttft-slo", type=float, default=1000.0, help="p95 TTFT budget in ms")
+    parser.add_argument("--url", help="Target a running backend, e.g. http://127.0.0.1:8000")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--database-url", help="Run against this database (e.g. a throwaway Postgres) instead of a temp SQLite file")
+    # Fake Ollama
+    parser.add_argument("--token-rate", type=float, default=50.0)
+    parser.add_argument("--first-token-latency", type=float, default=0.1)
+    parser.add_argument("--reply-tokens", type=int, default=60)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    env = None
+    server_loop = None
+    if args.url:
+        import http.client
+        import urllib.parse
+        target = urllib.parse.urlparse(args.url)
+        ws_url = f"{'wss' if target.scheme == 'https' else 'ws'}://{target.netloc}"
+
+        def request(method, path, body=None):
+            conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=60)
+            try:
+                conn.request(method, path, body=json.dumps(body), headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                return response.status, json.loads(response.read())
+            finally:
+                conn.close()
+    else:
+        config = FakeOllamaConfig(
+            first_token_latency=args.first_token_latency,
+            token_rate=args.token_rate,
+            reply_tokens=args.reply_tokens,
+        )
+        env = BenchEnvironment(config, database_url=args.database_url).start()
+        ws_url = env.ws_url
+        request = env.request
+        server_loop = env.loop
+
+    levels = []
+    try:
+        for sessions in args.sessions:
+            print(f"Running {sessions} concurrent session(s)...")
+            result = asyncio.run(run_level(
+                ws_url, request, sessions, args.turns, args.think_time, args.ramp, args.turn_timeout, server_loop
+            ))
+            levels.append(result)
+            ttft = result["ttft"]
+            lag = result["event_loop_lag"] or {}
+            print(
+                f"  ttft p50/p95/p99 = {ttft.get('p50_ms', 0):.0f}/{ttft.get('p95_ms', 0):.0f}/{ttft.get('p99_ms', 0):.0f} ms, "
+                f"inter-token p95 = {result['inter_token'].get('p95_ms', 0):.1f} ms, "
+                f"loop lag p99 = {lag.get('p99_ms', 0):.1f} ms, errors = {result['errors']}"
+            )
+    finally:
+        if env:
+            env.stop()
+
+    within_slo = [
+        lvl["sessions"] for lvl in levels
+        if lvl["errors"] == 0 and lvl["ttft"].get("p95_ms", float("inf")) <= args.ttft_slo
+    ]
+    report = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "target": args.url or "fake-ollama",
+        "ttft_slo_ms": args.ttft_slo,
+        "max_sessions_within_slo": max(within_slo) if within_slo else 0,
+        "levels": levels,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"Max sessions with p95 TTFT <= {args.ttft_slo:.0f} ms: {report['max_sessions_within_slo']}")
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
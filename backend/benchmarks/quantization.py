@@ -0,0 +1,95 @@
+"""
+Recall vs memory vs latency of the local index's quantization modes.
+
+    cd backend
+    python -m benchmarks.quantization --vectors 100000 --queries 200 --k 10
+
+Synthetic embeddings are drawn around a few hundred topic centroids (closer to
+real text embeddings than isotropic noise), queries are perturbed copies of
+stored vectors, and ground truth is exact float32 cosine search. Each mode is
+also run with re-scoring disabled to show what the full-precision pass buys.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict
+
+import numpy as np
+
+from app.services.local_index import LocalVectorIndex, QUANTIZATIONS
+from benchmarks.harness import summarize
+
+def _dataset(vectors: int, dim: int, queries: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((max(8, vectors // 500), dim)).astype(np.float32)
+    assignment = rng.integers(0, len(centroids), vectors)
+    data = centroids[assignment] + 0.6 * rng.standard_normal((vectors, dim)).astype(np.float32)
+    picks = rng.integers(0, vectors, queries)
+    query_set = data[picks] + 0.3 * rng.standard_normal((queries, dim)).astype(np.float32)
+    return data, query_set
+
+def _ground_truth(data: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    unit = data / np.linalg.norm(data, axis=1, keepdims=True)
+    q = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = q @ unit.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+def measure_quantization(vectors: int = 50000, dim: int = 768, queries: int = 100, k: int = 10, rescore: int = 10) -> Dict[str, Any]:
+    data, query_set = _dataset(vectors, dim, queries)
+    truth = _ground_truth(data, query_set, k)
+    results: Dict[str, Any] = {"vectors": vectors, "dim": dim, "queries": queries, "k": k, "modes": {}}
+
+    for mode in QUANTIZATIONS:
+        with tempfile.TemporaryDirectory(prefix="jarvis-vq-") as workdir:
+            index = LocalVectorIndex(workdir, quantization=mode, rescore=rescore)
+            started = time.perf_counter()
+            for start in range(0, vectors, 1000):
+                index.upsert([
+                    {"id": str(i), "values": data[i].tolist(), "metadata": {}}
+                    for i in range(start, min(start + 1000, vectors))
+                ], namespace="bench")
+            build_seconds = time.perf_counter() - started
+            memory = index.describe_index_stats()["memory_bytes"]
+
+            variants = {"rescored": rescore} if mode != "none" else {"exact": 1}
+            if mode != "none":
+                variants["codes_only"] = 1
+            for variant, factor in variants.items():
+                index.rescore = factor
+                hits, latencies = 0, []
+                for qi, query in enumerate(query_set):
+                    t = time.perf_counter()
+                    found = index.query(query.tolist(), top_k=k, namespace="bench")["matches"]
+                    latencies.append(time.perf_counter() - t)
+                    hits += len({int(m["id"]) for m in found} & set(truth[qi].tolist()))
+
+                results["modes"][f"{mode}/{variant}"] = {
+                    f"recall_at_{k}": hits / (queries * k),
+                    "memory_mb": memory / 2**20,
+                    "bytes_per_vector": memory / vectors,
+                    "build_seconds": build_seconds,
+                    "query_latency": summarize(latencies),
+                }
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local vector index quantization benchmark")
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, default=10, help="Candidates re-scored = k * this")
+    parser.add_argument("--output", help="Write JSON results here")
+    args = parser.parse_args(argv)
+
+    result = measure_quantization(args.vectors, args.dim, args.queries, args.k, args.rescore)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
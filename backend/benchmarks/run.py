@@ -0,0 +1,250 @@
+"""
+Offline benchmark suite.
+
+    cd backend
+    python -m benchmarks.run                       # all benchmarks
+    python -m benchmarks.run --only chat_turn list_throughput --turns 50
+    python -m benchmarks.run --token-rate 20 --first-token-latency 0.3
+
+Results are written as JSON (default benchmarks/results/latest.json) so runs
+can be diffed or tracked over time.
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import platform
+import struct
+import subprocess
+import time
+import uuid
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict
+
+from benchmarks.fakes import END_OF_REPLY, FakeOllamaConfig, fake_embedding
+from benchmarks.harness import BenchEnvironment, summarize
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(__file__), "results", "latest.json")
+
+async def _chat_turns(env: BenchEnvironment, turns: int) -> Dict[str, Any]:
+    from websockets.asyncio.client import connect
+
+    status, session = env.request("POST", "/api/chat/sessions", {"title": "Benchmark"})
+    ttft, total = [], []
+    async with connect(f"{env.ws_url}/api/chat/ws/{session['id']}", max_size=None) as ws:
+        for i in range(turns):
+            started = time.perf_counter()
+            await ws.send(f"Benchmark question {i}: summarise the project status")
+            first = None
+            received = ""
+            while END_OF_REPLY not in received:
+                frame = await ws.recv()
+                if first is None:
+                    first = time.perf_counter()
+                received += frame if isinstance(frame, str) else frame.decode()
+            ttft.append(first - started)
+            total.append(time.perf_counter() - started)
+    return {"turns": turns, "time_to_first_token": summarize(ttft), "turn_latency": summarize(total)}
+
+def bench_chat_turn(env: BenchEnvironment, args) -> Dict[str, Any]:
+    return asyncio.run(_chat_turns(env, args.turns))
+
+def bench_upload_to_searchable(env: BenchEnvironment, args) -> Dict[str, Any]:
+    status, project = env.request("POST", "/api/projects", {"name": f"bench-{uuid.uuid4().hex[:6]}"})
+    latencies = []
+    misses = 0
+    filler = ("lorem ipsum dolor sit amet " * max(1, args.file_kb * 1024 // 27))
+    for i in range(args.files):
+        phrase = f"zebra{uuid.uuid4().hex[:10]} quartz{i}"
+        filename = f"bench_{i}.txt"
+        content = f"{phrase}\n{filler}".encode()
+        started = time.perf_counter()
+        status, _ = env.upload(f"/api/projects/{project['id']}/upload", filename, content, "text/plain")
+        if status != 200:
+            misses += 1
+            continue
+
+        # Searchable = the file's unique phrase comes back from the index
+        deadline = started + args.search_timeout
+        found = False
+        query = fake_embedding(phrase)
+        while time.perf_counter() < deadline:
+            for ns in list(env.index.namespaces):
+                result = env.index.query(vector=query, top_k=3, namespace=ns, include_metadata=True)
+                if any(m["metadata"].get("filename") == filename for m in result["matches"]):
+                    found = True
+                    break
+            if found:
+                break
+            time.sleep(0.01)
+        if found:
+            latencies.append(time.perf_counter() - started)
+        else:
+            misses += 1
+    return {"files": args.files, "file_kb": args.file_kb, "not_searchable": misses, "latency": summarize(latencies)}
+
+def bench_list_throughput(env: BenchEnvironment, args) -> Dict[str, Any]:
+    # Seed a realistic amount of rows
+    conn = env.connection()
+    for i in range(args.seed_rows):
+        env.request("POST", "/api/tasks", {"title": f"Task {i}", "status": ["todo", "in_progress", "done"][i % 3]}, conn)
+        env.request("POST", "/api/events", {
+            "title": f"Event {i}",
+            "start_time": f"2026-01-{1 + i % 28:02d}T{8 + i % 10:02d}:00:00",
+            "end_time": f"2026-01-{1 + i % 28:02d}T{9 + i % 10:02d}:00:00",
+        }, conn)
+        if i % 10 == 0:
+            env.request("POST", "/api/projects", {"name": f"Project {i}"}, conn)
+            env.request("POST", "/api/chat/sessions", {"title": f"Session {i}"}, conn)
+    conn.close()
+
+    endpoints = ["/api/tasks", "/api/events", "/api/projects", "/api/chat/sessions", "/api/memory"]
+    results = {}
+    for path in endpoints:
+        per_worker = max(1, args.requests // args.concurrency)
+
+        def worker(_):
+            c = env.connection()
+            samples = []
+            try:
+                for _ in range(per_worker):
+                    started = time.perf_counter()
+                    env.request("GET", path, conn=c)
+                    samples.append(time.perf_counter() - started)
+            finally:
+                c.close()
+            return samples
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            samples = [s for chunk in pool.map(worker, range(args.concurrency)) for s in chunk]
+        elapsed = time.perf_counter() - started
+        results[path] = {"requests_per_sec": len(samples) / elapsed, "latency": summarize(samples)}
+    return {"seed_rows": args.seed_rows, "concurrency": args.concurrency, "endpoints": results}
+
+def _sine_wav(seconds: float, rate: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        frames = b"".join(
+            struct.pack("<h", int(8000 * math.sin(2 * math.pi * 440 * n / rate)))
+            for n in range(int(seconds * rate))
+        )
+        w.writeframes(frames)
+    return buffer.getvalue()
+
+def bench_transcription(env: BenchEnvironment, args) -> Dict[str, Any]:
+    audio = _sine_wav(args.audio_seconds)
+    latencies = []
+    for i in range(args.transcriptions):
+        started = time.perf_counter()
+        status, body = env.upload("/api/chat/transcribe", f"bench_{i}.wav", audio, "audio/wav")
+        text = (body or {}).get("text", "") if isinstance(body, dict) else ""
+        if status != 200 or text.startswith("Error"):
+            return {"skipped": text or f"HTTP {status}"}
+        latencies.append(time.perf_counter() - started)
+    total_audio = args.audio_seconds * len(latencies)
+    return {
+        "audio_seconds": args.audio_seconds,
+        "latency": summarize(latencies),
+        "realtime_factor": total_audio / sum(latencies) if latencies else None,
+    }
+
+def bench_cold_start(env: BenchEnvironment, args) -> Dict[str, Any]:
+    from benchmarks.startup import measure_startup
+    return measure_startup(args.startup_runs)
+
+def bench_vector_quantization(env: BenchEnvironment, args) -> Dict[str, Any]:
+    from benchmarks.quantization import measure_quantization
+    return measure_quantization(args.vq_vectors, args.vq_dim, args.vq_queries, args.vq_k, args.vq_rescore)
+
+BENCHMARKS = {
+    "cold_start": bench_cold_start,
+    "chat_turn": bench_chat_turn,
+    "upload_to_searchable": bench_upload_to_searchable,
+    "list_throughput": bench_list_throughput,
+    "transcription": bench_transcription,
+    "vector_quantization": bench_vector_quantization,
+}
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return "unknown"
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Jarvis backend benchmarks (offline)")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Run a subset")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write the JSON results")
+    parser.add_argument("--database-url", help="Run against this database (e.g. a throwaway Postgres) instead of a temp SQLite file")
+    # Fake Ollama
+    parser.add_argument("--token-rate", type=float, default=200.0, help="Fake LLM tokens/sec")
+    parser.add_argument("--first-token-latency", type=float, default=0.05, help="Fake LLM seconds to first token")
+    parser.add_argument("--reply-tokens", type=int, default=40)
+    parser.add_argument("--embed-latency", type=float, default=0.002)
+    parser.add_argument("--fast-model", help="Route tool planning/summaries to this model (sets LLM_FAST_MODEL)")
+    parser.add_argument("--fast-token-rate", type=float, default=600.0, help="Fake tokens/sec of --fast-model")
+    # Workload sizes
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--file-kb", type=int, default=8)
+    parser.add_argument("--search-timeout", type=float, default=30.0)
+    parser.add_argument("--seed-rows", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--transcriptions", type=int, default=3)
+    parser.add_argument("--audio-seconds", type=float, default=5.0)
+    parser.add_argument("--startup-runs", type=int, default=3)
+    parser.add_argument("--vq-vectors", type=int, default=50000)
+    parser.add_argument("--vq-dim", type=int, default=768)
+    parser.add_argument("--vq-queries", type=int, default=100)
+    parser.add_argument("--vq-k", type=int, default=10)
+    parser.add_argument("--vq-rescore", type=int, default=10)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = FakeOllamaConfig(
+        first_token_latency=args.first_token_latency,
+        token_rate=args.token_rate,
+        reply_tokens=args.reply_tokens,
+        embed_latency=args.embed_latency,
+    )
+    if args.fast_model:
+        os.environ["LLM_FAST_MODEL"] = args.fast_model
+        config.model_token_rates[args.fast_model] = args.fast_token_rate
+    env = BenchEnvironment(config, database_url=args.database_url).start()
+    results: Dict[str, Any] = {}
+    try:
+        for name in args.only or list(BENCHMARKS):
+            print(f"Running {name}...")
+            started = time.perf_counter()
+            results[name] = BENCHMARKS[name](env, args)
+            results[name]["wall_seconds"] = time.perf_counter() - started
+    finally:
+        env.stop()
+
+    report = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "database": "sqlite" if not args.database_url else args.database_url.split(":", 1)[0],
+        "platform": platform.platform(),
+        "fake_ollama": vars(config),
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(json.dumps(results, indent=2, default=str))
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Cold-start benchmark: import cost of the app and time until /health answers.
+
+    cd backend
+    python -m benchmarks.startup --runs 5
+
+Import cost comes from `python -X importtime`, so the heaviest modules show up
+by name when a new top-level import sneaks back in.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _env(workdir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(workdir, 'startup.db')}",
+        "UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "WARMUP_ON_STARTUP": "false",
+    })
+    return env
+
+def _parse_importtime(stderr: str) -> Dict[str, int]:
+    """Self time (us) per top-level package."""
+    per_package = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue # Header row
+        per_package[parts[2].strip().split(".")[0]] += int(parts[0])
+    return dict(per_package)
+
+def measure_imports(runs: int, workdir: str, top: int = 12) -> Dict[str, Any]:
+    wall = []
+    packages: Dict[str, List[int]] = defaultdict(list)
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=BACKEND_DIR, env=_env(workdir), capture_output=True, text=True, check=True
+        )
+        wall.append(float(proc.stdout.strip().splitlines()[-1]))
+        for name, us in _parse_importtime(proc.stderr).items():
+            packages[name].append(us)
+
+    ranked = sorted(packages.items(), key=lambda kv: statistics.median(kv[1]), reverse=True)[:top]
+    return {
+        "runs": runs,
+        "import_app_main_ms": {
+            "median": statistics.median(wall) * 1000,
+            "min": min(wall) * 1000,
+            "max": max(wall) * 1000,
+        },
+        "heaviest_packages_ms": {name: statistics.median(us) / 1000 for name, us in ranked},
+    }
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def measure_time_to_healthy(runs: int, workdir: str, timeout: float = 60.0) -> Dict[str, Any]:
+    samples = []
+    for _ in range(runs):
+        port = _free_port()
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=_env(workdir), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            while time.perf_counter() - started < timeout:
+                try:
+                    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+                    conn.request("GET", "/health")
+                    if conn.getresponse().status == 200:
+                        samples.append(time.perf_counter() - started)
+                        break
+                except OSError:
+                    time.sleep(0.02)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+    return {
+        "runs": runs,
+        "healthy_ms": {
+            "median": statistics.median(samples) * 1000 if samples else None,
+            "min": min(samples) * 1000 if samples else None,
+            "max": max(samples) * 1000 if samples else None,
+        },
+    }
+
+def measure_startup(runs: int = 3) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="jarvis-startup-")
+    return {
+        "imports": measure_imports(runs, workdir),
+        "time_to_healthy": measure_time_to_healthy(runs, workdir),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backend cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Write JSON results here")
+    args = parser.parse_args(argv)
+
+    result = measure_startup(args.runs)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
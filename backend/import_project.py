@@ -0,0 +1,39 @@
+"""
+Bulk-import a directory or archive into a project.
+
+    python import_project.py <project_id> <path> [--exclude "*.log" docs/] [--max-size-kb 512]
+"""
+import argparse
+import asyncio
+import os
+from sqlalchemy.future import select
+from app.database import AsyncSessionLocal, init_db
+from app.models.project import Project
+from app.services.import_service import import_service, is_archive
+
+async def run(args):
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(Project).where(Project.id == args.project_id))
+        if not result.scalar_one_or_none():
+            raise SystemExit(f"Project {args.project_id} not found")
+
+        if os.path.isdir(args.path):
+            report = await import_service.import_directory(db, args.project_id, args.path, args.exclude, args.max_size_kb)
+        elif is_archive(args.path):
+            report = await import_service.import_archive(db, args.project_id, args.path, args.exclude, args.max_size_kb)
+        else:
+            raise SystemExit(f"{args.path} is neither a directory nor a .zip/.tar archive")
+
+    print(f"Imported {report.imported} file(s), {report.vectors} vector(s)")
+    print(f"Skipped: {report.skipped_duplicate} duplicate, {report.skipped_too_large} too large, {report.skipped_excluded} excluded")
+    for path in report.failed:
+        print(f"Failed: {path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-import files into a Jarvis project")
+    parser.add_argument("project_id", type=int)
+    parser.add_argument("path", help="Directory or .zip/.tar archive")
+    parser.add_argument("--exclude", nargs="*", default=[], help=".gitignore-style patterns to skip")
+    parser.add_argument("--max-size-kb", type=int, default=None, help="Skip files larger than this")
+    asyncio.run(run(parser.parse_args()))
@@ -1,29 +1,34 @@
 import asyncio
-from app.database import engine, Base
-from sqlalchemy import text
+import sys
+from app.database import engine
+from app.migrations import run_migrations, migration_status
+from app.services.archive_service import message_archive_service
 
 async def migrate():
-    async with engine.begin() as conn:
-        # Check if task_id column exists in chat_sessions
-        try:
-            # SQLite specific check
-            result = await conn.execute(text("PRAGMA table_info(chat_sessions)"))
-            columns = result.fetchall()
-            column_names = [col[1] for col in columns]
-            
-            if 'task_id' not in column_names:
-                print("Migrating: Adding task_id to chat_sessions...")
-                await conn.execute(text("ALTER TABLE chat_sessions ADD COLUMN task_id INTEGER REFERENCES tasks(id)"))
-            else:
-                print("Column task_id already exists in chat_sessions.")
-                
-            # Create new tables (TaskFile)
-            print("Creating new tables if they don't exist...")
-            await conn.run_sync(Base.metadata.create_all)
-            print("Migration complete.")
-            
-        except Exception as e:
-            print(f"Migration error: {e}")
+    # Runs blocking and online migrations in the foreground
+    applied = await run_migrations(engine)
+    if applied:
+        print(f"Applied {len(applied)} migration(s).")
+    else:
+        print("Database is up to date.")
+
+async def status():
+    for m in await migration_status(engine):
+        state = "applied" if m["applied"] else "pending"
+        kind = "online" if m["online"] else "blocking"
+        print(f"{m['version']:04d}_{m['name']:<30} {kind:<9} {state}")
+
+async def vacuum():
+    # Rewrites the whole file under an exclusive lock: stop the server first
+    free, pages = await message_archive_service.free_pages()
+    print(f"{free} of {pages} pages free, running VACUUM...")
+    reclaimed = await message_archive_service.vacuum()
+    print(f"Reclaimed {reclaimed} pages.")
 
 if __name__ == "__main__":
-    asyncio.run(migrate())
+    if len(sys.argv) > 1 and sys.argv[1] == "--status":
+        asyncio.run(status())
+    elif len(sys.argv) > 1 and sys.argv[1] == "--vacuum":
+        asyncio.run(vacuum())
+    else:
+        asyncio.run(migrate())
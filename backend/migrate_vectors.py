@@ -0,0 +1,20 @@
+"""
+Move project and task file vectors out of the shared "default" namespace into
+per-project / per-task namespaces. Safe to re-run; interrupt and resume freely.
+
+    python migrate_vectors.py            # move everything
+    python migrate_vectors.py --dry-run  # only count what would move
+"""
+import asyncio
+import sys
+from app.database import init_db
+from app.services.vector_gc_service import vector_gc_service
+
+async def run(dry_run: bool):
+    await init_db()
+    stats = await vector_gc_service.relocate_scoped_vectors(dry_run=dry_run)
+    verb = "Would move" if dry_run else "Moved"
+    print(f"{verb} {stats['moved']} vector(s); {stats['kept']} stay in the global namespace.")
+
+if __name__ == "__main__":
+    asyncio.run(run("--dry-run" in sys.argv[1:]))
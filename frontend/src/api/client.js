@@ -5,12 +5,12 @@ const api = axios.create({
 });
 
 export const tasksApi = {
-    getAll: () => api.get('/tasks'),
+    getAll: (params) => api.get('/tasks', { params }),
     create: (task) => api.post('/tasks', task),
     update: (id, task) => api.put(`/tasks/${id}`, task),
     delete: (id) => api.delete(`/tasks/${id}`),
 
-    getEvents: () => api.get('/events'),
+    getEvents: (params) => api.get('/events', { params }),
     createEvent: (event) => api.post('/events', event),
     deleteEvent: (id) => api.delete(`/events/${id}`),
 
@@ -30,7 +30,9 @@ export const projectsApi = {
     getAll: () => api.get('/projects'),
     getOne: (id) => api.get(`/projects/${id}`),
     create: (project) => api.post('/projects', project),
-    getFiles: (id) => api.get(`/projects/${id}/files`),
+    // Next page: pass the X-Next-Cursor header of the previous one
+    getFiles: (id, params) => api.get(`/projects/${id}/files`, { params }),
+    delete: (id) => api.delete(`/projects/${id}`),
     uploadFile: (id, file) => {
         const formData = new FormData();
         formData.append('file', file);
@@ -41,9 +43,13 @@ export const projectsApi = {
 };
 
 export const chatApi = {
-    getSessions: () => api.get('/chat/sessions'),
+    getSessions: (params) => api.get('/chat/sessions', { params }),
     createSession: (title) => api.post('/chat/sessions', { title }),
     getSession: (id) => api.get(`/chat/sessions/${id}`),
+    // Older messages: pass the X-Next-Cursor header of getSession / the previous page
+    getMessages: (id, params) => api.get(`/chat/sessions/${id}/messages`, { params }),
+    // Full-text search; snippets wrap matches in <mark> (render escaped text + highlight only)
+    search: (q, params) => api.get('/chat/search', { params: { q, ...params } }),
     updateSession: (id, title) => api.put(`/chat/sessions/${id}`, { title }),
     deleteSession: (id) => api.delete(`/chat/sessions/${id}`),
     transcribe: (file) => {
@@ -55,8 +61,13 @@ export const chatApi = {
     }
 };
 
+export const dashboardApi = {
+    // Counts, upcoming deadlines and today's events in one request
+    get: () => api.get('/dashboard')
+};
+
 export const memoryApi = {
-    getAll: () => api.get('/memory'),
+    getAll: (params) => api.get('/memory', { params }),
     create: (content, category) => api.post('/memory', { content, category }),
     delete: (id) => api.delete(`/memory/${id}`)
 };
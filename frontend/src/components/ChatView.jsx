@@ -1,11 +1,22 @@
 import React, { useState, useEffect, useRef } from 'react';
 import {
     Plus, Trash2, MessageSquare, MoreHorizontal, Cpu, Bot, Terminal,
-    Mic, ArrowRight, FileText, Hash, Brain, ChevronRight, Pencil, Check, X
+    Mic, ArrowRight, FileText, Hash, Brain, ChevronRight, Pencil, Check, X, Search
 } from 'lucide-react';
 import { useChat } from '../hooks/useChat';
 import { chatApi } from '../api/client';
 
+// Search snippets wrap matches in <mark></mark>; everything else is rendered as plain text
+const Snippet = ({ text }) => (
+    <>
+        {text.split(/(<mark>.*?<\/mark>)/g).map((part, i) =>
+            part.startsWith('<mark>') && part.endsWith('</mark>')
+                ? <mark key={i} className="bg-orange-500/20 text-orange-400">{part.slice(6, -7)}</mark>
+                : <React.Fragment key={i}>{part}</React.Fragment>
+        )}
+    </>
+);
+
 const MessageContent = ({ content }) => {
     // Helper to render the thought block
     const ThoughtBlock = ({ thought, isOpen = false, isStreaming = false }) => (
@@ -79,14 +90,17 @@ const ChatView = () => {
     const [isTranscribing, setIsTranscribing] = useState(false);
     const [editingSessionId, setEditingSessionId] = useState(null);
     const [editTitle, setEditTitle] = useState('');
-    const { messages, sendMessage, status } = useChat(activeSessionId);
+    const [searchQuery, setSearchQuery] = useState('');
+    const [searchHits, setSearchHits] = useState(null); // null: not searching, show sessions
+    const [searchError, setSearchError] = useState(null);
+    const { messages, sendMessage, status, hasOlder, loadingOlder, loadOlder } = useChat(activeSessionId);
     const messagesEndRef = useRef(null);
     const mediaRecorderRef = useRef(null);
     const audioChunksRef = useRef([]);
 
     const scrollToBottom = () => messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
 
-    useEffect(scrollToBottom, [messages]);
+    useEffect(scrollToBottom, [messages[messages.length - 1]]); // Not when older messages are prepended
 
     // Load sessions on mount
     useEffect(() => {
@@ -132,6 +146,27 @@ const ChatView = () => {
         }
     };
 
+    const handleSearch = async (e) => {
+        if (e.key === 'Escape') return clearSearch();
+        if (e.key !== 'Enter') return;
+        if (!searchQuery.trim()) return clearSearch();
+        try {
+            const res = await chatApi.search(searchQuery.trim());
+            setSearchHits(res.data);
+            setSearchError(null);
+        } catch (err) {
+            // 503 while the search index is still being built
+            setSearchHits([]);
+            setSearchError(err.response?.data?.detail || 'Search failed');
+        }
+    };
+
+    const clearSearch = () => {
+        setSearchQuery('');
+        setSearchHits(null);
+        setSearchError(null);
+    };
+
     const startEditing = (session, e) => {
         e.stopPropagation();
         setEditingSessionId(session.id);
@@ -239,6 +274,43 @@ const ChatView = () => {
                         <Plus size={14} />
                     </button>
                 </div>
+                <div className="px-2 pt-2">
+                    <div className="flex items-center gap-2 bg-[#111] border border-[#333] rounded-sm px-2 focus-within:border-orange-500">
+                        <Search size={12} className="text-[#555] shrink-0" />
+                        <input
+                            type="text"
+                            value={searchQuery}
+                            onChange={(e) => setSearchQuery(e.target.value)}
+                            onKeyDown={handleSearch}
+                            placeholder="Search messages"
+                            className="flex-1 min-w-0 bg-transparent py-1.5 text-xs text-[#e5e5e5] placeholder-[#555] focus:outline-none"
+                        />
+                        {searchHits !== null && (
+                            <button onClick={clearSearch} className="text-[#666] hover:text-[#ccc]" title="Clear">
+                                <X size={12} />
+                            </button>
+                        )}
+                    </div>
+                </div>
+                {searchHits !== null ? (
+                <div className="flex-1 overflow-y-auto p-2 space-y-1">
+                    {searchError && <div className="p-3 text-xs text-red-400 font-mono">{searchError}</div>}
+                    {!searchError && searchHits.length === 0 && <div className="p-3 text-xs text-[#555] font-mono">No matches</div>}
+                    {searchHits.map((hit) => (
+                        <div
+                            key={hit.id}
+                            onClick={() => setActiveSessionId(hit.session_id)}
+                            className="p-3 rounded-sm border bg-transparent border-transparent hover:bg-[#1a1a1a] hover:border-[#333] cursor-pointer"
+                        >
+                            <div className="flex justify-between items-center mb-1">
+                                <span className="text-[10px] font-mono text-[#666] truncate">{hit.session_title || `#${hit.session_id}`}</span>
+                                <span className="text-[9px] text-[#555] shrink-0">{new Date(hit.timestamp).toLocaleDateString()}</span>
+                            </div>
+                            <div className="text-xs text-[#aaa] line-clamp-3"><Snippet text={hit.snippet} /></div>
+                        </div>
+                    ))}
+                </div>
+                ) : (
                 <div className="flex-1 overflow-y-auto p-2 space-y-1">
                     {sessions.map((session) => (
                         <div
@@ -298,6 +370,7 @@ const ChatView = () => {
                         </div>
                     ))}
                 </div>
+                )}
                 {activeSessionId && (
                     <div className="p-3 border-t border-[#333] bg-[#1a1a1a]">
                         <button onClick={() => handleDeleteSession(activeSessionId)} className="w-full flex items-center justify-center gap-2 py-2 text-[#666] hover:text-red-400 hover:bg-[#222] rounded-sm transition-colors text-xs font-mono uppercase tracking-wide">
@@ -339,6 +412,13 @@ const ChatView = () => {
                             <p className="font-mono text-sm">Start New Chat</p>
                         </div>
                     )}
+                    {hasOlder && (
+                        <div className="flex justify-center">
+                            <button onClick={loadOlder} disabled={loadingOlder} className="text-[10px] font-mono uppercase tracking-wide text-[#666] hover:text-[#ccc] disabled:text-[#444] transition-colors">
+                                {loadingOlder ? 'Loading...' : 'Load earlier messages'}
+                            </button>
+                        </div>
+                    )}
                     {messages.map((msg, idx) => (
                         <div key={idx} className={`flex flex-col ${msg.role === 'user' ? 'items-end' : 'items-start'}`}>
                             <div className={`flex items-start gap-3 max-w-[90%] lg:max-w-[85%] ${msg.role === 'user' ? 'flex-row-reverse' : 'flex-row'}`}>
@@ -69,13 +69,15 @@ const MessageContent = ({ content }) => {
 const ProjectDetailView = ({ project, onBack }) => {
     const [files, setFiles] = useState([]);
     const [loadingFiles, setLoadingFiles] = useState(true);
+    const [filesCursor, setFilesCursor] = useState(null); // X-Next-Cursor of the last page loaded; null when all files are shown
+    const [loadingMoreFiles, setLoadingMoreFiles] = useState(false);
     const [input, setInput] = useState('');
     const [sessionId, setSessionId] = useState(null);
     const [sessions, setSessions] = useState([]);
     const fileInputRef = useRef(null);
     const messagesEndRef = useRef(null);
 
-    const { messages, sendMessage, status } = useChat(sessionId);
+    const { messages, sendMessage, status, hasOlder, loadingOlder, loadOlder } = useChat(sessionId);
 
     useEffect(() => {
         loadFiles();
@@ -139,6 +141,7 @@ const ProjectDetailView = ({ project, onBack }) => {
         try {
             const res = await projectsApi.getFiles(project.id);
             setFiles(res.data);
+            setFilesCursor(res.headers['x-next-cursor'] || null);
         } catch (err) {
             console.error(err);
         } finally {
@@ -146,6 +149,25 @@ const ProjectDetailView = ({ project, onBack }) => {
         }
     };
 
+    const loadMoreFiles = async () => {
+        if (!filesCursor || loadingMoreFiles) return;
+
+        setLoadingMoreFiles(true);
+        try {
+            const res = await projectsApi.getFiles(project.id, { cursor: filesCursor });
+            // Uploads made meanwhile are already in the list
+            setFiles(prev => {
+                const shown = new Set(prev.map(f => f.id));
+                return [...prev, ...res.data.filter(f => !shown.has(f.id))];
+            });
+            setFilesCursor(res.headers['x-next-cursor'] || null);
+        } catch (err) {
+            console.error(err);
+        } finally {
+            setLoadingMoreFiles(false);
+        }
+    };
+
     const handleFileUpload = async (e) => {
         const file = e.target.files[0];
         if (!file) return;
@@ -268,6 +290,13 @@ const ProjectDetailView = ({ project, onBack }) => {
                                 </div>
                             ))
                         )}
+                        {!loadingFiles && filesCursor && (
+                            <div className="flex justify-center p-2">
+                                <button onClick={loadMoreFiles} disabled={loadingMoreFiles} className="text-[10px] font-mono uppercase tracking-wide text-[#666] hover:text-[#ccc] disabled:text-[#444] transition-colors">
+                                    {loadingMoreFiles ? 'Loading...' : 'Load more files'}
+                                </button>
+                            </div>
+                        )}
                     </div>
                 </div>
 
@@ -279,6 +308,13 @@ const ProjectDetailView = ({ project, onBack }) => {
 
                     {/* Chat Area */}
                     <div className="flex-1 overflow-y-auto p-6 space-y-6">
+                        {hasOlder && (
+                            <div className="flex justify-center">
+                                <button onClick={loadOlder} disabled={loadingOlder} className="text-[10px] font-mono uppercase tracking-wide text-[#666] hover:text-[#ccc] disabled:text-[#444] transition-colors">
+                                    {loadingOlder ? 'Loading...' : 'Load earlier messages'}
+                                </button>
+                            </div>
+                        )}
                         {messages.length === 0 ? (
                             <div className="flex gap-4 max-w-3xl">
                                 <div className="w-8 h-8 rounded-sm bg-orange-600 flex items-center justify-center shrink-0 font-bold text-white text-xs">AI</div>
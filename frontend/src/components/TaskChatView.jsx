@@ -76,7 +76,7 @@ const TaskChatView = ({ task, onBack }) => {
     const audioChunksRef = useRef([]);
 
     // Chat Hook & Logic
-    const { messages, sendMessage, status } = useChat(sessionId);
+    const { messages, sendMessage, status, hasOlder, loadingOlder, loadOlder } = useChat(sessionId);
 
     useEffect(() => {
         if (task?.id) {
@@ -169,7 +169,7 @@ const TaskChatView = ({ task, onBack }) => {
     };
 
     const scrollToBottom = () => messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
-    useEffect(scrollToBottom, [messages]);
+    useEffect(scrollToBottom, [messages[messages.length - 1]]); // Not when older messages are prepended
 
     return (
         <div className="h-[calc(100vh-4rem)] flex flex-col animate-in fade-in duration-300">
@@ -242,6 +242,13 @@ const TaskChatView = ({ task, onBack }) => {
                                 <p className="font-mono text-sm">Task context initialized.</p>
                             </div>
                         )}
+                        {hasOlder && (
+                            <div className="flex justify-center">
+                                <button onClick={loadOlder} disabled={loadingOlder} className="text-[10px] font-mono uppercase tracking-wide text-[#666] hover:text-[#ccc] disabled:text-[#444] transition-colors">
+                                    {loadingOlder ? 'Loading...' : 'Load earlier messages'}
+                                </button>
+                            </div>
+                        )}
                         {messages.map((msg, idx) => (
                             <div key={idx} className={`flex flex-col ${msg.role === 'user' ? 'items-end' : 'items-start'}`}>
                                 <div className={`flex items-start gap-3 max-w-[90%] lg:max-w-[85%] ${msg.role === 'user' ? 'flex-row-reverse' : 'flex-row'}`}>
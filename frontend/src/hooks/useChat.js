@@ -4,18 +4,37 @@ import { chatApi } from '../api/client';
 export const useChat = (sessionId) => {
     const [messages, setMessages] = useState([]);
     const [status, setStatus] = useState('disconnected'); // disconnected, connecting, connected
+    const [olderCursor, setOlderCursor] = useState(null); // X-Next-Cursor of the oldest page loaded; null when there's nothing older
+    const [loadingOlder, setLoadingOlder] = useState(false);
     const wsRef = useRef(null);
+    const sessionRef = useRef(sessionId);
     const messagesEndRef = useRef(null);
 
-    // Initial load of history
+    // Initial load of history (the latest messages; older ones via loadOlder)
     useEffect(() => {
+        sessionRef.current = sessionId;
+        setOlderCursor(null);
         if (!sessionId || sessionId === 'new') return;
 
         chatApi.getSession(sessionId).then(res => {
+            if (sessionRef.current !== sessionId) return;
             setMessages(res.data.messages || []);
+            setOlderCursor(res.headers['x-next-cursor'] || null);
         });
     }, [sessionId]);
 
+    const loadOlder = useCallback(() => {
+        if (!olderCursor || loadingOlder) return;
+
+        setLoadingOlder(true);
+        chatApi.getMessages(sessionId, { cursor: olderCursor }).then(res => {
+            if (sessionRef.current !== sessionId) return;
+            // Pages come newest first
+            setMessages(prev => [...[...res.data].reverse(), ...prev]);
+            setOlderCursor(res.headers['x-next-cursor'] || null);
+        }).finally(() => setLoadingOlder(false));
+    }, [sessionId, olderCursor, loadingOlder]);
+
     // WebSocket Connection
     useEffect(() => {
         if (!sessionId || sessionId === 'new') return;
@@ -77,9 +96,19 @@ export const useChat = (sessionId) => {
         wsRef.current.send(text);
     }, [status]);
 
+    // Ask the backend to stop the current answer; it keeps what was streamed so far
+    const stopGeneration = useCallback(() => {
+        if (!wsRef.current || status !== 'connected') return;
+        wsRef.current.send(JSON.stringify({ type: 'stop' }));
+    }, [status]);
+
     return {
         messages,
         sendMessage,
-        status
+        stopGeneration,
+        status,
+        hasOlder: !!olderCursor,
+        loadingOlder,
+        loadOlder
     };
 };